@@ -1,15 +1,12 @@
-import sqlite3
+import sys
 import os
 
 current_file_path = os.path.abspath(__file__)
 current_dir_path = os.path.dirname(current_file_path)
+sys.path.append(os.path.join(os.path.dirname(current_dir_path), 'src'))
 
-# 产生 .db
-connection = sqlite3.connect(f'{current_dir_path}/database.db')
-with open(f'{current_dir_path}/schema.sql') as f:
-    connection.executescript(f.read())
+from utils.migrations import migrate, LATEST_VERSION
 
-# cur = connection.cursor()
-
-connection.commit()
-connection.close()
\ No newline at end of file
+# 产生 .db，已有的数据库升级到最新版本（不会删除数据）
+migrate(f'{current_dir_path}/database.db')
+print(f'数据库已是最新版本 v{LATEST_VERSION}')
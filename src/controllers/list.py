@@ -1,10 +1,42 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, request, jsonify
 from utils.db import VideoDB
 from utils.constants import VideoStatus
 
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+FILTER_KEYS = ['status', 'since', 'until', 'title']
+
+
+def _filters():
+    return {key: request.args.get(key) or None for key in FILTER_KEYS}
+
+
 def list_controller(session):
     user = session['login_name']
     db = VideoDB()
-    videos = db.list_videos(user)
+    filters = _filters()
+    videos, next_cursor = db.list_videos_page(user, limit=PAGE_SIZE, **filters)
     # print(videos, len(videos))
-    return render_template('list.html', videos=videos, VideoStatus=VideoStatus)
+    return render_template('list.html', videos=videos, VideoStatus=VideoStatus, filters=filters, next_cursor=next_cursor)
+
+
+def list_api_controller(session):
+    """
+    分页列出视频：?cursor=&limit=&status=&since=&until=&title=
+    返回 {videos, next_cursor}；format=html 时附带渲染好的表格行，供列表页滚动加载
+    """
+    user = session['login_name']
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        videos, next_cursor = VideoDB().list_videos_page(
+            user, limit=limit, cursor=request.args.get('cursor') or None, **_filters()
+        )
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+    result = {
+        'videos': [dict(video, created=str(video['created'])) for video in videos],
+        'next_cursor': next_cursor,
+    }
+    if request.args.get('format') == 'html':
+        result['html'] = render_template('_video_rows.html', videos=videos, VideoStatus=VideoStatus)
+    return jsonify(result)
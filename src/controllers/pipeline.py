@@ -0,0 +1,275 @@
+"""
+下载任务的流水线：fetch_info -> download -> subtitle -> burn_in -> prepare_upload -> upload
+
+软字幕（subtitle_mode 为 soft）只需重新封装，跳过 burn_in 阶段，在 prepare_upload 阶段封装字幕流，
+不占用烧录字幕的工作线程。
+
+每个阶段由 job_queue 中独立的工作线程执行，阶段之间通过 jobs 表交接，
+阶段产生的数据（保存路径、字幕路径、标题等）写入 job['payload'] 供后续阶段使用。
+"""
+import os
+import asyncio
+from functools import wraps
+from utils.account import get_youtube_info, credential_service
+from utils.constants import VideoStatus, DownloadStage, JobStage, SubtitleMode
+from utils.stringUtil import cleaned_text, sanitize_title
+from utils.db import VideoDB, JobDB
+from utils.dict import pick
+from utils.progress import download_progress
+from utils.subtitle import prepare_subtitle, burn_subtitle
+from utils.upload_ready import make_upload_ready
+from utils.job_queue import job_queue, RetryLater
+from utils.upload_scheduler import upload_scheduler
+from utils.settings import load_settings
+from .download import download_video, JOB_SESSION_KEYS
+from .upload import find_or_extract_cover, upload_video, UPLOAD_CAPTCHA_MSG
+
+
+def _progress_id(job):
+    if job['video_id']:
+        return str(job['video_id'])
+    return job['temp_id'] or f"job_{job['id']}"
+
+
+def pipeline_stage(func):
+    """
+    统一处理阶段的进度登记与出错：进程重启或重试后重新登记进度；
+    出错后还会重试时只在进度中提示，重试次数用完才标记视频为 ERROR；RetryLater 只是推迟，不算出错。
+    """
+    @wraps(func)
+    def wrapper(job):
+        progress_id = _progress_id(job)
+        existing = download_progress.get_progress(progress_id)
+        if not existing or existing.get('error'):
+            download_progress.start_progress(progress_id, '正在准备...')
+        try:
+            return func(job)
+        except RetryLater:
+            raise
+        except Exception as e:
+            print(f"任务 {job['id']} 在 {job['stage']} 阶段出错: {e}")
+            progress_id = _progress_id(job)
+            delay = job_queue.retry_delay(job)
+            if delay is not None:
+                # 进度保持未结束，下载页继续等待重试的结果
+                current = download_progress.get_progress(progress_id) or {}
+                download_progress.update_stage(
+                    progress_id, current.get('stage') or DownloadStage.PREPARING, current.get('progress', 0),
+                    f'出错，{int(delay)} 秒后重试：{e}'
+                )
+            else:
+                download_progress.set_error(progress_id, str(e))
+                if job['video_id']:
+                    VideoDB().update_status(job['video_id'], status=VideoStatus.ERROR)
+            raise
+    return wrapper
+
+
+@pipeline_stage
+def fetch_info_stage(job):
+    payload = job['payload']
+    user = job['user']
+    progress_id = _progress_id(job)
+    need_subtitle = payload['need_subtitle']
+    subtitle_locale = payload['subtitle_locale']
+    save_dir = payload['save_dir']
+    resolution = payload['resolution']
+
+    download_progress.update_stage(progress_id, DownloadStage.FETCHING_INFO, 5, '正在获取视频信息...')
+    with job_queue.stage(JobStage.FETCH_INFO):
+        info = get_youtube_info(payload['video_url'])
+    orig_id = info["id"]
+    safe_title = sanitize_title(info.get("title", ""))
+    print("获取了视频标题等...", info)
+
+    final_save_path = os.path.join(save_dir, f"{orig_id}.{resolution}.mp4")
+    temp_save_path = os.path.join(save_dir, f"{orig_id}.{resolution}.tmp.mp4")
+    save_srt = os.path.join(save_dir, f"{orig_id}.{subtitle_locale}.srt") if subtitle_locale else ''
+
+    db = VideoDB()
+    existing_video = db.query_video_by_origin_id(user, orig_id)
+    if existing_video:
+        video_id = existing_video['id']
+        print(f"Video {orig_id} already exists for user {user}; reusing record {video_id}")
+        db.update_status(video_id, save_path=final_save_path, save_srt=save_srt, subtitle_lang=need_subtitle, status=VideoStatus.DOWNLOADING)
+    else:
+        video_id = db.create_video(
+            user=user,
+            origin_id=orig_id,
+            origin_url=payload['video_url'],
+            save_path=final_save_path,
+            save_srt=save_srt,
+            title=safe_title,
+            subtitle_lang=need_subtitle
+        )
+        db.update_status(video_id, status=VideoStatus.DOWNLOADING)
+    JobDB().update_job(job['id'], video_id=video_id)
+    job['video_id'] = video_id
+
+    if progress_id != str(video_id):
+        download_progress.update_video_id(progress_id, str(video_id))
+    download_progress.update_stage(str(video_id), DownloadStage.FETCHING_INFO, 10, '视频信息获取完成')
+
+    payload.update({
+        'origin_id': orig_id,
+        'origin_title': safe_title,
+        'origin_file_size': info["file_size"],
+        'final_save_path': final_save_path,
+        'temp_save_path': temp_save_path,
+        'ydl_opts': {
+            'writesubtitles': bool(need_subtitle),
+            'subtitleslangs': [subtitle_locale],
+            'writesubtitlesformat': 'srt' if need_subtitle else None,
+            'writethumbnail': True,
+            'outtmpl': temp_save_path,
+            'format': f"bv*[height<={resolution}][ext=mp4]+ba[ext=m4a]/b[ext=mp4]",
+            'continuedl': True,
+            'retries': 10,
+            'fragment_retries': 10,
+        },
+    })
+    return JobStage.DOWNLOAD
+
+
+@pipeline_stage
+def download_stage(job):
+    payload = job['payload']
+    video_id = str(job['video_id'])
+    print('准备下载', video_id, '\n', payload['ydl_opts'])
+    download_video(
+        payload['video_url'],
+        video_id,
+        payload['ydl_opts'],
+        payload['final_save_path'],
+        payload['temp_save_path']
+    )
+    download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 20, '下载完成，等待后续处理')
+    if payload['need_subtitle']:
+        return JobStage.SUBTITLE
+    return JobStage.PREPARE_UPLOAD
+
+
+@pipeline_stage
+def subtitle_stage(job):
+    payload = job['payload']
+    video_id = str(job['video_id'])
+    record = VideoDB().read_video(video_id)
+
+    download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, 25, '开始处理字幕')
+
+    def subtitle_progress_callback(percent: int, message: str):
+        download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, percent, message)
+
+    prepared = prepare_subtitle(
+        record=record,
+        orig_id=record['origin_id'],
+        title=record['title'],
+        origin_video_path=record['save_path'],
+        progress_callback=subtitle_progress_callback
+    )
+    payload.update(prepared)
+    if payload.get('subtitle_mode') == SubtitleMode.SOFT.value:
+        return JobStage.PREPARE_UPLOAD
+    return JobStage.BURN_IN
+
+
+def _embed_subtitle(job, record):
+    """把字幕烧录进画面或封装为字幕流，结果写入 payload"""
+    payload = job['payload']
+    video_id = str(job['video_id'])
+    title = sanitize_title(cleaned_text(record['title']), max_len=80)
+
+    def subtitle_progress_callback(percent: int, message: str):
+        download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, percent, message)
+
+    result = burn_subtitle(
+        title=title,
+        video_path=record['save_path'],
+        origin_video_path=record['save_path'],
+        subtitles_path=payload['subtitles_path'],
+        subtitle_type=payload['subtitle_type'],
+        need_subtitle=record['subtitle_lang'],
+        progress_callback=subtitle_progress_callback,
+        resolution=payload.get('resolution'),
+        subtitle_mode=payload.get('subtitle_mode')
+    )
+    payload.update(pick(result, ['title', 'video_path', 'subtitles_path']))
+    download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, 39, '字幕处理完成')
+
+
+@pipeline_stage
+def burn_in_stage(job):
+    _embed_subtitle(job, VideoDB().read_video(str(job['video_id'])))
+    return JobStage.PREPARE_UPLOAD
+
+
+@pipeline_stage
+def prepare_upload_stage(job):
+    """检查视频能否直接上传，只在需要时重新封装或转码；判断结果记录在 payload['upload_ready']"""
+    payload = job['payload']
+    video_id = str(job['video_id'])
+    record = VideoDB().read_video(video_id)
+    if payload.get('subtitle_mode') == SubtitleMode.SOFT.value and payload.get('subtitles_path') and not payload.get('video_path'):
+        # 软字幕跳过了 burn_in 阶段，在这里封装字幕流（-c copy，很快）
+        _embed_subtitle(job, record)
+    video_path = payload.get('video_path') or record['save_path']
+
+    def ready_progress_callback(percent: int, message: str):
+        download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 20 + int(percent * 0.19), message)
+
+    download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 20, '检查视频格式...')
+    payload['upload_ready'] = make_upload_ready(video_path, payload.get('resolution'), ready_progress_callback)
+    print(f"视频 {video_id} 上传前检查:", payload['upload_ready'])
+    return JobStage.UPLOAD
+
+
+@pipeline_stage
+def upload_stage(job):
+    payload = job['payload']
+    video_id = str(job['video_id'])
+    record = VideoDB().read_video(video_id)
+    title = payload.get('title') or sanitize_title(cleaned_text(record['title']), max_len=80)
+    video_path = payload.get('video_path') or record['save_path']
+
+    download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 20, '准备上传')
+    cover = find_or_extract_cover(video_id, record)
+    session = pick(payload, JOB_SESSION_KEYS)
+    max_throttled = int(load_settings('upload').get('max_throttled_retries') or 0)
+    if payload.get('throttled', 0) > max_throttled:
+        raise RuntimeError(f"{UPLOAD_CAPTCHA_MSG}（已推迟 {max_throttled} 次，放弃投稿）")
+    if session.get('auto_upload'):
+        # 每次执行时读取最新的登录信息，更新 bili_cookie.json 后重试的任务会用上新的 cookie
+        session.update(pick(credential_service.get_cookies(), ["SESSDATA", "bili_jct", "buvid3"]))
+        wait = upload_scheduler.reserve()
+        if wait > 0:
+            download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 39, f'等待投稿名额，约 {int(wait)} 秒')
+            raise RetryLater(wait, '等待投稿名额')
+    is_succ, msg = asyncio.run(upload_video(
+        session, video_id, record, title, video_path, cover, payload.get('subtitles_path', '')
+    ))
+    if not is_succ:
+        if msg != UPLOAD_CAPTCHA_MSG:
+            # 403：登录信息失效，按普通失败处理（有限次重试，每次重新读取 cookie），用完后标记为出错
+            raise RuntimeError(msg)
+        # 验证码：整体放慢投稿节奏，任务留在上传队列中稍后重试，下载和转码的结果不浪费
+        delay = upload_scheduler.report_throttled()
+        payload['throttled'] = payload.get('throttled', 0) + 1
+        if payload['throttled'] > max_throttled:
+            raise RuntimeError(f"{msg}（已推迟 {max_throttled} 次，放弃投稿）")
+        VideoDB().update_status(video_id, status=VideoStatus.DOWNLOADED)
+        download_progress.start_progress(video_id, title)
+        download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 39, f'{msg}，{int(delay)} 秒后重新投稿')
+        raise RetryLater(delay, msg)
+    if session.get('auto_upload'):
+        upload_scheduler.report_success()
+    download_progress.complete_progress(video_id)
+    return None
+
+
+def register_pipeline(queue=job_queue):
+    queue.register(JobStage.FETCH_INFO, fetch_info_stage)
+    queue.register(JobStage.DOWNLOAD, download_stage)
+    queue.register(JobStage.SUBTITLE, subtitle_stage)
+    queue.register(JobStage.BURN_IN, burn_in_stage)
+    queue.register(JobStage.PREPARE_UPLOAD, prepare_upload_stage)
+    queue.register(JobStage.UPLOAD, upload_stage)
@@ -4,14 +4,241 @@ from flask import request, redirect, url_for, flash
 import bilibili_api
 from bilibili_api import video_uploader, Credential
 from bilibili_api.video_uploader import VideoUploaderEvents
-from utils.stringUtil import cleaned_text, truncate_str
-from utils.constants import Route, VideoStatus, DownloadStage
-from utils.sys import find_cover_images, join_root_path, extract_cover_from_video
+from utils.stringUtil import cleaned_text, truncate_str, add_suffix_to_filename
+from utils.constants import Route, VideoStatus, DownloadStage, JobStage
+from utils.sys import find_cover_images, extract_cover_from_video
 from utils.dict import pick
 from utils.db import VideoDB
-from utils.account import AccountUtil
+from utils.account import credential_service
 from utils.subtitle import add_subtitle
+from utils.upload_ready import make_upload_ready
+from utils.resumable_upload import ResumableVideoUploader, UPLOAD_PROGRESS_EVENT
 from utils.progress import download_progress
+from utils.job_queue import job_queue
+from utils.upload_scheduler import upload_scheduler
+
+# 投稿失败的提示：403 表示登录信息失效，需要更新 cookie；验证码只是投稿太频繁，稍后重试即可
+UPLOAD_FORBIDDEN_MSG = "bilibili_api 403，请尝试更新cookie信息"
+UPLOAD_CAPTCHA_MSG = "需要输入验证码了，请稍后再投稿"
+
+
+def find_or_extract_cover(video_id, record):
+    """查找下载时保存的封面，没有则从视频中截取一帧"""
+    origin_video_path = record['save_path']
+    orig_id = record['origin_id']
+    save_dir, _ = os.path.split(origin_video_path)
+
+    download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 22, '检查封面...')
+    cover = find_cover_images(save_dir, orig_id)
+    if not cover:
+        cover_path = os.path.join(save_dir, f"{orig_id}.jpg")
+        if extract_cover_from_video(origin_video_path, cover_path):
+            cover = cover_path
+            print(f"已从视频提取封面: {cover}")
+        else:
+            download_progress.set_error(video_id, '封面不存在且无法从视频提取')
+            raise FileNotFoundError('封面不存在', record['origin_id'])
+    return cover
+
+
+async def upload_video(session, video_id, record, title, video_path, cover, subtitles_path):
+    """把处理好的视频投稿到B站；session 中 auto_upload 为空时只记录为已下载"""
+    db = VideoDB()
+    db_update_args = {
+        "title": title,
+        "save_cover": cover,
+        "save_srt": subtitles_path
+    }
+
+    if not session['auto_upload']:
+        db_update_args.update({
+            "status": VideoStatus.DOWNLOADED
+        })
+        print("not need auto_upload", db_update_args)
+        db.update_status(video_id, **db_update_args)
+        download_progress.complete_progress(video_id)
+        return True, None
+
+    download_progress.update_stage(video_id, DownloadStage.UPLOADING, 40, '准备上传到B站')
+
+    credential = _credential(session)
+
+    # include full original video name in description alongside origin URL
+    origin_name = record.get('origin_title') or record.get('title') or ''
+    desc = f"via. {record['origin_url']} | {origin_name}"
+
+    # Ensure the final title passed to the uploader is legal for bilibili
+    from utils.stringUtil import sanitize_title_for_bilibili
+    title = sanitize_title_for_bilibili(title, max_len=80)
+    tid = record['tid'] if record['tid'] else 231
+    tags = record['tags'].split(',') if record['tags'] and len(record['tags']) else ['youtube']
+    vu_data = {
+        'tid': tid,
+        'original': True,
+        'source': 'youtube',
+        'no_reprint': True,
+        'title': title,
+        'tags': tags,
+        'desc': desc,
+        'cover': cover
+    }
+    vu_meta = video_uploader.VideoMeta(**vu_data)
+    page = video_uploader.VideoUploaderPage(
+        path=video_path,
+        title=title,
+        description=desc
+    )
+    # 上传中断后重试时只上传剩下的分块
+    uploader = ResumableVideoUploader([page], vu_meta, credential, video_id=video_id)
+
+    @uploader.on("__ALL__")
+    async def ev(data, args=db_update_args):
+        if data['name'] == VideoUploaderEvents.COMPLETED.value:
+            args.update(pick(vu_data, ["desc", "tid", "tags"]))
+            args["status"] = VideoStatus.UPLOADED
+            db.update_status(video_id, **args)
+            download_progress.complete_progress(video_id)
+            print('上传完成', data)
+        elif data['name'] == VideoUploaderEvents.FAILED.value:
+            args["status"] = VideoStatus.ERROR
+            db.update_status(video_id, **args)
+            err_data = data.get('data', ())
+            err_msg = '上传失败'
+            if err_data and len(err_data) > 0:
+                err_info = err_data[0]
+                if isinstance(err_info, dict) and 'err' in err_info:
+                    err_msg = f"上传失败: {err_info['err']}"
+                else:
+                    err_msg = f"上传失败: {err_info}"
+            download_progress.set_error(video_id, err_msg)
+            print('上传失败', data)
+        else:
+            if data['name'] == UPLOAD_PROGRESS_EVENT:
+                progress = data['data'][0]['p']
+                download_progress.update_stage(video_id, DownloadStage.UPLOADING, 40 + progress * 0.6, f'上传中 {progress}%')
+            print('上传中', data)
+
+    print("开始上传...")
+    try:
+        db.update_status(video_id, status=VideoStatus.UPLOADING)
+        download_progress.update_stage(video_id, DownloadStage.UPLOADING, 45, '开始上传')
+        with job_queue.stage(JobStage.UPLOAD):
+            await uploader.start()
+    except bilibili_api.exceptions.NetworkException as e:
+        msg = UPLOAD_FORBIDDEN_MSG
+        credential_service.invalidate()
+        download_progress.set_error(video_id, msg)
+        return False, msg
+    except bilibili_api.exceptions.ResponseCodeException as e:
+        msg = UPLOAD_CAPTCHA_MSG
+        download_progress.set_error(video_id, msg)
+        return False, msg
+    return True, None
+
+
+def _credential(session):
+    return Credential(
+        sessdata=session['SESSDATA'],
+        bili_jct=session['bili_jct'],
+        buvid3=session['buvid3']
+    )
+
+
+def _processed_video_path(record):
+    """已嵌入字幕（或封装了字幕流）的视频存在时优先使用，否则使用原视频"""
+    for suffix in ('with_srt', 'with_sub'):
+        path = add_suffix_to_filename(record['save_path'], suffix)
+        if os.path.exists(path):
+            return path
+    return record['save_path']
+
+
+async def upload_videos_batch(session, video_ids, title=None):
+    """
+    把多个已下载的视频作为同一稿件的多个分 P 投稿：各分 P 同时上传，最后只提交一次稿件信息。
+    稿件的分区、标签、封面取自第一个视频。
+    """
+    from utils.stringUtil import sanitize_title, sanitize_title_for_bilibili
+    db = VideoDB()
+    records = [db.read_video(video_id) for video_id in video_ids]
+    # 先检查全部视频，有一个不能投稿就都不动
+    for video_id, record in zip(video_ids, records):
+        if not record:
+            return False, f"视频 {video_id} 不存在"
+        if record['status'] != VideoStatus.DOWNLOADED:
+            return False, f"视频 {video_id} 未下载完成或正在投稿，不能合并投稿"
+    first_id, first = video_ids[0], records[0]
+    for video_id in video_ids:
+        download_progress.start_progress(str(video_id), '准备合并投稿')
+
+    def update_all(**args):
+        db.update_status_many(video_ids, **args)
+
+    def set_error_all(msg):
+        for video_id in video_ids:
+            download_progress.set_error(str(video_id), msg)
+
+    try:
+        pages = []
+        for video_id, record in zip(video_ids, records):
+            video_path = _processed_video_path(record)
+            print(f"视频 {video_id} 上传前检查:", make_upload_ready(video_path))
+            page_title = sanitize_title(cleaned_text(record['title']), max_len=80)
+            pages.append(video_uploader.VideoUploaderPage(
+                path=video_path,
+                title=page_title,
+                description=f"via. {record['origin_url']}"
+            ))
+
+        cover = find_or_extract_cover(first_id, first)
+        title = sanitize_title_for_bilibili(title or pages[0].title, max_len=80)
+        desc = '\n'.join(f"P{n} {page.title} | {record['origin_url']}" for n, (page, record) in enumerate(zip(pages, records), 1))
+        vu_data = {
+            'tid': first['tid'] if first['tid'] else 231,
+            'original': True,
+            'source': 'youtube',
+            'no_reprint': True,
+            'title': title,
+            'tags': first['tags'].split(',') if first['tags'] and len(first['tags']) else ['youtube'],
+            'desc': truncate_str(desc, 2000),
+            'cover': cover
+        }
+        uploader = ResumableVideoUploader(pages, video_uploader.VideoMeta(**vu_data), _credential(session), video_id=first_id)
+
+        @uploader.on("__ALL__")
+        async def ev(data):
+            if data['name'] == VideoUploaderEvents.COMPLETED.value:
+                update_all(status=VideoStatus.UPLOADED, save_cover=cover)
+                for video_id in video_ids:
+                    download_progress.complete_progress(str(video_id))
+                print('合并投稿完成', data)
+            elif data['name'] == VideoUploaderEvents.FAILED.value:
+                update_all(status=VideoStatus.ERROR)
+                set_error_all('合并投稿失败')
+                print('合并投稿失败', data)
+            elif data['name'] == UPLOAD_PROGRESS_EVENT:
+                progress = data['data'][0]['p']
+                for video_id in video_ids:
+                    download_progress.update_stage(str(video_id), DownloadStage.UPLOADING, 40 + progress * 0.6, f'合并投稿上传中 {progress}%')
+
+        print(f"开始合并投稿 {len(pages)} 个分P...")
+        try:
+            update_all(status=VideoStatus.UPLOADING)
+            with job_queue.stage(JobStage.UPLOAD):
+                await uploader.start()
+        except bilibili_api.exceptions.NetworkException as e:
+            credential_service.invalidate()
+            set_error_all(UPLOAD_FORBIDDEN_MSG)
+            return False, UPLOAD_FORBIDDEN_MSG
+        except bilibili_api.exceptions.ResponseCodeException as e:
+            set_error_all(UPLOAD_CAPTCHA_MSG)
+            return False, UPLOAD_CAPTCHA_MSG
+        return True, None
+    except Exception as e:
+        print(f"合并投稿出错: {e}")
+        set_error_all(str(e))
+        update_all(status=VideoStatus.ERROR)
+        raise
 
 
 async def do_upload(session, video_id):
@@ -30,18 +257,7 @@ async def do_upload(session, video_id):
         # ensure title is cleaned and legal for bilibili (<=80 chars)
         from utils.stringUtil import sanitize_title
         title = sanitize_title(cleaned_text(title), max_len=80)
-        save_dir, _ = os.path.split(video_path)
-        
-        download_progress.update_stage(video_id, DownloadStage.PREPARING_UPLOAD, 22, '检查封面...')
-        cover = find_cover_images(save_dir, orig_id)
-        if not cover:
-            cover_path = os.path.join(save_dir, f"{orig_id}.jpg")
-            if extract_cover_from_video(origin_video_path, cover_path):
-                cover = cover_path
-                print(f"已从视频提取封面: {cover}")
-            else:
-                download_progress.set_error(video_id, '封面不存在且无法从视频提取')
-                raise FileNotFoundError('封面不存在', record['origin_id'])
+        cover = find_or_extract_cover(video_id, record)
 
         if session['need_subtitle']:
             download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, 25, '开始处理字幕')
@@ -55,128 +271,70 @@ async def do_upload(session, video_id):
                 title=title,
                 video_path=video_path,
                 origin_video_path=origin_video_path,
-                progress_callback=subtitle_progress_callback
+                progress_callback=subtitle_progress_callback,
+                subtitle_mode=session.get('subtitle_mode')
             )
             title = subtitle_result['title']
             video_path = subtitle_result['video_path']
             subtitles_path = subtitle_result['subtitles_path']
             download_progress.update_stage(video_id, DownloadStage.PROCESSING_SUBTITLE, 39, '字幕处理完成')
 
-        db_update_args = {
-            "title": title,
-            "save_cover": cover,
-            "save_srt": subtitles_path
-        }
-
-        if not session['auto_upload']:
-            db_update_args.update({
-                "status": VideoStatus.DOWNLOADED
-            })
-            print("not need auto_upload", db_update_args)
-            db.update_video(video_id, **db_update_args)
-            download_progress.complete_progress(video_id)
-            return True, None
-
-        download_progress.update_stage(video_id, DownloadStage.UPLOADING, 40, '准备上传到B站')
-
-        args = {
-            "sessdata": session['SESSDATA'],
-            "bili_jct": session['bili_jct'],
-            "buvid3": session['buvid3']
-        }
-        credential = Credential(**args)
-
-        # include full original video name in description alongside origin URL
-        origin_name = record.get('origin_title') or record.get('title') or ''
-        desc = f"via. {record['origin_url']} | {origin_name}"
-
-        # Ensure the final title passed to the uploader is legal for bilibili
-        from utils.stringUtil import sanitize_title_for_bilibili
-        title = sanitize_title_for_bilibili(title, max_len=80)
-        tid = record['tid'] if record['tid'] else 231
-        tags = record['tags'].split(',') if record['tags'] and len(record['tags']) else ['youtube']
-        vu_data = {
-            'tid': tid,
-            'original': True,
-            'source': 'youtube',
-            'no_reprint': True,
-            'title': title,
-            'tags': tags,
-            'desc': desc,
-            'cover': cover
-        }
-        vu_meta = video_uploader.VideoMeta(**vu_data)
-        page = video_uploader.VideoUploaderPage(
-            path=video_path,
-            title=title,
-            description=desc
-        )
-        uploader = video_uploader.VideoUploader([page], vu_meta, credential)
-
-        @uploader.on("__ALL__")
-        async def ev(data, args=db_update_args):
-            if data['name'] == VideoUploaderEvents.COMPLETED.value:
-                args.update(pick(vu_data, ["desc", "tid", "tags"]))
-                args["status"] = VideoStatus.UPLOADED
-                db.update_video(video_id, **args)
-                download_progress.complete_progress(video_id)
-                print('上传完成', data)
-            elif data['name'] == VideoUploaderEvents.FAILED.value:
-                args["status"] = VideoStatus.ERROR
-                db.update_video(video_id, **args)
-                err_data = data.get('data', ())
-                err_msg = '上传失败'
-                if err_data and len(err_data) > 0:
-                    err_info = err_data[0]
-                    if isinstance(err_info, dict) and 'err' in err_info:
-                        err_msg = f"上传失败: {err_info['err']}"
-                    else:
-                        err_msg = f"上传失败: {err_info}"
-                download_progress.set_error(video_id, err_msg)
-                print('上传失败', data)
-            else:
-                if data['name'] == 'UPLOAD':
-                    progress = data.get('data', {}).get('p', 0)
-                    download_progress.update_stage(video_id, DownloadStage.UPLOADING, 40 + progress * 0.6, f'上传中 {progress}%')
-                print('上传中', data)
-
-        print("开始上传...")
-        try:
-            db.update_video(video_id, status=VideoStatus.UPLOADING)
-            download_progress.update_stage(video_id, DownloadStage.UPLOADING, 45, '开始上传')
-            await uploader.start()
-        except bilibili_api.exceptions.NetworkException as e:
-            msg = "bilibili_api 403，请尝试更新cookie信息"
-            download_progress.set_error(video_id, msg)
-            return False, msg
-        except bilibili_api.exceptions.ResponseCodeException as e:
-            msg = "需要输入验证码了，请稍后再投稿"
-            download_progress.set_error(video_id, msg)
-            return False, msg
-        return True, None
+        ready = make_upload_ready(video_path)
+        print(f"视频 {video_id} 上传前检查:", ready)
+        return await upload_video(session, video_id, record, title, video_path, cover, subtitles_path)
     except KeyboardInterrupt:
         print("\n用户中断了上传流程")
         download_progress.set_error(video_id, '用户中断操作')
-        db.update_video(video_id, status=VideoStatus.ERROR)
+        db.update_status(video_id, status=VideoStatus.ERROR)
         raise
     except Exception as e:
         print(f"上传过程出错: {e}")
         download_progress.set_error(video_id, str(e))
-        db.update_video(video_id, status=VideoStatus.ERROR)
+        db.update_status(video_id, status=VideoStatus.ERROR)
         raise
 
 
+def _reserve_submission():
+    """手动投稿同样占用投稿名额，与后台任务共用一个节奏"""
+    wait = upload_scheduler.reserve()
+    if wait > 0:
+        flash(f'投稿过于频繁，请约 {int(wait)} 秒后再试', 'warning')
+        return False
+    return True
+
+
 async def upload_controller(session):
     session['auto_upload'] = '1'
-    try:
-        bili = AccountUtil(config_path=join_root_path("config/bili_cookie.json"))
-        bili_cookies = bili.verify_cookie()
-        session.update(pick(bili_cookies, ["SESSDATA", "bili_jct", "buvid3"]))
-    except Exception as e:
-        raise(e)
+    bili_cookies = credential_service.get_cookies()
+    session.update(pick(bili_cookies, ["SESSDATA", "bili_jct", "buvid3"]))
     video_id = request.form.get('video_id')
+    if not _reserve_submission():
+        return redirect(url_for(Route.LIST))
     is_succ, msg = await do_upload(session, video_id)
     if not is_succ:
+        if msg == UPLOAD_CAPTCHA_MSG:
+            upload_scheduler.report_throttled()
         flash(msg, 'warning')
         return redirect(url_for(Route.LOGIN))
+    upload_scheduler.report_success()
+    return redirect(url_for(Route.LIST))
+
+
+async def batch_upload_controller(session):
+    """列表页勾选多个视频，合并为一个多P稿件投稿"""
+    video_ids = request.form.getlist('video_ids')
+    if len(video_ids) < 2:
+        flash('请至少选择两个视频', 'warning')
+        return redirect(url_for(Route.LIST))
+    bili_cookies = credential_service.get_cookies()
+    session.update(pick(bili_cookies, ["SESSDATA", "bili_jct", "buvid3"]))
+    if not _reserve_submission():
+        return redirect(url_for(Route.LIST))
+    is_succ, msg = await upload_videos_batch(session, video_ids, request.form.get('title') or None)
+    if not is_succ:
+        if msg == UPLOAD_CAPTCHA_MSG:
+            upload_scheduler.report_throttled()
+        flash(msg, 'warning')
+        return redirect(url_for(Route.LOGIN if msg in (UPLOAD_FORBIDDEN_MSG, UPLOAD_CAPTCHA_MSG) else Route.LIST))
+    upload_scheduler.report_success()
     return redirect(url_for(Route.LIST))
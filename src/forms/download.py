@@ -4,9 +4,6 @@ from wtforms import RadioField, StringField, IntegerField, SelectField, TextArea
 from wtforms.validators import DataRequired, URL
 
 class YouTubeDownloadForm(FlaskForm):
-    sessdata = StringField('Sessdata')
-    bili_jct = StringField('Bili_Jct')
-    buvid3 = StringField('Buvid3')
     video_url = StringField('Video URL', validators=[DataRequired(), URL()])
     resolution = SelectField('Resolution', choices=[
         ('1080', '1080p'), 
@@ -19,6 +16,11 @@ class YouTubeDownloadForm(FlaskForm):
         choices=[('en', '英文'), ('cn', '中文'), ('bilingual', '双语'), ('', '不添加')],
         default='en'
     )
+    subtitle_mode = RadioField(
+        '字幕方式',
+        choices=[('burn', '硬字幕（重新编码）'), ('soft', '软字幕（不重新编码）')],
+        default='burn'
+    )
     auto_upload = RadioField(
         '自动上传',
         choices=[('1', '是'), ('', '否')],
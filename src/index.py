@@ -4,16 +4,22 @@ import argparse
 import secrets
 import sys
 from functools import wraps
-from flask import Flask, session, request, flash, redirect, url_for, jsonify
+from flask import Flask, Response, session, request, flash, redirect, url_for, jsonify, stream_with_context
 from controllers.login import login_controller
 from controllers.download import download_controller
-from controllers.upload import upload_controller
+from controllers.pipeline import register_pipeline
+from controllers.upload import upload_controller, batch_upload_controller
 from controllers.delete import delete_controller
-from controllers.list import list_controller
+from controllers.list import list_controller, list_api_controller
 from controllers.pending import fetch_pending_list
 from utils.progress import download_progress
+from utils.job_queue import job_queue
 from utils.sys import clean_all_temp_video_files
+from utils.db import db_dir
+from utils.migrations import migrate
 
+# 启动前把数据库升级到最新版本
+migrate(f'{db_dir}/database.db')
 clean_all_temp_video_files()
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -98,11 +104,21 @@ def fetch_pending():
 async def upload():
     return await upload_controller(session)
 
+@app.route('/upload/batch', methods=['POST'])
+@login_required
+async def upload_batch():
+    return await batch_upload_controller(session)
+
 @app.route('/list', methods=['GET'])
 @login_required
 def list_page():
     return list_controller(session)
 
+@app.route('/api/videos', methods=['GET'])
+@login_required
+def list_videos_api():
+    return list_api_controller(session)
+
 @app.route('/api/download/progress/<video_id>', methods=['GET'])
 def get_download_progress(video_id):
     progress = download_progress.get_progress(video_id)
@@ -115,5 +131,23 @@ def get_all_download_progress():
     all_progress = download_progress.get_all_progress()
     return jsonify(list(all_progress.values()))
 
+@app.route('/api/download/progress/stream', methods=['GET'])
+def stream_download_progress():
+    """Server-Sent Events 推送进度变化；ids 为逗号分隔的视频ID，为空时推送全部"""
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or 0)
+    except ValueError:
+        return 'invalid since', 400
+    return Response(
+        stream_with_context(download_progress.sse_stream(since, ids or None)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == '__main__':
+    # debug 模式下 reloader 会启动父子两个进程，只在真正处理请求的子进程里启动工作线程
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        register_pipeline(job_queue)
+        job_queue.start()
     app.run(debug=True, host='0.0.0.0', port=args.port)
@@ -1,12 +1,16 @@
+import os
 import re
+import time
+import threading
 import requests
 import json
 from json import JSONDecodeError
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 from yt_dlp import YoutubeDL
 from .stringUtil import cleaned_text
 from .sys import join_root_path
 from ._exception import CookieException, ExceptionEnum
+from .settings import load_settings
 
 def load_app_accounts() -> List[Dict[str, Any]]:
     """
@@ -130,3 +134,92 @@ class AccountUtil:
         self.session.cookies['user_name'] = user_name
         return self.session.cookies
 
+
+CREDENTIAL_KEYS = ["SESSDATA", "bili_jct", "buvid3", "user_name"]
+
+
+class CredentialService:
+    """
+    缓存B站登录信息的校验结果，避免每次打开页面、每次上传都去抓取个人空间页面。
+
+    - 校验通过后缓存 ttl_seconds 秒；剩余不到 refresh_before_seconds 秒时先返回缓存，同时在后台重新校验
+    - 复用同一个 AccountUtil（即同一个 requests.Session 连接池）；每次调用都检查 cookie 配置文件，被修改后重新加载并校验
+    - 校验（网络请求）不持有锁，同一时间只有一个线程在校验，其他线程等它的结果
+    - 上传返回 403 时调用 invalidate()，下次使用前重新校验
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        self.config_path = config_path or join_root_path("config/bili_cookie.json")
+        self.clock: Callable[[], float] = time.monotonic
+        self._lock = threading.Lock()
+        self._verified = threading.Condition(self._lock)
+        self._account: Optional[AccountUtil] = None
+        self._config_mtime = None
+        self._cookies: Optional[Dict[str, str]] = None
+        self._verified_at = 0.0
+        self._verifying = False
+        self._refreshing = False
+
+    def _settings(self):
+        settings = load_settings('credential')
+        return float(settings.get('ttl_seconds') or 0), float(settings.get('refresh_before_seconds') or 0)
+
+    def _read_mtime(self):
+        return os.path.getmtime(self.config_path) if os.path.exists(self.config_path) else None
+
+    def _verify(self, mtime) -> Dict[str, str]:
+        """在锁外执行；调用方保证同一时间只有一个线程在校验"""
+        if self._account is None or mtime != self._config_mtime:
+            self._account = AccountUtil(config_path=self.config_path)
+        cookies = self._account.verify_cookie()
+        with self._lock:
+            self._cookies = {key: cookies[key] for key in CREDENTIAL_KEYS}
+            self._config_mtime = mtime
+            self._verified_at = self.clock()
+            print("bilibili 登录信息有效：%s" % self._cookies['user_name'])
+            return dict(self._cookies)
+
+    def get_cookies(self, force: bool = False) -> Dict[str, str]:
+        """返回 {SESSDATA, bili_jct, buvid3, user_name}；登录信息无效时抛出 CookieException"""
+        ttl, refresh_before = self._settings()
+        mtime = self._read_mtime()
+        with self._lock:
+            while True:
+                age = self.clock() - self._verified_at
+                if not (force or self._cookies is None or age >= ttl or mtime != self._config_mtime):
+                    if age >= ttl - refresh_before and not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._refresh, name='credential-refresh', daemon=True).start()
+                    return dict(self._cookies)
+                if not self._verifying:
+                    break
+                # 其他线程正在校验，用它的结果；它失败了再自己校验
+                self._verified.wait()
+                force = False
+            self._verifying = True
+        try:
+            return self._verify(mtime)
+        finally:
+            with self._lock:
+                self._verifying = False
+                self._verified.notify_all()
+
+    def _refresh(self):
+        try:
+            self.get_cookies(force=True)
+        except CookieException as e:
+            print(f"后台校验B站登录信息失败: {e}")
+            self.invalidate()
+        except Exception as e:
+            # 网络错误时保留缓存，到期后再同步校验
+            print(f"后台校验B站登录信息出错: {e}")
+        finally:
+            self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._cookies = None
+            self._verified_at = 0.0
+
+
+credential_service = CredentialService()
@@ -6,9 +6,10 @@ class Route(str, Enum):
     LIST = 'list_page'
     PREVIEW = 'preview'
     UPLOAD = 'upload'
+    UPLOAD_BATCH = 'upload_batch'
     DOWNLOAD_PROGRESS = 'download_progress'
 
-# 注意和 schema.sql 的同步
+# 注意和 migrations.py 中 videos 表的同步
 class VideoStatus(str, Enum):
     PENDING = 'pending'
     DOWNLOADING = 'downloading'
@@ -17,6 +18,32 @@ class VideoStatus(str, Enum):
     UPLOADED = 'uploaded'
     ERROR = 'error'
 
+# 注意和 db.py 中 jobs 表的同步
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    ERROR = 'error'
+
+# 任务流水线中各阶段，名称与 settings.json 中 workers.stage_limits 的键一致
+class JobStage(str, Enum):
+    FETCH_INFO = 'fetch_info'
+    DOWNLOAD = 'download'
+    SUBTITLE = 'subtitle'
+    BURN_IN = 'burn_in'
+    PREPARE_UPLOAD = 'prepare_upload'
+    UPLOAD = 'upload'
+
+
+class SubtitleMode(str, Enum):
+    BURN = 'burn'  # 烧录进画面，需要重新编码
+    SOFT = 'soft'  # 作为 mov_text 字幕流封装，不重新编码
+
+class UploadReadiness(str, Enum):
+    READY = 'ready'          # 编码与文件结构都可以直接上传
+    FASTSTART = 'faststart'  # 只需 -c copy 重新封装（moov 移到文件头或换成 mp4 容器）
+    TRANSCODE = 'transcode'  # 编码不被B站支持，需要重新编码
+
 class DownloadStage(str, Enum):
     PREPARING = 'preparing'
     FETCHING_INFO = 'fetching_info'
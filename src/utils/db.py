@@ -1,6 +1,12 @@
+import atexit
+import re
 import sqlite3
 import json
+import threading
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
+from .migrations import migrate
 from .sys import join_root_path
 
 # 在数据库类初始化时添加类型适配器
@@ -13,17 +19,244 @@ sqlite3.register_converter("JSON", convert_list)
 
 db_dir = join_root_path('db')
 
+# busy_timeout：其他连接正在写入时最多等待的毫秒数；WAL 模式下 synchronous=NORMAL 已足够安全
+DB_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+
+
+class _ThreadConnections:
+    """一个线程打开的连接（db_path -> 连接），只由该线程的 threading.local 持有，线程结束时随之关闭"""
+
+    def __init__(self):
+        self.by_path = {}
+
+    def close(self):
+        connections, self.by_path = self.by_path, {}
+        for conn in connections.values():
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+    def __del__(self):
+        self.close()
+
+
+class ConnectionManager:
+    """
+    每个线程、每个数据库文件只打开一个连接，并在线程内复用。
+
+    - 连接打开时设置 WAL、synchronous、busy_timeout，读写可以并发，写入冲突时等待而不是报 database is locked
+    - 长期复用的连接会缓存预编译的语句（cached_statements），相同的 SQL 不再重复解析
+    - 连接只由线程自己的 threading.local 持有，线程退出（例如 Flask 处理完请求的线程）后自动关闭；
+      工作线程也可以提前调用 close_thread()，进程退出时调用 close_all()
+    """
+
+    def __init__(self, cached_statements = 256):
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 弱引用：这里不能让已退出线程的连接继续存活
+        self._holders = weakref.WeakSet()
+
+    def get(self, db_path):
+        holder = getattr(self._local, 'connections', None)
+        if holder is None:
+            holder = self._local.connections = _ThreadConnections()
+            with self._lock:
+                self._holders.add(holder)
+        conn = holder.by_path.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(
+                db_path,
+                timeout=DB_PRAGMAS['busy_timeout'] / 1000,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                cached_statements=self.cached_statements,
+                # 只在本线程使用；close_all() 会在其他线程关闭它
+                check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row  # 设置row_factory，以便查询时使用字典结果
+            for name, value in DB_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name} = {value};")
+            print('db connect: path', db_path, threading.current_thread().name)
+            holder.by_path[db_path] = conn
+        return conn
+
+    def open_count(self):
+        """当前仍打开的连接数"""
+        with self._lock:
+            return sum(len(holder.by_path) for holder in self._holders)
+
+    def close_thread(self):
+        """关闭当前线程打开的连接"""
+        holder = self._local.__dict__.pop('connections', None)
+        if holder is not None:
+            with self._lock:
+                self._holders.discard(holder)
+            holder.close()
+
+    def close_all(self):
+        with self._lock:
+            holders = list(self._holders)
+        for holder in holders:
+            holder.close()
+
+
+connections = ConnectionManager()
+atexit.register(connections.close_all)
+
+
+# 写入后需要立即落盘的视频状态：这些状态会马上展示给用户或决定后续流程
+DURABLE_VIDEO_STATUSES = ('downloaded', 'uploaded', 'error')
+
+
+class VideoStatusWriter:
+    """
+    视频状态的延迟合并写入。
+
+    - 同一视频在两次落盘之间的多次更新合并为一次 UPDATE，后写的字段覆盖先写的
+    - 后台线程每隔 flush_interval 秒把积攒的更新放在一个事务里写入
+    - 写入 DURABLE_VIDEO_STATUSES 中的状态或 durable=True 时，在返回前同步落盘（连同之前积攒的更新）
+    - 落盘串行进行，同一视频的更新按调用顺序生效；VideoDB 读取前会先落盘，读到的总是最新数据
+    """
+
+    def __init__(self, flush_interval = 0.5):
+        self.flush_interval = flush_interval
+        self._pending = OrderedDict()  # (db_path, video_id) -> 合并后的字段
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def update(self, db_path, video_ids, fields, durable = None):
+        if not fields:
+            return
+        with self._lock:
+            for video_id in video_ids:
+                self._pending.setdefault((db_path, str(video_id)), {}).update(fields)
+        if durable is None:
+            durable = fields.get('status') in DURABLE_VIDEO_STATUSES
+        if durable:
+            self.flush(db_path)
+        else:
+            self._ensure_thread()
+
+    def discard(self, db_path, video_id):
+        """视频被删除时丢弃尚未写入的更新"""
+        with self._lock:
+            self._pending.pop((db_path, str(video_id)), None)
+
+    def has_pending(self, db_path = None):
+        with self._lock:
+            return any(db_path is None or key[0] == db_path for key in self._pending)
+
+    def flush(self, db_path = None):
+        """把积攒的更新写入数据库，返回写入的视频数；db_path 为空时写入所有数据库"""
+        with self._flush_lock:
+            with self._lock:
+                batch = OrderedDict(
+                    (key, self._pending.pop(key)) for key in list(self._pending)
+                    if db_path is None or key[0] == db_path
+                )
+            if not batch:
+                return 0
+            by_path = OrderedDict()
+            for (path, video_id), fields in batch.items():
+                by_path.setdefault(path, []).append((video_id, fields))
+            try:
+                try:
+                    for path, updates in by_path.items():
+                        self._write(path, updates)
+                except sqlite3.IntegrityError:
+                    # 违反约束（如不合法的状态值）的更新重试也不会成功：逐条重写，丢弃出错的那条，不放回队列
+                    for path, updates in by_path.items():
+                        for video_id, fields in updates:
+                            try:
+                                self._write(path, [(video_id, fields)])
+                            except sqlite3.IntegrityError as e:
+                                print(f"丢弃无法写入的视频状态 {video_id} {fields}: {e}")
+                                batch.pop((path, video_id))
+            except Exception:
+                # 写入失败时放回队列，之后的更新仍然覆盖在上面
+                with self._lock:
+                    for key, fields in batch.items():
+                        fields.update(self._pending.pop(key, {}))
+                    self._pending = OrderedDict(list(batch.items()) + list(self._pending.items()))
+                raise
+            print('DB FLUSH_VIDEO_STATUS', len(batch))
+            return len(batch)
+
+    @staticmethod
+    def _write(path, updates):
+        # 一个数据库的所有更新放在同一个事务里，只提交一次
+        with connections.get(path) as conn:
+            for video_id, fields in updates:
+                set_clause = ', '.join([f"{key} = ?" for key in fields])
+                conn.execute(f"UPDATE videos SET {set_clause} WHERE id = ?;", list(fields.values()) + [video_id])
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='video-status-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"写入视频状态失败，稍后重试: {e}")
+        finally:
+            connections.close_thread()
+
+    def close(self):
+        """停止后台线程并写入剩余的更新"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+status_writer = VideoStatusWriter()
+atexit.register(status_writer.close)
+
+
 class BaseORM:
+    """
+    各表的数据访问对象。实例本身很轻：连接来自 ConnectionManager（线程内共享），
+    游标按线程创建，所以同一个实例也可以在多个线程中使用。
+    表结构由 migrations.py 维护，每个数据库文件在进程内第一次使用时升级到最新版本。
+    """
+    _migrated_paths = set()
+    _migrate_lock = threading.Lock()
+
     def __init__(self, db_name):
-        db_path = f"{db_dir}/{db_name}"
-        self.conn = sqlite3.connect(db_path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
-        self.conn.row_factory = sqlite3.Row  # 设置row_factory，以便查询时使用字典结果
-        print('db __init__: path', db_path)
-        self.cursor = self.conn.cursor()
+        self.db_path = f"{db_dir}/{db_name}"
+        self._local = threading.local()
+        with self._migrate_lock:
+            if self.db_path not in self._migrated_paths:
+                migrate(self.db_path)
+                self._migrated_paths.add(self.db_path)
 
-    def __del__(self):
-        if hasattr(self, 'conn') and self.conn:
-            self.conn.close()
+    @property
+    def conn(self):
+        return connections.get(self.db_path)
+
+    @property
+    def cursor(self):
+        conn = self.conn
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None or cursor.connection is not conn:
+            cursor = self._local.cursor = conn.cursor()
+        return cursor
 
     @contextmanager
     def transaction(self):
@@ -51,15 +284,17 @@ class VideoDB(BaseORM):
             return self.cursor.lastrowid
 
     def read_video(self, id):
-        """根据ID读取视频记录"""
+        """根据ID读取视频记录，不存在时返回 None"""
+        status_writer.flush(self.db_path)
         with self.transaction():
             query = f"SELECT * FROM {self.table_name} WHERE id = ? ;"
             self.cursor.execute(query, (id,))
             row = self.cursor.fetchone()
-            return dict(row)
+            return dict(row) if row else None
     
     def query_video_by_origin_id(self, user, origin_id):
         """根据 user 和 origin_id 查询是否已存在该视频记录"""
+        status_writer.flush(self.db_path)
         with self.transaction():
             query = f"SELECT * FROM {self.table_name} WHERE user = ? AND origin_id = ?;"
             self.cursor.execute(query, (user, origin_id))
@@ -67,29 +302,342 @@ class VideoDB(BaseORM):
             return dict(row) if row else None
 
     def list_videos(self, user):
-        """列出所有视频记录"""
+        """列出所有视频记录，新的在前"""
+        status_writer.flush(self.db_path)
         with self.transaction():
-            query = f"SELECT * FROM {self.table_name} WHERE user = {user};"
-            self.cursor.execute(query)
-            # return self.cursor.fetchall()
+            query = f"SELECT * FROM {self.table_name} WHERE user = ? ORDER BY created DESC, id DESC;"
+            self.cursor.execute(query, (user,))
             return [dict(row) for row in self.cursor.fetchall()]  # 转换为字典列表
 
-    def update_video(self, id, **kwargs):
-        print('DB UPDATE_VIDEO', id, kwargs)
-        """根据ID更新视频记录"""
-        set_clause = ', '.join([f"{key} = ?" for key in kwargs])
+    def list_videos_page(self, user, limit = 20, cursor = None, status = None, since = None, until = None, title = None):
+        """
+        按 (created, id) 倒序分页列出视频，返回 (视频列表, 下一页的 cursor)；没有下一页时 cursor 为 None。
+
+        cursor 为上一页最后一条的 "created|id"（keyset 分页，翻页深度不影响速度）；
+        status 精确匹配，since / until 为 'YYYY-MM-DD'（包含当天），title 为标题中包含的文字。
+        """
+        where = ["user = ?"]
+        params = [user]
+        if cursor:
+            created, _, last_id = cursor.rpartition('|')
+            where.append("(created, id) < (?, ?)")
+            params.extend([created, int(last_id)])
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if since:
+            where.append("created >= ?")
+            params.append(since)
+        if until:
+            where.append("created < date(?, '+1 day')")
+            params.append(until)
+        if title:
+            where.append("title LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([\\%_])', r'\\\1', title) + '%')
+        status_writer.flush(self.db_path)
+        query = f"""
+        SELECT * FROM {self.table_name}
+        WHERE {' AND '.join(where)}
+        ORDER BY created DESC, id DESC
+        LIMIT ?;
+        """
         with self.transaction():
-            query = f"""
-            UPDATE {self.table_name}
-            SET {set_clause}
-            WHERE id = ?;
-            """
-            values = list(kwargs.values()) + [id]
-            self.cursor.execute(query, values)
+            self.cursor.execute(query, params + [limit + 1])
+            rows = [dict(row) for row in self.cursor.fetchall()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created']}|{rows[-1]['id']}"
+        return rows, next_cursor
+
+    def update_video(self, id, **kwargs):
+        """根据ID更新视频记录，返回前写入数据库；与 update_status 积攒的更新按调用顺序生效"""
+        print('DB UPDATE_VIDEO', id, list(kwargs))
+        status_writer.update(self.db_path, [id], kwargs, durable=True)
+
+    def update_status(self, id, **kwargs):
+        """更新视频状态等频繁变化的字段，由 status_writer 合并后批量写入；终态在返回前落盘"""
+        status_writer.update(self.db_path, [id], kwargs)
+
+    def update_status_many(self, ids, **kwargs):
+        """同时更新多个视频，终态在同一个事务里落盘"""
+        status_writer.update(self.db_path, ids, kwargs)
 
     def delete_video(self, id):
         """根据ID删除视频记录"""
         with self.transaction():
             query = f"DELETE FROM {self.table_name} WHERE id = ?;"
             print('DB DELETE_VIDEO', query, id)
+            status_writer.discard(self.db_path, id)
             self.cursor.execute(query, (id,))
+
+
+class JobDB(BaseORM):
+    """后台任务队列，任务持久化在 jobs 表中，进程重启后可以继续执行"""
+
+    def __init__(self, db_name = 'database.db'):
+        super().__init__(db_name)
+        self.table_name = 'jobs'
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        if isinstance(job.get('payload'), str):
+            job['payload'] = json.loads(job['payload'])
+        return job
+
+    def create_job(self, user, stage, payload, temp_id = None, video_id = None):
+        """新增一个排队中的任务"""
+        with self.transaction():
+            query = f"""
+            INSERT INTO {self.table_name} (user, stage, payload, temp_id, video_id)
+            VALUES (?, ?, ?, ?, ?);
+            """
+            self.cursor.execute(query, (user, stage, json.dumps(payload), temp_id, video_id))
+            return self.cursor.lastrowid
+
+    def read_job(self, id):
+        with self.transaction():
+            self.cursor.execute(f"SELECT * FROM {self.table_name} WHERE id = ?;", (id,))
+            return self._to_dict(self.cursor.fetchone())
+
+    def claim_next_job(self, stages = None):
+        """
+        取出最早的一个可执行任务并标记为 running。
+        通过带状态条件的 UPDATE 抢占，多个线程/进程同时领取时只有一个会成功；
+        条件中带上 stage 和 attempts，避免读到的旧行在任务进入下一阶段后被误领取。
+        """
+        where = "status = 'queued' AND run_after <= CURRENT_TIMESTAMP"
+        params = []
+        if stages:
+            where += f" AND stage IN ({', '.join('?' for _ in stages)})"
+            params.extend(stages)
+        while True:
+            with self.transaction():
+                self.cursor.execute(
+                    f"SELECT * FROM {self.table_name} WHERE {where} ORDER BY id LIMIT 1;",
+                    params
+                )
+                row = self.cursor.fetchone()
+                if row is None:
+                    return None
+                job = self._claim(row)
+                if job:
+                    return job
+
+    def _claim(self, row):
+        """按读到的行抢占任务；行已过期（任务已被领取、进入下一阶段或重新排队）时返回 None"""
+        self.cursor.execute(
+            f"""
+            UPDATE {self.table_name}
+            SET status = 'running', attempts = attempts + 1, updated = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'queued' AND stage = ? AND attempts = ?;
+            """,
+            (row['id'], row['stage'], row['attempts'])
+        )
+        if self.cursor.rowcount != 1:
+            return None
+        job = self._to_dict(row)
+        job['status'] = 'running'
+        job['attempts'] += 1
+        return job
+
+    def update_job(self, id, **kwargs):
+        """根据ID更新任务，payload 会自动序列化"""
+        if 'payload' in kwargs and not isinstance(kwargs['payload'], str):
+            kwargs['payload'] = json.dumps(kwargs['payload'])
+        set_clause = ', '.join([f"{key} = ?" for key in kwargs] + ["updated = CURRENT_TIMESTAMP"])
+        with self.transaction():
+            query = f"UPDATE {self.table_name} SET {set_clause} WHERE id = ?;"
+            self.cursor.execute(query, list(kwargs.values()) + [id])
+
+    def retry_job(self, id, delay_seconds, error = None, payload = None):
+        """把任务放回队列，delay_seconds 秒后才能被再次领取；payload 不为空时一并保存"""
+        with self.transaction():
+            query = f"""
+            UPDATE {self.table_name}
+            SET status = 'queued', error = ?, updated = CURRENT_TIMESTAMP,
+                run_after = datetime(CURRENT_TIMESTAMP, ?), payload = COALESCE(?, payload)
+            WHERE id = ?;
+            """
+            self.cursor.execute(query, (error, f"+{int(delay_seconds)} seconds", self._dump(payload), id))
+
+    def defer_job(self, id, delay_seconds, reason = None, payload = None):
+        """推迟任务（例如等待上传名额），不计入失败次数；payload 不为空时一并保存"""
+        with self.transaction():
+            query = f"""
+            UPDATE {self.table_name}
+            SET status = 'queued', error = ?, attempts = MAX(attempts - 1, 0), updated = CURRENT_TIMESTAMP,
+                run_after = datetime(CURRENT_TIMESTAMP, ?), payload = COALESCE(?, payload)
+            WHERE id = ?;
+            """
+            self.cursor.execute(query, (reason, f"+{int(delay_seconds)} seconds", self._dump(payload), id))
+
+    @staticmethod
+    def _dump(payload):
+        return json.dumps(payload) if payload is not None and not isinstance(payload, str) else payload
+
+    def requeue_running_jobs(self):
+        """进程启动时调用：上次未执行完的任务重新排队"""
+        with self.transaction():
+            self.cursor.execute(
+                f"UPDATE {self.table_name} SET status = 'queued', updated = CURRENT_TIMESTAMP WHERE status = 'running';"
+            )
+            return self.cursor.rowcount
+
+    def count_jobs(self, status):
+        with self.transaction():
+            self.cursor.execute(f"SELECT COUNT(*) FROM {self.table_name} WHERE status = ?;", (status,))
+            return self.cursor.fetchone()[0]
+
+class ProbeDB(BaseORM):
+    """ffprobe 结果缓存，按 (路径, 大小, 修改时间) 判断是否仍然有效"""
+
+    def __init__(self, db_name = 'database.db'):
+        super().__init__(db_name)
+        self.table_name = 'probe_cache'
+
+    def read_probe(self, path, size, mtime):
+        """文件大小和修改时间都一致时返回缓存的数据，否则返回 None"""
+        with self.transaction():
+            self.cursor.execute(
+                f"SELECT data FROM {self.table_name} WHERE path = ? AND size = ? AND mtime = ?;",
+                (path, size, mtime)
+            )
+            row = self.cursor.fetchone()
+        return row['data'] if row else None
+
+    def save_probe(self, path, size, mtime, data):
+        with self.transaction():
+            query = f"""
+            INSERT OR REPLACE INTO {self.table_name} (path, size, mtime, data, updated)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP);
+            """
+            self.cursor.execute(query, (path, size, mtime, json.dumps(data)))
+
+class UploadSessionDB(BaseORM):
+    """
+    分块上传的会话（preupload 返回的 upload_id、endpoint 等）以及已上传的分块，
+    上传中断后按 (路径, 大小, 修改时间) 找回会话，只上传剩下的分块
+    """
+
+    def __init__(self, db_name = 'database.db'):
+        super().__init__(db_name)
+        self.table_name = 'upload_sessions'
+
+    def find_session(self, path, size, mtime, max_age_hours):
+        """返回未过期的会话，过期的会话一并删除"""
+        with self.transaction():
+            self.cursor.execute(
+                f"SELECT id FROM {self.table_name} WHERE created < datetime('now', ?);",
+                (f'-{float(max_age_hours)} hours',)
+            )
+            expired = [row['id'] for row in self.cursor.fetchall()]
+            for session_id in expired:
+                self._delete(session_id)
+            self.cursor.execute(
+                f"SELECT * FROM {self.table_name} WHERE path = ? AND size = ? AND mtime = ? ORDER BY id DESC LIMIT 1;",
+                (path, size, mtime)
+            )
+            row = self.cursor.fetchone()
+        return dict(row) if row else None
+
+    def create_session(self, video_id, path, size, mtime, preupload):
+        with self.transaction():
+            self.cursor.execute(
+                f"INSERT INTO {self.table_name} (video_id, path, size, mtime, preupload) VALUES (?, ?, ?, ?, ?);",
+                (video_id, path, size, mtime, json.dumps(preupload))
+            )
+            return self.cursor.lastrowid
+
+    def uploaded_chunks(self, session_id):
+        with self.transaction():
+            self.cursor.execute("SELECT chunk_number FROM upload_chunks WHERE session_id = ?;", (session_id,))
+            return {row['chunk_number'] for row in self.cursor.fetchall()}
+
+    def mark_chunk(self, session_id, chunk_number):
+        with self.transaction():
+            self.cursor.execute(
+                "INSERT OR IGNORE INTO upload_chunks (session_id, chunk_number) VALUES (?, ?);",
+                (session_id, chunk_number)
+            )
+            self.cursor.execute(
+                f"UPDATE {self.table_name} SET updated = CURRENT_TIMESTAMP WHERE id = ?;", (session_id,)
+            )
+
+    def complete_session(self, session_id, result):
+        """分 P 已提交，记录结果；之后只差投稿时可以直接复用"""
+        with self.transaction():
+            self.cursor.execute(
+                f"UPDATE {self.table_name} SET result = ?, updated = CURRENT_TIMESTAMP WHERE id = ?;",
+                (json.dumps(result), session_id)
+            )
+            self.cursor.execute("DELETE FROM upload_chunks WHERE session_id = ?;", (session_id,))
+
+    def delete_session(self, session_id):
+        with self.transaction():
+            self._delete(session_id)
+
+    def _delete(self, session_id):
+        self.cursor.execute("DELETE FROM upload_chunks WHERE session_id = ?;", (session_id,))
+        self.cursor.execute(f"DELETE FROM {self.table_name} WHERE id = ?;", (session_id,))
+
+
+class ProgressDB(BaseORM):
+    """
+    下载/上传进度，供多个进程共享，重启后保留。
+    每次写入都会得到新的 seq（AUTOINCREMENT 不会复用），推送时按 seq 取增量
+    """
+
+    def __init__(self, db_name = 'database.db'):
+        super().__init__(db_name)
+        self.table_name = 'progress'
+
+    @staticmethod
+    def _to_dict(row):
+        data = row['data']  # JSON 列由 convert_list 解析
+        data['seq'] = row['seq']
+        return data
+
+    def read_progress(self, video_id):
+        with self.transaction():
+            self.cursor.execute(f"SELECT seq, data FROM {self.table_name} WHERE video_id = ?;", (video_id,))
+            row = self.cursor.fetchone()
+        return self._to_dict(row) if row else None
+
+    def save_progress(self, video_id, data):
+        """写入（替换）一条进度，返回新的 seq"""
+        with self.transaction():
+            query = f"""
+            INSERT OR REPLACE INTO {self.table_name} (video_id, completed, updated_at, data)
+            VALUES (?, ?, ?, ?);
+            """
+            self.cursor.execute(query, (video_id, int(bool(data.get('completed'))), data['updated_at'], json.dumps(data)))
+            return self.cursor.lastrowid
+
+    def delete_progress(self, video_id):
+        with self.transaction():
+            self.cursor.execute(f"DELETE FROM {self.table_name} WHERE video_id = ?;", (video_id,))
+
+    def progress_since(self, seq = 0):
+        """seq 之后写入的进度，按写入顺序"""
+        with self.transaction():
+            self.cursor.execute(f"SELECT seq, data FROM {self.table_name} WHERE seq > ? ORDER BY seq;", (seq,))
+            return [self._to_dict(row) for row in self.cursor.fetchall()]
+
+    def last_seq(self):
+        with self.transaction():
+            self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", (self.table_name,))
+            row = self.cursor.fetchone()
+            return row['seq'] if row else 0
+
+    def delete_finished_before(self, updated_at):
+        """删除 updated_at 之前已结束的进度，返回删除的条数"""
+        with self.transaction():
+            self.cursor.execute(
+                f"DELETE FROM {self.table_name} WHERE completed = 1 AND updated_at < ?;",
+                (updated_at,)
+            )
+            return self.cursor.rowcount
@@ -0,0 +1,110 @@
+"""
+嵌入字幕时的 ffmpeg 编码参数。
+
+- 编码配置来自 settings.json 的 encode 段，按分辨率（per_resolution）覆盖默认值
+- SRT 在进程内转换为 ASS，不再单独运行一次 ffmpeg
+- 只有一个 ass 滤镜：一次解码、一次编码，音频直接复制，并加上 +faststart 便于上传
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+from .settings import load_settings
+from .probe import probe_resolution
+from .srt_stream import iter_cues
+
+# 支持 preset / crf / tune 的软件编码器；其他编码器（如硬件编码）只使用码率
+_X26X_ENCODERS = ('libx264', 'libx265')
+
+
+def guess_resolution(path: str) -> Optional[str]:
+    """从 '<id>.<resolution>.mp4' 形式的文件名中取出分辨率"""
+    match = re.search(r'\.(\d{3,4})(?:\.tmp)?(?:\.with_srt)?\.mp4$', os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def encode_resolution(path: str, resolution: Optional[str] = None) -> Optional[str]:
+    """选择编码配置用的分辨率：任务参数 > 文件名 > ffprobe 缓存中的视频高度"""
+    return resolution or guess_resolution(path) or probe_resolution(path)
+
+
+def resolve_encode_profile(resolution: Optional[str] = None) -> Dict[str, Any]:
+    settings = load_settings('encode')
+    per_resolution = settings.pop('per_resolution', {}) or {}
+    if resolution is not None:
+        settings.update(per_resolution.get(str(resolution), {}))
+    return settings
+
+
+def encode_args(profile: Dict[str, Any], audio: bool = True) -> List[str]:
+    codec = profile.get('video_codec') or 'libx264'
+    args = ['-c:v', codec]
+    if codec in _X26X_ENCODERS:
+        if profile.get('preset'):
+            args += ['-preset', str(profile['preset'])]
+        if profile.get('tune'):
+            args += ['-tune', str(profile['tune'])]
+    if profile.get('video_bitrate'):
+        bitrate = str(profile['video_bitrate'])
+        args += ['-b:v', bitrate, '-maxrate', bitrate, '-bufsize', str(profile.get('bufsize') or bitrate)]
+    elif codec in _X26X_ENCODERS and profile.get('crf') is not None:
+        args += ['-crf', str(profile['crf'])]
+    if profile.get('threads'):
+        args += ['-threads', str(profile['threads'])]
+    if audio:
+        args += ['-c:a', profile.get('audio_codec') or 'copy']
+    if profile.get('faststart', True):
+        args += ['-movflags', '+faststart']
+    return args
+
+
+def _ass_time(ms: int) -> str:
+    cs = int(ms) // 10
+    hh, cs = divmod(cs, 360000)
+    mm, cs = divmod(cs, 6000)
+    ss, cs = divmod(cs, 100)
+    return f"{hh:d}:{mm:02d}:{ss:02d}.{cs:02d}"
+
+
+def _ass_text(content: str) -> str:
+    # 去掉 SRT 的 <i> 等标签，转义 ASS 的花括号，换行使用 \N
+    text = re.sub(r'</?[a-zA-Z][^>]*>', '', content)
+    text = text.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}')
+    return text.replace('\r\n', '\n').replace('\n', '\\N')
+
+
+def srt_to_ass(srt_path: str, ass_path: str, font_name: Optional[str] = None, font_size: int = 16) -> str:
+    """把 SRT 转为 ASS（样式与 ffmpeg subtitles 滤镜的默认样式相近），返回 ass_path"""
+    font = font_name or 'Arial'
+    with open(ass_path, 'w', encoding='utf-8') as f:
+        f.write(
+            "[Script Info]\n"
+            "ScriptType: v4.00+\n"
+            "PlayResX: 384\n"
+            "PlayResY: 288\n"
+            "WrapStyle: 0\n"
+            "ScaledBorderAndShadow: yes\n"
+            "\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+            f"Style: Default,{font},{font_size},&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+            "0,0,0,0,100,100,0,0,1,1,0,2,10,10,10,1\n"
+            "\n"
+            "[Events]\n"
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+        for cue in iter_cues(srt_path):
+            if cue.start_ms is None or cue.end_ms is None:
+                continue
+            f.write(
+                f"Dialogue: 0,{_ass_time(cue.start_ms)},{_ass_time(cue.end_ms)},Default,,0,0,0,,"
+                f"{_ass_text(cue.content)}\n"
+            )
+    return ass_path
+
+
+def escape_filter_path(path: str) -> str:
+    """转义滤镜参数中的路径（':'、'\\'、引号在 filtergraph 中有特殊含义）"""
+    path = path.replace('\\', '/')
+    return path.replace(':', '\\:').replace("'", "\\'").replace(',', '\\,')
@@ -0,0 +1,127 @@
+"""
+运行 ffmpeg 并通过 -progress pipe:1 读取结构化进度。
+
+ffmpeg 的日志（stderr）不再逐行打印，只保留最后若干行，出错时附在异常信息中。
+"""
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+STDERR_TAIL_LINES = 40
+
+
+class FFmpegError(subprocess.CalledProcessError):
+    """ffmpeg 非零退出；stderr 为最后 STDERR_TAIL_LINES 行日志"""
+
+    def __str__(self):
+        tail = (self.stderr or '').strip()
+        return f"ffmpeg exited with status {self.returncode}" + (f":\n{tail}" if tail else '')
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    try:
+        return float(value.rstrip('x'))
+    except ValueError:
+        return None
+
+
+def _to_metrics(raw: Dict[str, str]) -> Dict:
+    """把 -progress 输出的 key=value 转为数值；out_time_ms 与 out_time_us 实际都是微秒"""
+    out_us = raw.get('out_time_us') or raw.get('out_time_ms')
+    metrics = {
+        'frame': int(raw['frame']) if raw.get('frame', '').isdigit() else None,
+        'fps': None,
+        'speed': _parse_speed(raw.get('speed', '')),
+        'bitrate': raw.get('bitrate'),
+        'out_time_ms': None,
+        'progress': raw.get('progress'),
+    }
+    try:
+        metrics['fps'] = float(raw.get('fps', ''))
+    except ValueError:
+        pass
+    if out_us and out_us.lstrip('-').isdigit():
+        metrics['out_time_ms'] = max(0, int(out_us)) // 1000
+    return metrics
+
+
+def run_ffmpeg(
+    args: List[str],
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    total_duration: Optional[float] = None,
+    metrics_callback: Optional[Callable[[Dict], None]] = None,
+    min_interval: float = 0.5,
+    message: str = '正在嵌入字幕...'
+) -> Dict:
+    """
+    运行 ffmpeg，返回最后一次的进度指标 {frame, fps, speed, bitrate, out_time_ms, progress}。
+
+    progress_callback(percent, message) 需要 total_duration（秒），与 run_cli_command 的回调兼容；
+    metrics_callback 收到完整的指标字典。两个回调都按 min_interval 秒节流，结束时再调用一次。
+    失败时抛出 FFmpegError，其中带有 stderr 的最后几行。
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-nostats', '-progress', 'pipe:1'] + list(args)
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        bufsize=1,
+    )
+    tail = deque(maxlen=STDERR_TAIL_LINES)
+
+    def drain_stderr():
+        for line in process.stderr:
+            tail.append(line.rstrip())
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    raw: Dict[str, str] = {}
+    metrics: Dict = {}
+    last_emit: Optional[float] = None
+    last_percent = -1
+
+    def emit(force: bool = False):
+        nonlocal last_emit, last_percent
+        now = time.monotonic()
+        if not force and last_emit is not None and now - last_emit < min_interval:
+            return
+        last_emit = now
+        if metrics_callback:
+            metrics_callback(dict(metrics))
+        if progress_callback and total_duration and metrics.get('out_time_ms') is not None:
+            percent = min(99, int(metrics['out_time_ms'] / 1000 / total_duration * 100))
+            if percent != last_percent:
+                last_percent = percent
+                progress_callback(percent, f'{message} {percent}%')
+
+    try:
+        for line in process.stdout:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            raw[key] = value.strip()
+            # 每个进度块以 progress=continue / progress=end 结束
+            if key == 'progress':
+                metrics = _to_metrics(raw)
+                emit(force=value.strip() == 'end')
+                raw = {}
+
+        exit_code = process.wait()
+        stderr_thread.join(5)
+        if exit_code != 0:
+            print('\n'.join(tail))
+            raise FFmpegError(exit_code, cmd, stderr='\n'.join(tail))
+        return metrics
+    except BaseException:
+        # 回调出错或被中断时结束 ffmpeg，不留下仍在编码的孤儿进程
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        raise
+    finally:
+        process.stdout.close()
+        process.stderr.close()
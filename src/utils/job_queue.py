@@ -0,0 +1,165 @@
+import math
+import threading
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from .db import JobDB, connections
+from .constants import JobStatus, JobStage
+from .settings import load_settings
+
+
+class RetryLater(Exception):
+    """处理函数抛出此异常时任务在 delay 秒后重新执行，不计入失败次数"""
+
+    def __init__(self, delay: float, message: str = ''):
+        super().__init__(message or f'{delay:.0f}s 后重试')
+        self.delay = max(0, math.ceil(delay))
+
+
+class JobQueue:
+    """
+    持久化的后台任务流水线。
+
+    - 任务写入 jobs 表，进程重启后 start() 会把未完成的任务在原阶段重新排队
+    - 每个阶段（获取信息、下载、字幕、嵌入字幕、上传）注册一个处理函数，
+      并拥有数量等于该阶段并发上限的工作线程；处理函数返回下一阶段，
+      任务随即进入下一阶段的队列，于是不同视频的下载、转码、上传可以同时进行
+    - stage() 在流水线之外（例如手动上传）也按同样的上限占用名额
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        settings = load_settings('workers')
+        self.poll_interval = float(settings.get('poll_interval', 2.0))
+        self.max_attempts = int(settings.get('max_attempts', 3))
+        self.stage_workers: Dict[str, int] = {
+            stage.value: max(1, int(settings.get('stage_limits', {}).get(stage.value, 1)))
+            for stage in JobStage
+        }
+        self._stage_limits: Dict[str, threading.BoundedSemaphore] = {
+            stage: threading.BoundedSemaphore(count) for stage, count in self.stage_workers.items()
+        }
+        self._handlers: Dict[str, Callable[[Dict], Optional[JobStage]]] = {}
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopped = threading.Event()
+
+    def register(self, stage: JobStage, handler: Callable[[Dict], Optional[JobStage]]):
+        """
+        注册某个阶段的处理函数。
+
+        处理函数的参数为 jobs 表中的一行（payload 已反序列化），可以直接修改 job['payload']
+        把数据交给后续阶段；返回下一阶段，返回 None 表示任务完成。
+        """
+        self._handlers[JobStage(stage).value] = handler
+
+    def submit(self, user: str, payload: Dict, temp_id: Optional[str] = None,
+               stage: JobStage = JobStage.FETCH_INFO) -> int:
+        """任务入队并唤醒空闲的工作线程"""
+        job_id = JobDB().create_job(user, JobStage(stage).value, payload, temp_id=temp_id)
+        self._notify()
+        print(f"任务已入队: {job_id} (temp_id={temp_id})")
+        return job_id
+
+    @contextmanager
+    def stage(self, stage: JobStage):
+        """占用一个阶段的并发名额，超出上限时阻塞等待"""
+        semaphore = self._stage_limits[JobStage(stage).value]
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def start(self):
+        if self._threads:
+            return
+        if not self._handlers:
+            raise RuntimeError('JobQueue.start() called before any handler was registered')
+        requeued = JobDB().requeue_running_jobs()
+        if requeued:
+            print(f"恢复了 {requeued} 个未完成的任务")
+        self._stopped.clear()
+        for stage in self._handlers:
+            for n in range(self.stage_workers[stage]):
+                thread = threading.Thread(
+                    target=self._worker_loop, args=(stage,), name=f"job-{stage}-{n}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def retry_delay(self, job: Dict) -> Optional[float]:
+        """执行失败的任务多少秒后重试；重试次数已用完时返回 None"""
+        if job['attempts'] < self.max_attempts:
+            return 30 * job['attempts']
+        return None
+
+    def _notify(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _worker_loop(self, stage: str):
+        db = JobDB()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    job = db.claim_next_job(stages=[stage])
+                    if job is not None:
+                        self._run_job(db, job)
+                        continue
+                except Exception:
+                    # 数据库暂时不可用（如 database is locked）时不能让工作线程退出，稍后再试
+                    traceback.print_exc()
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+        finally:
+            # 工作线程中打开的数据库连接随线程一起关闭
+            connections.close_thread()
+
+    def _run_job(self, db: JobDB, job: Dict):
+        handler = self._handlers[job['stage']]
+        try:
+            next_stage = handler(job)
+            if next_stage is None:
+                db.update_job(job['id'], status=JobStatus.DONE.value, payload=job['payload'], error=None)
+            else:
+                # 进入下一阶段的队列，重试次数按阶段重新计算
+                db.update_job(
+                    job['id'], stage=JobStage(next_stage).value, status=JobStatus.QUEUED.value,
+                    payload=job['payload'], attempts=0, error=None
+                )
+                self._notify()
+        except RetryLater as e:
+            print(f"任务 {job['id']} 推迟 {e.delay}s: {e}")
+            db.defer_job(job['id'], e.delay, reason=str(e), payload=job['payload'])
+        except Exception as e:
+            traceback.print_exc()
+            delay = self.retry_delay(job)
+            if delay is not None:
+                print(f"任务 {job['id']} 第 {job['attempts']} 次执行失败，{delay}s 后重试: {e}")
+                db.retry_job(job['id'], delay, error=str(e), payload=job['payload'])
+            else:
+                print(f"任务 {job['id']} 已失败 {job['attempts']} 次，放弃: {e}")
+                db.update_job(job['id'], status=JobStatus.ERROR.value, error=str(e))
+
+
+job_queue = JobQueue()
@@ -0,0 +1,155 @@
+"""
+数据库迁移：按版本号依次升级表结构，不删除已有数据。
+
+- 当前版本记录在 PRAGMA user_version 中，只执行比它新的迁移
+- 每个迁移和版本号的更新在同一个事务里提交，中途失败会整体回滚，下次启动重新执行
+- 迁移只能追加：已发布的迁移不要修改，表结构变更（加表、加索引、ALTER TABLE ADD COLUMN）写成新的迁移
+- 建表、建索引语句带 IF NOT EXISTS，旧版 schema.sql 建出的数据库（user_version 为 0）也能直接升级
+- 每个迁移单独一个事务，WAL 模式下大表建索引期间读取不受影响，写入最多等待 busy_timeout
+"""
+import sqlite3
+from typing import List, Tuple
+
+# (版本号, 说明, SQL)
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, '视频表', """
+    CREATE TABLE IF NOT EXISTS videos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT NOT NULL,
+        created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        title TEXT NOT NULL,
+        desc TEXT,
+        subtitle_lang TEXT,
+        save_path TEXT NOT NULL,
+        save_srt TEXT,
+        save_cover TEXT,
+        origin_id TEXT NOT NULL,
+        origin_url TEXT NOT NULL,
+        size INTEGER,
+        tid INTEGER,
+        tags TEXT,
+        status TEXT CHECK(status IN ('pending', 'downloading', 'downloaded', 'uploading', 'uploaded', 'error')) DEFAULT 'pending'
+    );
+    """),
+    (2, '后台任务表', """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT NOT NULL,
+        video_id INTEGER,
+        temp_id TEXT,
+        stage TEXT NOT NULL,
+        status TEXT CHECK(status IN ('queued', 'running', 'done', 'error')) DEFAULT 'queued',
+        payload JSON,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """),
+    (3, 'ffprobe 缓存表', """
+    CREATE TABLE IF NOT EXISTS probe_cache (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        data JSON NOT NULL,
+        updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """),
+    (4, '分块上传会话表', """
+    CREATE TABLE IF NOT EXISTS upload_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_id INTEGER,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        preupload JSON NOT NULL,
+        result JSON,
+        created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_upload_sessions_path ON upload_sessions (path, size, mtime);
+    CREATE TABLE IF NOT EXISTS upload_chunks (
+        session_id INTEGER NOT NULL,
+        chunk_number INTEGER NOT NULL,
+        PRIMARY KEY (session_id, chunk_number)
+    );
+    """),
+    (5, '视频列表索引：按用户、时间分页以及按状态筛选', """
+    CREATE INDEX IF NOT EXISTS idx_videos_user_created ON videos (user, created);
+    CREATE INDEX IF NOT EXISTS idx_videos_user_origin ON videos (user, origin_id);
+    CREATE INDEX IF NOT EXISTS idx_videos_status ON videos (status);
+    """),
+    (6, '任务队列索引：领取任务时不再扫描已完成的任务', """
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+    """),
+    (7, '进度表：多个进程共享下载/上传进度', """
+    CREATE TABLE IF NOT EXISTS progress (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_id TEXT NOT NULL UNIQUE,
+        completed INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL,
+        data JSON NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_progress_finished ON progress (completed, updated_at);
+    """),
+    (8, '任务 payload 中不再保存B站 cookie', """
+    UPDATE jobs SET payload = json_remove(payload, '$.SESSDATA', '$.bili_jct', '$.buvid3')
+    WHERE json_valid(payload) AND (
+        json_type(payload, '$.SESSDATA') IS NOT NULL
+        OR json_type(payload, '$.bili_jct') IS NOT NULL
+        OR json_type(payload, '$.buvid3') IS NOT NULL
+    );
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(db_path: str, migrations: List[Tuple[int, str, str]] = MIGRATIONS) -> List[int]:
+    """把数据库升级到最新版本，返回本次执行的迁移版本号；已是最新时什么也不做"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL;")
+        applied = []
+        for version, description, sql in migrations:
+            if version <= current_version(conn):
+                continue
+            print(f"数据库迁移 {db_path}: v{version} {description}")
+            try:
+                # BEGIN IMMEDIATE 先拿到写锁，多个进程同时启动时只有一个执行迁移，其他的等待后跳过
+                conn.execute("BEGIN IMMEDIATE;")
+                if version <= current_version(conn):
+                    conn.execute("COMMIT;")
+                    continue
+                for statement in _split_statements(sql):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)};")
+                conn.execute("COMMIT;")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK;")
+                raise
+            applied.append(version)
+        if applied:
+            # 新建的索引需要统计信息，查询规划器才会用上
+            conn.execute("PRAGMA optimize;")
+        return applied
+    finally:
+        conn.close()
+
+
+def _split_statements(sql: str) -> List[str]:
+    """按分号拆分语句（executescript 会先提交事务，这里不能用）"""
+    statements, current = [], ''
+    for part in sql.split(';'):
+        # 分号也可能出现在字符串里，拼到完整的语句为止
+        current += part + ';'
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    return [statement for statement in statements if statement != ';']
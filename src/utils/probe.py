@@ -0,0 +1,127 @@
+"""
+ffprobe 元数据缓存。
+
+每个文件只运行一次 `ffprobe -show_format -show_streams`，结果按 (路径, 大小, 修改时间)
+缓存在内存和数据库（probe_cache 表）中；文件被重新下载或改写后自动失效。
+时长、分辨率、关键帧等都从缓存的结果中读取。
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .db import ProbeDB
+
+MEMORY_ENTRIES = 256
+
+_memory: 'OrderedDict[Tuple[str, int, float], Dict]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def _file_key(path: str) -> Tuple[str, int, float]:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def _remember(key: Tuple[str, int, float], data: Dict):
+    with _lock:
+        _memory[key] = data
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _load(key: Tuple[str, int, float]) -> Optional[Dict]:
+    with _lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+            return data
+    try:
+        data = ProbeDB().read_probe(*key)
+    except sqlite3.Error as e:
+        print(f"读取 probe 缓存失败: {e}")
+        return None
+    if data is not None:
+        _remember(key, data)
+    return data
+
+
+def _store(key: Tuple[str, int, float], data: Dict):
+    _remember(key, data)
+    try:
+        ProbeDB().save_probe(*key, data)
+    except sqlite3.Error as e:
+        print(f"写入 probe 缓存失败: {e}")
+
+
+def _run_ffprobe(args: List[str]) -> str:
+    result = subprocess.run(['ffprobe', '-v', 'error'] + args, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe 执行失败: {result.stderr.strip()}")
+    return result.stdout
+
+
+def probe(path: str) -> Dict:
+    """返回 {'format': {...}, 'streams': [...]}；文件不存在或 ffprobe 失败时抛出异常"""
+    key = _file_key(path)
+    data = _load(key)
+    if data is None:
+        output = _run_ffprobe(['-print_format', 'json', '-show_format', '-show_streams', path])
+        info = json.loads(output or '{}')
+        data = {'format': info.get('format', {}), 'streams': info.get('streams', [])}
+        _store(key, data)
+    return data
+
+
+def probe_duration(path: str) -> Optional[float]:
+    try:
+        return float(probe(path)['format']['duration'])
+    except Exception as e:
+        print(f"获取视频时长失败: {e}")
+    return None
+
+
+def first_stream(info: Dict, codec_type: str) -> Optional[Dict]:
+    for stream in info.get('streams', []):
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
+
+
+def probe_resolution(path: str) -> Optional[str]:
+    """视频流的高度，例如 '1080'；用于在文件名中没有分辨率时选择编码配置"""
+    try:
+        stream = first_stream(probe(path), 'video')
+    except Exception as e:
+        print(f"获取视频分辨率失败: {e}")
+        return None
+    if stream and stream.get('height'):
+        return str(stream['height'])
+    return None
+
+
+def probe_keyframes(path: str) -> List[float]:
+    """视频流所有关键帧的时间（秒），只读取包信息，不解码；结果与元数据一起缓存"""
+    key = _file_key(path)
+    data = probe(path)
+    if 'keyframes' in data:
+        return data['keyframes']
+    output = _run_ffprobe(['-select_streams', 'v:0',
+                           '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path])
+    times = []
+    for line in output.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags and pts not in ('', 'N/A'):
+            times.append(float(pts))
+    data = dict(data, keyframes=sorted(times))
+    _store(key, data)
+    return data['keyframes']
+
+
+def clear_memory():
+    """只清空进程内缓存（数据库中的记录保留）"""
+    with _lock:
+        _memory.clear()
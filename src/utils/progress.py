@@ -1,25 +1,150 @@
+"""
+下载/上传进度。
+
+- 存储后端可替换：memory（进程内字典，默认）或 sqlite（db/database.db 的 progress 表，多个进程共享、重启后保留）
+- 每次写入分配递增的 seq，sse_stream() 只推送某个 seq 之后变化的进度（Server-Sent Events），
+  浏览器不必每秒轮询；断线重连时通过 Last-Event-ID 接着推送
+- 已结束（完成或出错）的进度保留 ttl_seconds 秒后删除
+"""
+import json
 import threading
-from typing import Dict, Optional
-from datetime import datetime
-from utils.constants import DownloadStage, STAGE_NAMES
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .constants import DownloadStage, STAGE_NAMES
+from .db import ProgressDB
+from .settings import load_settings
+
+
+class MemoryProgressBackend:
+    """进程内字典，进程重启后丢失，其他进程不可见"""
+    shared = False
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._seq = 0
+        self._mutex = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        with self._mutex:
+            entry = self._entries.get(video_id)
+            return dict(entry) if entry else None
+
+    def put(self, video_id: str, entry: Dict) -> int:
+        with self._mutex:
+            self._seq += 1
+            self._entries[video_id] = dict(entry, seq=self._seq)
+            return self._seq
+
+    def delete(self, video_id: str):
+        with self._mutex:
+            self._entries.pop(video_id, None)
+
+    def changes_since(self, seq: int) -> List[Dict]:
+        with self._mutex:
+            return sorted((dict(e) for e in self._entries.values() if e['seq'] > seq), key=lambda e: e['seq'])
+
+    def last_seq(self) -> int:
+        with self._mutex:
+            return self._seq
+
+    def evict_finished(self, before: str) -> int:
+        with self._mutex:
+            expired = [k for k, e in self._entries.items() if e.get('completed') and e['updated_at'] < before]
+            for key in expired:
+                del self._entries[key]
+            return len(expired)
+
+
+class SQLiteProgressBackend:
+    """保存在 progress 表中，多个进程共享，重启后保留"""
+    shared = True
+
+    def __init__(self, db_name: str = 'database.db'):
+        self.db_name = db_name
+
+    @property
+    def _db(self) -> ProgressDB:
+        return ProgressDB(self.db_name)
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        return self._db.read_progress(video_id)
+
+    def put(self, video_id: str, entry: Dict) -> int:
+        entry = {k: v for k, v in entry.items() if k != 'seq'}
+        return self._db.save_progress(video_id, entry)
+
+    def delete(self, video_id: str):
+        self._db.delete_progress(video_id)
+
+    def changes_since(self, seq: int) -> List[Dict]:
+        return self._db.progress_since(seq)
+
+    def last_seq(self) -> int:
+        return self._db.last_seq()
+
+    def evict_finished(self, before: str) -> int:
+        return self._db.delete_finished_before(before)
+
+
+PROGRESS_BACKENDS = {
+    'memory': MemoryProgressBackend,
+    'sqlite': SQLiteProgressBackend,
+}
+
+
+def create_progress_backend(name: str):
+    if name not in PROGRESS_BACKENDS:
+        raise ValueError(f"Unknown progress backend: {name} (expected one of {', '.join(PROGRESS_BACKENDS)})")
+    return PROGRESS_BACKENDS[name]()
 
 
 class DownloadProgress:
     _instance = None
     _lock = threading.Lock()
-    _progress_map: Dict[str, Dict] = {}
 
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
         return cls._instance
 
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        # 有新的进度写入时唤醒推送连接
+        self._changed = threading.Condition()
+        self.configure()
+
+    def configure(self, settings: Optional[Dict] = None, backend=None):
+        settings = settings or load_settings('progress')
+        self.backend = backend or create_progress_backend(settings.get('backend') or 'memory')
+        self.ttl_seconds = float(settings.get('ttl_seconds') or 3600)
+        self.poll_interval = float(settings.get('poll_interval') or 1.0)
+        self._next_eviction = 0.0
+
+    def _save(self, video_id: str, entry: Dict):
+        self.backend.put(video_id, entry)
+        with self._changed:
+            self._changed.notify_all()
+        self._evict_expired()
+
+    def _evict_expired(self):
+        """最多每分钟清理一次已结束且超过 ttl_seconds 的进度"""
+        now = time.monotonic()
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + 60
+        before = (datetime.now() - timedelta(seconds=self.ttl_seconds)).isoformat()
+        self.backend.evict_finished(before)
+
     def start_progress(self, video_id: str, title: str):
         with self._lock:
             video_id = str(video_id)
-            self._progress_map[video_id] = {
+            entry = {
                 'video_id': video_id,
                 'title': title,
                 'stage': DownloadStage.PREPARING,
@@ -31,16 +156,24 @@ class DownloadProgress:
                 'completed': False,
                 'error': None
             }
+            existing = self.backend.get(video_id)
+            if existing and existing.get('previous_id'):
+                # 重试或推迟后重新登记时保留临时ID，按临时ID订阅的下载页仍能收到
+                entry['previous_id'] = existing['previous_id']
+            self._save(video_id, entry)
 
     def update_video_id(self, old_id: str, new_id: str):
-        """更新视频ID，用于从临时ID切换到真实ID"""
+        """更新视频ID，用于从临时ID切换到真实ID；previous_id 保留旧ID，按旧ID订阅的推送连接仍能收到"""
         with self._lock:
             old_id = str(old_id)
             new_id = str(new_id)
-            if old_id in self._progress_map:
-                progress = self._progress_map.pop(old_id)
+            progress = self.backend.get(old_id)
+            if progress:
+                self.backend.delete(old_id)
                 progress['video_id'] = new_id
-                self._progress_map[new_id] = progress
+                progress['previous_id'] = old_id
+                progress['updated_at'] = datetime.now().isoformat()
+                self._save(new_id, progress)
 
     def update_stage(
         self,
@@ -51,10 +184,10 @@ class DownloadProgress:
     ):
         with self._lock:
             video_id = str(video_id)
-            if video_id not in self._progress_map:
+            existing = self.backend.get(video_id)
+            if existing is None:
                 return
             # Prevent decreasing progress unless moving to ERROR or COMPLETED
-            existing = self._progress_map[video_id]
             old_progress = existing.get('progress', 0) or 0
             if stage in (DownloadStage.ERROR, DownloadStage.COMPLETED):
                 new_progress = progress
@@ -71,46 +204,91 @@ class DownloadProgress:
                 'message': message,
                 'updated_at': datetime.now().isoformat()
             })
+            self._save(video_id, existing)
 
     def complete_progress(self, video_id: str):
         with self._lock:
             video_id = str(video_id)
-            if video_id not in self._progress_map:
+            existing = self.backend.get(video_id)
+            if existing is None:
                 return
-            self._progress_map[video_id].update({
+            existing.update({
                 'stage': DownloadStage.COMPLETED,
                 'stage_name': STAGE_NAMES[DownloadStage.COMPLETED],
                 'progress': 100,
                 'completed': True,
                 'updated_at': datetime.now().isoformat()
             })
+            self._save(video_id, existing)
 
     def set_error(self, video_id: str, error_message: str):
         with self._lock:
             video_id = str(video_id)
-            if video_id not in self._progress_map:
+            existing = self.backend.get(video_id)
+            if existing is None:
                 return
-            self._progress_map[video_id].update({
+            existing.update({
                 'stage': DownloadStage.ERROR,
                 'stage_name': STAGE_NAMES[DownloadStage.ERROR],
-                'progress': self._progress_map[video_id].get('progress', 0),
+                'progress': existing.get('progress', 0),
                 'message': error_message,
                 'error': error_message,
                 'completed': True,
                 'updated_at': datetime.now().isoformat()
             })
+            self._save(video_id, existing)
 
     def get_progress(self, video_id: str) -> Optional[Dict]:
-        with self._lock:
-            return self._progress_map.get(str(video_id))
+        return self.backend.get(str(video_id))
 
     def remove_progress(self, video_id: str):
         with self._lock:
-            self._progress_map.pop(str(video_id), None)
+            self.backend.delete(str(video_id))
 
     def get_all_progress(self) -> Dict[str, Dict]:
-        with self._lock:
-            return dict(self._progress_map)
+        self._evict_expired()
+        return {entry['video_id']: entry for entry in self.backend.changes_since(0)}
+
+    def changes(self, since: int = 0, video_ids: Optional[Iterable[str]] = None) -> Tuple[List[Dict], int]:
+        """返回 since 之后变化的进度（可按视频ID过滤，也匹配 previous_id）以及最新的 seq"""
+        entries = self.backend.changes_since(since)
+        last = entries[-1]['seq'] if entries else since
+        if video_ids is not None:
+            wanted = {str(v) for v in video_ids}
+            entries = [e for e in entries if e['video_id'] in wanted or e.get('previous_id') in wanted]
+        return entries, last
+
+    def wait_for_change(self, since: int, timeout: float) -> bool:
+        """等待 since 之后有新的写入；超时返回 False。共享后端还要定期检查其他进程的写入"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while self.backend.last_seq() <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(min(remaining, self.poll_interval) if self.backend.shared else remaining)
+        return True
+
+    def sse_stream(
+        self,
+        since: int = 0,
+        video_ids: Optional[Iterable[str]] = None,
+        heartbeat: float = 15.0
+    ) -> Iterator[str]:
+        """
+        Server-Sent Events：先推送 since 之后的全部进度，之后只推送有变化的进度；
+        event id 为 seq，浏览器重连时通过 Last-Event-ID 带回。没有变化时每 heartbeat 秒发送一行注释保持连接
+        """
+        if since > self.backend.last_seq():
+            # 内存后端在进程重启后 seq 从头开始
+            since = 0
+        yield 'retry: 3000\n\n'
+        while True:
+            entries, since = self.changes(since, video_ids)
+            for entry in entries:
+                yield f"id: {entry['seq']}\nevent: progress\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            if not self.wait_for_change(since, heartbeat):
+                yield ': keepalive\n\n'
 
 
 download_progress = DownloadProgress()
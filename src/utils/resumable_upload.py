@@ -0,0 +1,136 @@
+"""
+可续传的分块上传。
+
+在 bilibili_api 的 VideoUploader 基础上：
+- preupload 得到的会话（upload_id、endpoint、auth）和已上传的分块写入 upload_sessions / upload_chunks 表，
+  上传中断（网络错误、403、验证码）后再次上传同一文件时只上传剩下的分块
+- 分块大小和同时上传的分块数取自 settings.json 的 upload 段
+- 分块按固定并发数连续上传，不再按批等待最慢的分块；单个分块失败有限次重试后抛出异常
+- 多个分 P 同时上传（共用同一组并发名额），全部完成后只投稿一次
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional
+from bilibili_api import video_uploader
+from bilibili_api.exceptions import ApiException, NetworkException, ResponseCodeException
+from .db import UploadSessionDB
+from .settings import load_settings
+
+# 上传进度事件，数据为 {'p': 百分比, 'sent': 已上传字节数, 'total': 总字节数}
+UPLOAD_PROGRESS_EVENT = 'UPLOAD_PROGRESS'
+
+
+class ResumableVideoUploader(video_uploader.VideoUploader):
+
+    def __init__(self, pages: List[video_uploader.VideoUploaderPage], meta, credential,
+                 video_id: Optional[int] = None, settings: Optional[Dict] = None, **kwargs):
+        super().__init__(pages, meta, credential, **kwargs)
+        settings = settings or load_settings('upload')
+        self.video_id = video_id
+        chunk_size_mb = settings.get('chunk_size_mb')
+        self.chunk_size = int(float(chunk_size_mb) * 1024 * 1024) if chunk_size_mb else None
+        self.concurrency = int(settings.get('concurrency') or 0) or None
+        self.chunk_retries = max(1, int(settings.get('chunk_retries') or 1))
+        self.session_ttl_hours = float(settings.get('session_ttl_hours') or 24)
+        self.sessions = UploadSessionDB()
+        self._session_ids: List[int] = []
+        self._chunk_slots: Optional[asyncio.Semaphore] = None
+        self._total_bytes = sum(page.get_size() for page in pages)
+        self._sent_bytes = 0
+
+    def _switch_upload_endpoint(self, preupload: dict, line: dict = None) -> dict:
+        """_preupload 拿到预检结果后、申请 upload_id 之前调用：换成配置的分块大小，申请 upload_id 时的 partsize 与之一致"""
+        preupload = super()._switch_upload_endpoint(preupload, line)
+        if self.chunk_size:
+            preupload['chunk_size'] = self.chunk_size
+        return preupload
+
+    def _report(self, sent: int):
+        self._sent_bytes += sent
+        percent = int(self._sent_bytes * 100 / self._total_bytes) if self._total_bytes else 100
+        self.dispatch(UPLOAD_PROGRESS_EVENT, {'p': percent, 'sent': self._sent_bytes, 'total': self._total_bytes})
+
+    async def _upload_page(self, page: video_uploader.VideoUploaderPage) -> dict:
+        size = page.get_size()
+        path = os.path.abspath(page.path)
+        mtime = os.path.getmtime(page.path)
+
+        stored = self.sessions.find_session(path, size, mtime, self.session_ttl_hours)
+        if stored and stored['result']:
+            # 分 P 已提交过，只是投稿失败
+            print(f"分 P 已上传过，直接使用: {page.path}")
+            self._session_ids.append(stored['id'])
+            self._report(size)
+            return stored['result']
+        if stored:
+            session_id, preupload = stored['id'], stored['preupload']
+            done = self.sessions.uploaded_chunks(session_id)
+            print(f"继续上次的上传 {page.path}: 已上传 {len(done)} 个分块")
+        else:
+            preupload = await self._preupload(page)
+            session_id = self.sessions.create_session(self.video_id, path, size, mtime, preupload)
+            done = set()
+        self._session_ids.append(session_id)
+        self.dispatch(video_uploader.VideoUploaderEvents.PRE_PAGE.value, {"page": page})
+
+        chunk_size = preupload['chunk_size']
+        offsets = list(range(0, size, chunk_size))
+        total = len(offsets)
+        self._report(sum(min(chunk_size, size - offsets[n]) for n in done if n < total))
+        if self._chunk_slots is None:
+            self._chunk_slots = asyncio.Semaphore(self.concurrency or preupload.get('threads') or 3)
+        semaphore = self._chunk_slots
+
+        async def send(n: int):
+            for attempt in range(self.chunk_retries):
+                async with semaphore:
+                    result = await self._upload_chunk(page, offsets[n], n, total, preupload)
+                if result['ok']:
+                    self.sessions.mark_chunk(session_id, n)
+                    self._report(min(chunk_size, size - offsets[n]))
+                    return
+                if attempt + 1 < self.chunk_retries:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+            raise ApiException(f"分块 {n + 1}/{total} 上传失败，已重试 {self.chunk_retries} 次")
+
+        tasks = [asyncio.ensure_future(send(n)) for n in range(total) if n not in done]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            if stored:
+                # 续传的会话可能已失效，下次重新 preupload
+                self.sessions.delete_session(session_id)
+            raise
+
+        try:
+            data = await self._complete_page(page, total, preupload, preupload['upload_id'])
+        except (NetworkException, ResponseCodeException):
+            self.sessions.delete_session(session_id)
+            raise
+        self.sessions.complete_session(session_id, data)
+        self.dispatch(video_uploader.VideoUploaderEvents.AFTER_PAGE.value, {"page": page})
+        return data
+
+    async def _main(self) -> dict:
+        results = await asyncio.gather(*(self._upload_page(page) for page in self.pages))
+        videos = [
+            {
+                "title": page.title,
+                "desc": page.description,
+                "filename": data["filename"],
+                "cid": data["cid"],
+            }
+            for page, data in zip(self.pages, results)
+        ]
+        cover_url = await self._upload_cover()
+        result = await self._submit(videos, cover_url)
+        self.dispatch(video_uploader.VideoUploaderEvents.COMPLETED.value, result)
+        return result
+
+    async def _submit(self, videos: list, cover_url: str = "") -> dict:
+        result = await super()._submit(videos, cover_url)
+        for session_id in self._session_ids:
+            self.sessions.delete_session(session_id)
+        return result
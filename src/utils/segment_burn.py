@@ -0,0 +1,124 @@
+"""
+分段并行嵌入字幕：在关键帧处把视频切成 N 段，每段用各自平移过时间轴的字幕切片
+由独立的 ffmpeg 进程编码，最后用 concat demuxer 无损拼接并复制原视频的音轨。
+"""
+import os
+import shutil
+import tempfile
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .ffmpeg_runner import run_ffmpeg
+from .probe import probe_keyframes as keyframe_times
+from .encode import encode_args, escape_filter_path, srt_to_ass
+from .srt_stream import Cue, SrtWriter, iter_cues
+
+
+def plan_segments(duration: float, keyframes: List[float], count: int,
+                  min_seconds: float = 0) -> List[Tuple[float, float]]:
+    """在最接近等分点的关键帧处切分，返回 [(start, end), ...]；相邻切点过近时合并"""
+    cuts = [0.0]
+    for i in range(1, count):
+        target = duration * i / count
+        k = bisect_left(keyframes, target)
+        candidates = [keyframes[j] for j in (k - 1, k) if 0 <= j < len(keyframes)]
+        if not candidates:
+            continue
+        cut = min(candidates, key=lambda t: abs(t - target))
+        if cut - cuts[-1] >= max(min_seconds, 0.001) and duration - cut >= max(min_seconds, 0.001):
+            cuts.append(cut)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def slice_srt(srt_path: str, output_path: str, start: float, end: float) -> int:
+    """取出与 [start, end) 重叠的字幕，时间轴平移到片段起点并截断到片段范围内，返回条数"""
+    start_ms, end_ms = int(round(start * 1000)), int(round(end * 1000))
+    count = 0
+    with SrtWriter(output_path, reindex=True) as writer:
+        for cue in iter_cues(srt_path):
+            if cue.start_ms is None or cue.end_ms is None:
+                continue
+            if cue.end_ms <= start_ms or cue.start_ms >= end_ms:
+                continue
+            writer.write(Cue.from_times(
+                0,
+                max(cue.start_ms, start_ms) - start_ms,
+                min(cue.end_ms, end_ms) - start_ms,
+                cue.content
+            ))
+            count += 1
+    return count
+
+
+def burn_in_segments(
+    input_path: str,
+    srt_path: str,
+    output_path: str,
+    profile: Dict,
+    duration: float,
+    segments: int,
+    font_name: Optional[str] = None,
+    min_segment_seconds: float = 60,
+    progress_callback: Optional[Callable[[int, str], None]] = None
+) -> int:
+    """
+    分段并行嵌入字幕，返回实际使用的段数。
+
+    每段只编码视频（-an），各段的 ffmpeg 线程数平分 profile['threads']（未设置时平分 CPU 核数）；
+    进度按各段已编码的时长汇总后通过 progress_callback 报告。
+    """
+    plan = plan_segments(duration, keyframe_times(input_path), segments, min_segment_seconds)
+    work_dir = tempfile.mkdtemp(prefix='burn_', dir=os.path.dirname(os.path.abspath(output_path)))
+    total_threads = int(profile.get('threads') or 0) or (os.cpu_count() or 1)
+    segment_profile = dict(profile, faststart=False, threads=max(1, total_threads // len(plan)))
+    done_seconds = [0.0] * len(plan)
+    last_percent = [0]
+
+    def report(n: int, seconds: float):
+        done_seconds[n] = seconds
+        percent = min(99, int(sum(done_seconds) / duration * 100)) if duration else 0
+        if percent > last_percent[0]:
+            last_percent[0] = percent
+            if progress_callback:
+                progress_callback(percent, f'正在嵌入字幕... {percent}%')
+
+    def burn(n: int) -> str:
+        start, end = plan[n]
+        slice_path = os.path.join(work_dir, f'part{n:03d}.srt')
+        slice_srt(srt_path, slice_path, start, end)
+        ass_path = srt_to_ass(slice_path, slice_path[:-4] + '.ass', font_name=font_name)
+        part_path = os.path.join(work_dir, f'part{n:03d}.mp4')
+        args = [
+            '-y',
+            '-ss', f'{start:.3f}', '-i', input_path, '-t', f'{end - start:.3f}',
+            '-an',
+            '-vf', f'ass={escape_filter_path(ass_path)}',
+            *encode_args(segment_profile, audio=False),
+            part_path
+        ]
+        run_ffmpeg(args, metrics_callback=lambda metrics: report(n, min(end - start, (metrics['out_time_ms'] or 0) / 1000)))
+        report(n, end - start)
+        return part_path
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            parts = list(pool.map(burn, range(len(plan))))
+
+        list_path = os.path.join(work_dir, 'parts.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write("file '{}'\n".format(part.replace("'", "'\\''")))
+        run_ffmpeg([
+            '-y',
+            '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-i', input_path,
+            '-map', '0:v', '-map', '1:a?',
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-f', 'mp4',
+            output_path
+        ])
+        return len(plan)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
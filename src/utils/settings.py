@@ -0,0 +1,135 @@
+import os
+import json
+import copy
+import threading
+from typing import Any, Dict, Optional
+from .sys import join_root_path
+
+# 默认配置；config/settings.json 中的同名字段会覆盖这里的值（按层级合并）
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    # 任务队列：stage_limits 为各阶段的工作线程数（即并发上限）
+    "workers": {
+        "poll_interval": 2.0,
+        "max_attempts": 3,
+        "stage_limits": {
+            "fetch_info": 2,
+            "download": 2,
+            "subtitle": 1,
+            "burn_in": 1,
+            "prepare_upload": 1,
+            "upload": 1,
+        },
+    },
+    # 翻译模型缓存：最多常驻的模型数、内存预算（MB）、空闲多久后释放（秒）；
+    # batch_*：跨文件合并推理批次时每批最多的行数、token 数（含 padding），以及凑批的等待时间
+    # backend：推理后端 torch / torch-int8（动态量化）/ onnx（需要 optimum[onnxruntime]），后两者只用 CPU
+    # chunk_tokens：全文模式下每个分块的 token 上限（模型输入最多 512 token）
+    # cache_*：翻译记忆（db/translation_cache.db）开关与最多保留的条目数
+    "translator": {
+        "backend": "torch",
+        "max_models": 2,
+        "memory_budget_mb": 2048,
+        "idle_seconds": 1800,
+        "batch_size": 32,
+        "batch_tokens": 6000,
+        "batch_wait_ms": 20,
+        "chunk_tokens": 400,
+        "cache_enabled": True,
+        "cache_max_entries": 200000,
+    },
+    # 嵌入字幕时的编码参数；per_resolution 按下载分辨率覆盖默认值。
+    # video_bitrate（如 "6M"）非空时使用码率控制代替 crf；硬件编码器（如 h264_videotoolbox）只使用码率，
+    # preset / crf / tune 仅对 libx264、libx265 生效；threads 为 0 时由 ffmpeg 自动选择
+    # parallel_segments > 1 时在关键帧处分段，多个 ffmpeg 进程并行嵌入字幕后无损拼接；
+    # 每段至少 min_segment_seconds 秒，更短的视频仍单进程处理
+    "encode": {
+        "video_codec": "libx264",
+        "preset": "veryfast",
+        "crf": 23,
+        "tune": None,
+        "video_bitrate": None,
+        "threads": 0,
+        "audio_codec": "copy",
+        "faststart": True,
+        "parallel_segments": 0,
+        "min_segment_seconds": 60,
+        "per_resolution": {
+            "1080": {"crf": 22},
+            "1440": {"crf": 23, "preset": "superfast"},
+            "2160": {"crf": 24, "preset": "superfast"},
+        },
+    },
+    # 投稿上传：chunk_size_mb 为空时使用B站 preupload 返回的分块大小；concurrency 为同时上传的分块数，
+    # 为空时使用 preupload 返回的 threads；单个分块最多重试 chunk_retries 次；
+    # 中断的上传会话保留 session_ttl_hours 小时，期间重试只上传剩下的分块
+    # 投稿频率：令牌桶每小时 submissions_per_hour 个、最多攒 burst 个；遇到验证码/403 时暂停
+    # backoff_seconds 秒，连续出现时加倍（最多 max_backoff_seconds），投稿成功后逐步恢复；
+    # 后台任务遇到验证码最多推迟 max_throttled_retries 次，之后标记为出错
+    "upload": {
+        "chunk_size_mb": None,
+        "concurrency": 4,
+        "chunk_retries": 5,
+        "session_ttl_hours": 24,
+        "submissions_per_hour": 6,
+        "burst": 2,
+        "backoff_seconds": 600,
+        "max_backoff_seconds": 21600,
+        "max_throttled_retries": 5,
+    },
+    # B站登录信息校验结果的缓存时间；剩余不到 refresh_before_seconds 秒时在后台重新校验
+    "credential": {
+        "ttl_seconds": 1800,
+        "refresh_before_seconds": 300,
+    },
+    # 进度存储：backend 为 memory（进程内，默认）或 sqlite（progress 表，多个进程共享、重启后保留）；
+    # 已结束的进度保留 ttl_seconds 秒；sqlite 后端下推送连接每 poll_interval 秒检查一次其他进程的写入
+    "progress": {
+        "backend": "memory",
+        "ttl_seconds": 3600,
+        "poll_interval": 1.0,
+    },
+}
+
+_settings_path = join_root_path('config/settings.json')
+_lock = threading.Lock()
+_cache: Dict[str, Any] = {'mtime': None, 'settings': None}
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_settings(section: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取 config/settings.json 并与默认配置合并；文件修改后会自动重新加载。
+
+    :param section: 只返回指定的配置段，例如 'workers'
+    :return: 配置字典（副本，可随意修改）
+    """
+    with _lock:
+        try:
+            mtime = os.path.getmtime(_settings_path)
+        except OSError:
+            mtime = None
+
+        if _cache['settings'] is None or _cache['mtime'] != mtime:
+            user_settings = {}
+            if mtime is not None:
+                try:
+                    with open(_settings_path, 'r', encoding='utf-8') as f:
+                        user_settings = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"读取配置文件失败，使用默认配置: {e}")
+            _cache['settings'] = _deep_merge(DEFAULT_SETTINGS, user_settings)
+            _cache['mtime'] = mtime
+
+        settings = copy.deepcopy(_cache['settings'])
+    if section:
+        return settings.get(section, {})
+    return settings
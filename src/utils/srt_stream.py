@@ -0,0 +1,142 @@
+"""
+流式读写 SRT 字幕：逐条产出紧凑的 Cue，边处理边写出，内存占用与文件大小无关。
+
+只依赖标准库，translate_srt.py 作为独立脚本运行时也能直接导入。
+"""
+import re
+from typing import IO, Iterator, List, Optional, Union
+
+_TIME_RE = re.compile(r"(?:(\d+):)?(\d+):(\d+)[,.](\d+)")
+
+
+def parse_timestamp_ms(t: str) -> int:
+    """'HH:MM:SS,mmm'（也接受 '.' 和省略小时）转为毫秒"""
+    m = _TIME_RE.match(t.strip())
+    if not m:
+        raise ValueError(f"Invalid SRT time string: {t}")
+    hh = int(m.group(1) or 0)
+    mm = int(m.group(2))
+    ss = int(m.group(3))
+    ms = int(m.group(4).ljust(3, '0')[:3])
+    return ((hh * 60 + mm) * 60 + ss) * 1000 + ms
+
+
+def format_timestamp_ms(value: int) -> str:
+    hh, rest = divmod(int(value), 3600000)
+    mm, rest = divmod(rest, 60000)
+    ss, ms = divmod(rest, 1000)
+    return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
+
+
+class Cue:
+    """
+    一条字幕。index 与 time 保留文件中的原始文本，写回时不做改动；
+    start_ms / end_ms 为解析出的毫秒数，时间行无法解析时为 None。
+    """
+    __slots__ = ('index', 'time', 'start_ms', 'end_ms', 'content')
+
+    def __init__(self, index: str, time: str, content: str,
+                 start_ms: Optional[int] = None, end_ms: Optional[int] = None):
+        self.index = index
+        self.time = time
+        self.content = content
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    @classmethod
+    def from_times(cls, index: Union[int, str], start_ms: int, end_ms: int, content: str) -> 'Cue':
+        time = f"{format_timestamp_ms(start_ms)} --> {format_timestamp_ms(end_ms)}"
+        return cls(str(index), time, content, start_ms, end_ms)
+
+    def replace(self, **kwargs) -> 'Cue':
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(kwargs)
+        return Cue(**values)
+
+    def __repr__(self):
+        return f"Cue({self.index!r}, {self.time!r}, {self.content!r})"
+
+
+def _parse_block(lines: List[str]) -> Optional[Cue]:
+    if len(lines) < 2:
+        return None
+    index = lines[0].strip()
+    time = lines[1].strip()
+    content = "\n".join(line.rstrip() for line in lines[2:]).strip()
+    try:
+        start_str, end_str = time.split('-->')
+        start_ms = parse_timestamp_ms(start_str)
+        end_ms = parse_timestamp_ms(end_str)
+    except ValueError:
+        start_ms = end_ms = None
+    return Cue(index, time, content, start_ms, end_ms)
+
+
+def iter_cues(source: Union[str, IO[str]], encoding: str = "utf-8") -> Iterator[Cue]:
+    """
+    逐条读取 SRT；source 为文件路径或已打开的文本文件。
+
+    字幕块以空行分隔，CRLF/LF 均可；少于两行的块被跳过。
+    多个 SRT 直接拼接成的文件也能按顺序读出全部字幕。
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding=encoding) as f:
+            yield from iter_cues(f)
+        return
+
+    block: List[str] = []
+    first = True
+    for line in source:
+        if first:
+            line = line.lstrip('\ufeff')
+            first = False
+        if line.strip():
+            block.append(line.rstrip('\r\n'))
+            continue
+        if block:
+            cue = _parse_block(block)
+            if cue is not None:
+                yield cue
+            block = []
+    if block:
+        cue = _parse_block(block)
+        if cue is not None:
+            yield cue
+
+
+def count_cues(source: str, encoding: str = "utf-8") -> int:
+    return sum(1 for _ in iter_cues(source, encoding))
+
+
+class SrtWriter:
+    """
+    逐条写出 SRT。reindex=True 时按写入顺序从 1 重新编号，否则保留 cue.index。
+
+        with SrtWriter(path) as writer:
+            for cue in cues:
+                writer.write(cue)
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8", reindex: bool = False):
+        self.path = path
+        self.encoding = encoding
+        self.reindex = reindex
+        self.count = 0
+        self._file: Optional[IO[str]] = None
+
+    def __enter__(self) -> 'SrtWriter':
+        self._file = open(self.path, 'w', encoding=self.encoding)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, cue: Cue):
+        self.count += 1
+        index = self.count if self.reindex else cue.index
+        self._file.write(f"{index}\n{cue.time}\n{cue.content}\n\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -10,7 +10,36 @@ from .retry_decorator import retry
 from .db import VideoDB
 from .stringUtil import add_suffix_to_filename, abs_to_rel
 from .sys import run_cli_command, get_video_duration
-from .translate_srt import SRTTranslator
+from .ffmpeg_runner import run_ffmpeg
+from .translate_srt import SRTTranslator, translator_registry, translation_cache
+from .settings import load_settings
+from .constants import JobStage, SubtitleMode
+from .job_queue import job_queue
+from .encode import escape_filter_path, encode_args, encode_resolution, resolve_encode_profile, srt_to_ass
+from .segment_burn import burn_in_segments
+
+
+def new_translator(**kwargs) -> SRTTranslator:
+    """按 settings.json 的 translator 配置创建翻译器；模型在进程内共享，不会重复加载"""
+    settings = load_settings('translator')
+    translator_registry.configure(
+        max_models=settings.get('max_models'),
+        memory_budget_mb=settings.get('memory_budget_mb'),
+        idle_seconds=settings.get('idle_seconds'),
+        batch_options={
+            'max_batch_size': settings.get('batch_size'),
+            'max_batch_tokens': settings.get('batch_tokens'),
+            'max_wait_ms': settings.get('batch_wait_ms'),
+        },
+    )
+    if settings.get('backend'):
+        kwargs.setdefault('backend', settings['backend'])
+    if settings.get('chunk_tokens'):
+        kwargs.setdefault('max_tokens', settings['chunk_tokens'])
+    if settings.get('cache_enabled', True):
+        translation_cache.configure(max_entries=settings.get('cache_max_entries'))
+        kwargs.setdefault('cache', translation_cache)
+    return SRTTranslator(**kwargs)
 
 
 def _is_probably_translated_srt(path: str, sample_lines: int = 200) -> bool:
@@ -62,22 +91,47 @@ def add_subtitle(
     title: str,
     video_path: str,
     origin_video_path: str,
-    progress_callback: Optional[Callable[[int, str], None]] = None
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    subtitle_mode: Optional[str] = None
 ) -> Dict[str, str]:
-    def update_progress(percent: int, message: str):
-        if progress_callback:
-            progress_callback(percent, message)
-
+    """准备字幕并嵌入视频；任务流水线中这两步分别由 prepare_subtitle 和 burn_subtitle 完成"""
     need_subtitle = record.get('subtitle_lang')
-    subtitle_title_map = {'en': '英字', 'cn': '中字', 'bilingual': '双字'}
-    subtitles_path = ''
-
     if not need_subtitle:
         return {
             'title': f"[转] {title}",
             'video_path': video_path
         }
 
+    prepared = prepare_subtitle(record, orig_id, title, origin_video_path, progress_callback)
+    return burn_subtitle(
+        title=title,
+        video_path=video_path,
+        origin_video_path=origin_video_path,
+        subtitles_path=prepared['subtitles_path'],
+        subtitle_type=prepared['subtitle_type'],
+        need_subtitle=need_subtitle,
+        progress_callback=progress_callback,
+        subtitle_mode=subtitle_mode
+    )
+
+
+def prepare_subtitle(
+    record: Dict,
+    orig_id: str,
+    title: str,
+    origin_video_path: str,
+    progress_callback: Optional[Callable[[int, str], None]] = None
+) -> Dict[str, str]:
+    """
+    查找、下载或翻译出需要的字幕文件。
+
+    :return: {'subtitles_path': 字幕路径（没有可用字幕时为空）, 'subtitle_type': 'en' / 'cn' / 'bilingual'}
+    """
+    def update_progress(percent: int, message: str):
+        if progress_callback:
+            progress_callback(percent, message)
+
+    need_subtitle = record.get('subtitle_lang')
     subtitles_path = record.get('save_srt', '')
     subtitles_exist = subtitles_path and os.path.exists(subtitles_path)
     subtitle_down_result = False
@@ -136,7 +190,8 @@ def add_subtitle(
         print(f"尝试补充字幕 {orig_id} {title} {subtitles_path}")
         try:
             update_progress(26, '正在下载字幕...')
-            subtitle_down_result = retryable_download(orig_id, subtitles_path, need_subtitle, update_progress)
+            with job_queue.stage(JobStage.SUBTITLE):
+                subtitle_down_result = retryable_download(orig_id, subtitles_path, need_subtitle, update_progress)
 
             if subtitle_down_result:
                 actual_subtitle_type = subtitle_down_result['lang']
@@ -190,11 +245,12 @@ def add_subtitle(
             print("需要双语字幕，但现有字幕不是双语，尝试翻译...")
             try:
                 update_progress(26, '正在翻译字幕...')
-                translator = SRTTranslator(translate_mode='full', domain='programming', max_chars=4000)
                 base_path = subtitles_path.rsplit('.', 1)[0]
                 other_lang = 'cn' if '.en.srt' in subtitles_path else 'en'
                 translated_path = f"{base_path.rsplit('.', 1)[0]}.{other_lang}.srt"
-                translator.translate_srt_file(subtitles_path, translated_path)
+                with job_queue.stage(JobStage.SUBTITLE):
+                    translator = new_translator(translate_mode='full', domain='programming', max_chars=4000)
+                    translator.translate_srt_file(subtitles_path, translated_path)
                 
                 merged_path = subtitles_path.replace('.srt', f'_{other_lang}.srt')
                 if '_' not in merged_path:
@@ -213,14 +269,47 @@ def add_subtitle(
         else:
             actual_subtitle_type = existing_type if existing_type else need_subtitle
 
-    if subtitles_exist:
+    if not subtitles_exist:
+        subtitles_path = ''
+    return {
+        'subtitles_path': subtitles_path,
+        'subtitle_type': actual_subtitle_type
+    }
+
+
+def burn_subtitle(
+    title: str,
+    video_path: str,
+    origin_video_path: str,
+    subtitles_path: str,
+    subtitle_type: str,
+    need_subtitle: str,
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    resolution: Optional[str] = None,
+    subtitle_mode: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    把 prepare_subtitle 得到的字幕嵌入视频，并按字幕类型给标题加前缀。
+
+    subtitle_mode 为 soft 时把 SRT 作为 mov_text 字幕流封装进去（-c copy，不重新编码），
+    否则烧录进画面。
+    """
+    soft = subtitle_mode == SubtitleMode.SOFT.value
+    def update_progress(percent: int, message: str):
+        if progress_callback:
+            progress_callback(percent, message)
+
+    subtitle_title_map = {'en': '英字', 'cn': '中字', 'bilingual': '双字'}
+    actual_subtitle_type = subtitle_type
+
+    if subtitles_path and os.path.exists(subtitles_path):
         try:
             update_progress(30, '正在处理字幕...')
             title_prefix = subtitle_title_map.get(actual_subtitle_type, '转')
             cleaned_title = re.sub(r'^(\[.*?\]\s*)+', '', title)
             title = f"[{title_prefix}] {cleaned_title}"
             # final path with subtitle suffix
-            final_with_srt = add_suffix_to_filename(video_path, 'with_srt')
+            final_with_srt = add_suffix_to_filename(video_path, 'with_sub' if soft else 'with_srt')
 
             # If final file already exists, skip embedding
             if os.path.exists(final_with_srt):
@@ -233,12 +322,16 @@ def add_subtitle(
 
             # write to a temp output first, then atomically rename to final
             temp_output = final_with_srt + '.tmp'
-            ff_args = prepare_ffmpeg_args(
-                origin_video_path,
-                subtitles_path,
-                temp_output,
-                need_subtitle
-            )
+            if soft:
+                ff_args = prepare_mux_args(origin_video_path, subtitles_path, temp_output, actual_subtitle_type)
+            else:
+                ff_args = prepare_ffmpeg_args(
+                    origin_video_path,
+                    subtitles_path,
+                    temp_output,
+                    need_subtitle,
+                    resolution
+                )
             print("加字幕...", title, subtitles_path, ff_args)
             video_duration = get_video_duration(origin_video_path)
 
@@ -251,7 +344,14 @@ def add_subtitle(
 
             update_progress(25, '正在嵌入字幕...')
             try:
-                run_cli_command('ffmpeg', ff_args, ffmpeg_progress_callback, video_duration)
+                if soft:
+                    # 只是重新封装，几秒即可完成，不占用嵌入字幕的并发名额
+                    run_ffmpeg(ff_args, ffmpeg_progress_callback, video_duration)
+                else:
+                    with job_queue.stage(JobStage.BURN_IN):
+                        if not _burn_in_parallel(origin_video_path, subtitles_path, temp_output, need_subtitle,
+                                                 resolution, video_duration, ffmpeg_progress_callback):
+                            run_ffmpeg(ff_args, ffmpeg_progress_callback, video_duration)
                 # move temp to final
                 try:
                     os.replace(temp_output, final_with_srt)
@@ -286,44 +386,97 @@ def add_subtitle(
     }
 
 
+def _subtitle_font(subtitle_lang: Optional[str]) -> Optional[str]:
+    return 'AR PL UKai CN' if subtitle_lang == 'cn' else None
+
+
+def _burn_in_parallel(
+    input_path: str,
+    srt_path: str,
+    output_path: str,
+    subtitle_lang: Optional[str],
+    resolution: Optional[str],
+    duration: Optional[float],
+    progress_callback: Callable[[int, str], None]
+) -> bool:
+    """
+    encode.parallel_segments > 1 且视频足够长时分段并行嵌入字幕；
+    未启用、视频太短或分段失败时返回 False，由调用方单进程处理。
+    """
+    settings = load_settings('encode')
+    segments = int(settings.get('parallel_segments') or 0)
+    min_seconds = float(settings.get('min_segment_seconds') or 0)
+    if segments < 2 or not duration or duration < 2 * min_seconds:
+        return False
+    try:
+        used = burn_in_segments(
+            input_path,
+            srt_path,
+            output_path,
+            resolve_encode_profile(encode_resolution(input_path, resolution)),
+            duration,
+            segments,
+            font_name=_subtitle_font(subtitle_lang),
+            min_segment_seconds=min_seconds,
+            progress_callback=progress_callback
+        )
+        print(f"分段并行嵌入字幕完成，共 {used} 段")
+        return True
+    except Exception as e:
+        print('分段嵌入字幕失败，改为单进程处理:', e)
+        return False
+
+
 def prepare_ffmpeg_args(
     input_path: str,
     srt_path: str,
     output_path: str,
-    subtitle_lang: Optional[str] = None
+    subtitle_lang: Optional[str] = None,
+    resolution: Optional[str] = None
 ) -> List[str]:
+    """
+    嵌入字幕的 ffmpeg 参数：SRT 在进程内转为 ASS，编码参数取自 encode 配置
+    （按分辨率覆盖），一次解码、一次编码，输出带 +faststart 可直接上传。
+    """
+    ass_path = srt_to_ass(srt_path, srt_path[:-4] + '.ass', font_name=_subtitle_font(subtitle_lang))
+    profile = resolve_encode_profile(encode_resolution(input_path, resolution))
+
     if sys.platform == 'win32':
-        rel_input = abs_to_rel(input_path, 3)
-        rel_srt = abs_to_rel(srt_path, 3)
-        ass_path = rel_srt[:-4] + '.ass'
-
-        run_cli_command('ffmpeg', ['-y', '-i', rel_srt, ass_path])
-
-        return [
-            "-y",
-            "-i", rel_input,
-            "-vf", f"ass={ass_path}",
-            output_path
-        ]
-    else:
-        base_args = [
-            "-y",
-            "-i", input_path,
-            "-vf", f"subtitles={srt_path}",
-            "-c:a", "copy",
-            output_path
-        ]
-
-        if subtitle_lang == 'cn':
-            font_style = "force_style='FontName=AR PL UKai CN'"
-            return [
-                "-y",
-                "-i", input_path,
-                "-vf", f"subtitles={srt_path}:{font_style}",
-                "-c:a", "copy",
-                output_path
-            ]
-        return base_args
+        # 滤镜参数中的盘符冒号难以转义，使用相对路径
+        input_path = abs_to_rel(input_path, 3)
+        ass_path = abs_to_rel(ass_path, 3)
+
+    return [
+        "-y",
+        "-i", input_path,
+        "-vf", f"ass={escape_filter_path(ass_path)}",
+        *encode_args(profile),
+        # 输出先写到 .tmp 文件，扩展名无法推断容器格式
+        "-f", "mp4",
+        output_path
+    ]
+
+
+def prepare_mux_args(
+    input_path: str,
+    srt_path: str,
+    output_path: str,
+    subtitle_type: Optional[str] = None
+) -> List[str]:
+    """把 SRT 作为 mov_text 字幕流封装进 mp4，音视频流直接复制"""
+    language = {'en': 'eng', 'cn': 'chi', 'bilingual': 'chi'}.get(subtitle_type or '', 'und')
+    return [
+        "-y",
+        "-i", input_path,
+        "-i", srt_path,
+        "-map", "0:v", "-map", "0:a?", "-map", "1:0",
+        "-c", "copy",
+        "-c:s", "mov_text",
+        "-metadata:s:s:0", f"language={language}",
+        "-movflags", "+faststart",
+        "-f", "mp4",
+        output_path
+    ]
 
 
 def fix_subtitle_path(path: str, lang: str):
@@ -375,7 +528,7 @@ def download_subtitles(
             translated_path = tmp_path.replace(f'.{transcript_lang}.srt', f'.{other_lang}.srt')
             try:
                 update_progress(29, '正在翻译字幕...')
-                translator = SRTTranslator(translate_mode='full', domain='programming', max_chars=4000)
+                translator = new_translator(translate_mode='full', domain='programming', max_chars=4000)
                 translator.translate_srt_file(tmp_path, translated_path)
                 merged_path = tmp_path.replace(f'.{transcript_lang}.srt', f'.{transcript_lang}_{other_lang}.srt')
                 translator.merge_srt_files(tmp_path, translated_path, merged_path)
@@ -404,7 +557,7 @@ def download_subtitles(
         other_lang = 'cn' if transcript.language_code == 'en' else 'en'
         translated_path = tmp_path.replace(f'.{transcript.language_code}.srt', f'.{other_lang}.srt')
         update_progress(29, '正在翻译字幕...')
-        translator = SRTTranslator(translate_mode='full', domain='programming', max_chars=4000)
+        translator = new_translator(translate_mode='full', domain='programming', max_chars=4000)
         translator.translate_srt_file(tmp_path, translated_path)
         merged_path = tmp_path.replace(f'.{transcript.language_code}.srt', f'.{transcript.language_code}_{other_lang}.srt')
         translator.merge_srt_files(tmp_path, translated_path, merged_path)
@@ -415,7 +568,7 @@ def download_subtitles(
         fixed_path = tmp_path.replace(f'.{transcript.language_code}.srt', f'.{need_subtitle}.srt')
         lang = need_subtitle
         update_progress(29, '正在翻译字幕...')
-        translator = SRTTranslator()
+        translator = new_translator()
         translator.translate_srt_file(tmp_path, fixed_path)
         print("srt translated", fixed_path, transcript.language_code, need_subtitle)
     return {
@@ -39,8 +39,11 @@ def find_cover_images(directory, id):
 
 def extract_cover_from_video(video_path: str, output_path: str) -> bool:
     try:
+        # -ss 放在 -i 之前按关键帧快速定位，不必从头解码；视频不足 2 秒时取中间一帧
+        duration = get_video_duration(video_path)
+        seek = min(1.0, duration / 2) if duration else 0
         result = subprocess.run(
-            ['ffmpeg', '-y', '-i', video_path, '-ss', '00:00:01', '-vframes', '1', output_path],
+            ['ffmpeg', '-y', '-ss', f'{seek:.3f}', '-i', video_path, '-vframes', '1', output_path],
             capture_output=True,
             text=True
         )
@@ -99,18 +102,9 @@ def clear_video_directory(path):
 
 
 def get_video_duration(video_path: str) -> Optional[float]:
-    try:
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'default=noprint_wrappers=1:nokey=1', video_path],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except Exception as e:
-        print(f"获取视频时长失败: {e}")
-    return None
+    # 延迟导入：probe 依赖 db，而 db 依赖本模块
+    from .probe import probe_duration
+    return probe_duration(video_path)
 
 
 def get_file_size(file_path: str) -> str:
@@ -1,8 +1,23 @@
-from typing import List, Optional, Callable, Dict
+from typing import List, Optional, Callable, Dict, Tuple
+from collections import OrderedDict
+from itertools import zip_longest
+from bisect import bisect_left
+import os
+import json
 import time
 import logging
+import threading
+import sqlite3
+import hashlib
+import unicodedata
 import re
 
+try:
+    from .srt_stream import Cue, SrtWriter, count_cues, iter_cues
+except ImportError:
+    # 作为独立脚本运行时（python translate_srt.py ...）
+    from srt_stream import Cue, SrtWriter, count_cues, iter_cues
+
 
 def _parse_time(t: str) -> float:
     """Parse SRT time format 'HH:MM:SS,mmm' to seconds (float)."""
@@ -24,6 +39,502 @@ def _parse_time(t: str) -> float:
         ms = int(m.group(4))
         return hh * 3600 + mm * 60 + ss + ms / 1000.0
 
+# 推理后端：torch（fp32，原有方式）、torch-int8（动态量化，仅 CPU）、onnx（ONNX Runtime，仅 CPU）
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+CPU_ONLY_BACKENDS = ('torch-int8', 'onnx')
+
+_onnx_export_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'models', 'onnx')
+
+
+def _load_marian(model_name: str, device: str, backend: str = 'torch'):
+    """加载 MarianMT 模型与分词器，返回 (tokenizer, model)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown translator backend: {backend}")
+    from transformers import MarianMTModel, MarianTokenizer
+    tokenizer = MarianTokenizer.from_pretrained(model_name)
+
+    if backend == 'onnx':
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except Exception as e:
+            raise RuntimeError("onnx backend requires optimum[onnxruntime] to be installed") from e
+        # 第一次使用时导出为 ONNX 并保存，之后直接加载导出结果
+        export_path = os.path.join(_onnx_export_dir, model_name.replace('/', '--'))
+        if os.path.isdir(export_path):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_path)
+        else:
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+            model.save_pretrained(export_path)
+        return tokenizer, model
+
+    model = MarianMTModel.from_pretrained(
+        model_name,
+        resume_download=True
+    ).to(device)
+    model.eval()
+    if backend == 'torch-int8':
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+
+def _estimate_model_bytes(model) -> int:
+    """按参数量估算模型占用的内存"""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return 0
+
+
+class _BatchRequest:
+    __slots__ = ('texts', 'results', 'error', 'remaining', 'done')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.results: List[Optional[str]] = [None] * len(texts)
+        self.error: Optional[BaseException] = None
+        self.remaining = len(texts)
+        self.done = threading.Event()
+
+
+class TranslationBatcher:
+    """
+    在 generate 之前合并来自多个调用方（多个正在翻译的 SRT 文件）的文本。
+
+    后台线程每次取走所有排队的请求，把其中的行按 token 长度排序后切成
+    不超过 max_batch_size 行、max_batch_tokens 个（含 padding）token 的批次，
+    逐批调用 translate_fn，再把结果分发回各自的调用方。
+    同一模型只有这一个线程调用 generate，推理天然串行。
+    close() 让线程处理完已排队的请求后退出，之后再有请求时重新启动。
+    """
+
+    def __init__(
+        self,
+        translate_fn: Callable[[List[str]], List[str]],
+        length_fn: Callable[[str], int] = len,
+        max_batch_size: int = 32,
+        max_batch_tokens: int = 6000,
+        max_wait_ms: float = 20
+    ):
+        self.translate_fn = translate_fn
+        self.length_fn = length_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[_BatchRequest] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def translate(self, texts: List[str]) -> List[str]:
+        if not texts:
+            return []
+        request = _BatchRequest(list(texts))
+        with self._cond:
+            self._pending.append(request)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name='translation-batcher', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def close(self, timeout: Optional[float] = None):
+        """停止后台线程并等待它退出；已排队的请求仍会处理完"""
+        with self._cond:
+            self._stopped = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            # 稍等片刻，让同时在翻译的其他文件的请求也进入这一轮
+            if self.max_wait_ms:
+                time.sleep(self.max_wait_ms / 1000.0)
+            with self._cond:
+                requests, self._pending = self._pending, []
+            self._process(requests)
+
+    def _make_batches(self, requests: List[_BatchRequest]):
+        items = []
+        for request in requests:
+            for i, text in enumerate(request.texts):
+                try:
+                    length = self.length_fn(text)
+                except Exception:
+                    length = len(text)
+                items.append((length, request, i))
+        items.sort(key=lambda item: item[0])
+
+        batches = []
+        current = []
+        for item in items:
+            # 排序后批内最长的是最后一行，padding 后的 token 数 = 行数 * 最长行
+            padded = (len(current) + 1) * item[0]
+            if current and (len(current) >= self.max_batch_size or padded > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+            current.append(item)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _process(self, requests: List[_BatchRequest]):
+        for batch in self._make_batches(requests):
+            live = [item for item in batch if item[1].error is None]
+            if not live:
+                continue
+            start_time = time.time()
+            try:
+                outputs = self.translate_fn([request.texts[i] for _, request, i in live])
+                if len(outputs) != len(live):
+                    raise RuntimeError(f"translate_fn returned {len(outputs)} results for {len(live)} inputs")
+            except BaseException as e:
+                for _, request, _ in live:
+                    if request.error is None:
+                        request.error = e
+                        request.done.set()
+                continue
+            logging.debug(f"Batched {len(live)} lines from {len({id(r) for _, r, _ in live})} callers in {time.time() - start_time:.2f}s")
+            for (_, request, i), text in zip(live, outputs):
+                request.results[i] = text
+                request.remaining -= 1
+                if request.remaining == 0:
+                    request.done.set()
+
+
+class _ModelEntry:
+    __slots__ = ('key', 'tokenizer', 'model', 'size_bytes', 'last_used', 'batcher')
+
+    def __init__(self, key, tokenizer, model, size_bytes, batch_options=None):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model
+        self.size_bytes = size_bytes
+        self.last_used = time.time()
+        self.batcher = TranslationBatcher(self.generate, self.token_length, **(batch_options or {}))
+
+    def token_length(self, text: str) -> int:
+        return len(self.tokenizer(text, truncation=True, max_length=512)['input_ids'])
+
+    def generate(self, texts: List[str]) -> List[str]:
+        # 翻译器只在创建时 get() 一次，推理时刷新使用时间，长时间翻译中的模型不会被当作空闲淘汰
+        self.last_used = time.time()
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=512
+        ).to(self.key[1])
+        outputs = self.model.generate(**inputs)
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+class TranslatorRegistry:
+    """
+    进程内共享的翻译模型缓存：每个 (模型, 设备, 推理后端) 只加载一次，供所有任务复用。
+
+    超出 max_models、memory_budget_mb，或空闲超过 idle_seconds 的模型按 LRU 顺序淘汰；
+    空闲淘汰由后台线程定期检查（有模型加载时才运行），只剩一个模型时也会释放。
+    淘汰时从缓存中移除并停止它的合并推理线程，正在使用它的翻译器仍持有引用，用完后由 GC 回收。
+    """
+
+    def __init__(
+        self,
+        max_models: int = 2,
+        memory_budget_mb: Optional[float] = 2048,
+        idle_seconds: Optional[float] = 1800,
+        loader: Callable[[str, str, str], Tuple[object, object]] = _load_marian,
+        batch_options: Optional[Dict[str, float]] = None
+    ):
+        self.max_models = max_models
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_seconds = idle_seconds
+        self.loader = loader
+        # 传给每个模型的 TranslationBatcher：max_batch_size / max_batch_tokens / max_wait_ms
+        self.batch_options = dict(batch_options or {})
+        self._entries: "OrderedDict[Tuple[str, str, str], _ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._reaper: Optional[threading.Thread] = None
+
+    def configure(self, max_models=None, memory_budget_mb=None, idle_seconds=None, batch_options=None):
+        if max_models is not None:
+            self.max_models = max_models
+        if memory_budget_mb is not None:
+            self.memory_budget_mb = memory_budget_mb
+        if idle_seconds is not None:
+            self.idle_seconds = idle_seconds
+        if batch_options:
+            self.batch_options.update({k: v for k, v in batch_options.items() if v is not None})
+
+    def get(self, model_name: str, device: str, backend: str = 'torch') -> _ModelEntry:
+        key = (model_name, device, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.time()
+                self._entries.move_to_end(key)
+                return entry
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # 加载耗时较长，不持有全局锁；同一模型并发请求时只加载一次
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = time.time()
+                    self._entries.move_to_end(key)
+                    return entry
+            start_time = time.time()
+            tokenizer, model = self.loader(model_name, device, backend)
+            entry = _ModelEntry(key, tokenizer, model, _estimate_model_bytes(model), self.batch_options)
+            logging.info(
+                f"Loaded {model_name} ({backend}) on {device} in {time.time() - start_time:.1f}s "
+                f"(~{entry.size_bytes / 1024 / 1024:.0f} MB)"
+            )
+            with self._lock:
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                dropped = self._evict(keep=key)
+                self._ensure_reaper()
+            self._close(dropped)
+            return entry
+
+    def evict_idle(self):
+        with self._lock:
+            dropped = self._evict()
+        self._close(dropped)
+
+    def _ensure_reaper(self):
+        """调用方需持有 self._lock"""
+        if self.idle_seconds is None or (self._reaper is not None and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap, name='translator-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        """定期淘汰空闲的模型，缓存清空后退出，下次加载模型时重新启动"""
+        while True:
+            time.sleep(min(max((self.idle_seconds or 120) / 2, 0.1), 60))
+            self.evict_idle()
+            with self._lock:
+                if not self._entries:
+                    self._reaper = None
+                    return
+
+    def loaded_models(self) -> List[Tuple[str, str, str]]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            dropped = list(self._entries.values())
+            self._entries.clear()
+        self._close(dropped)
+
+    def _evict(self, keep=None) -> List[_ModelEntry]:
+        """按 LRU 顺序淘汰，返回被淘汰的模型；调用方需持有 self._lock，释放锁后再 _close()"""
+        now = time.time()
+        dropped = []
+        if self.idle_seconds is not None:
+            for key, entry in list(self._entries.items()):
+                if key != keep and now - entry.last_used > self.idle_seconds:
+                    dropped.append(self._drop(key, 'idle'))
+
+        def over_budget():
+            if self.max_models is not None and len(self._entries) > self.max_models:
+                return True
+            if self.memory_budget_mb is not None:
+                total = sum(e.size_bytes for e in self._entries.values())
+                return total > self.memory_budget_mb * 1024 * 1024
+            return False
+
+        for key in list(self._entries.keys()):
+            if not over_budget():
+                break
+            if key != keep:
+                dropped.append(self._drop(key, 'lru'))
+        return dropped
+
+    def _drop(self, key, reason) -> _ModelEntry:
+        logging.info(f"Evicted translation model {key[0]} ({key[2]}) on {key[1]} ({reason})")
+        return self._entries.pop(key)
+
+    @staticmethod
+    def _close(entries: List[_ModelEntry]):
+        # 合并推理线程持有 entry.generate，不停止它模型就无法被回收；可能要等当前批次推理完成，不能持有 self._lock
+        for entry in entries:
+            entry.batcher.close()
+
+
+translator_registry = TranslatorRegistry()
+
+
+_default_cache_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'db', 'translation_cache.db'
+)
+
+
+def _normalize_source(text: str) -> str:
+    """缓存键使用的规范化原文：统一 Unicode 形式并压缩空白"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class TranslationCache:
+    """
+    持久化的翻译记忆：按 (模型, 推理后端, 领域, 规范化后的原文) 缓存译文；量化或 ONNX 后端的译文可能与 torch 不同，分开缓存。
+
+    片头片尾、"Thanks for watching" 之类的重复字幕以及任务重试时已经翻译过的行
+    直接从缓存返回，不再经过模型。条目超过 max_entries 时按最近使用时间淘汰最旧的一批。
+    数据库在第一次使用时才创建。
+    """
+    _query_chunk = 500
+
+    def __init__(self, path: str = _default_cache_path, max_entries: Optional[int] = 200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def configure(self, path=None, max_entries=None):
+        with self._lock:
+            if path is not None and os.path.abspath(path) != os.path.abspath(self.path):
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                self.path = path
+            if max_entries is not None:
+                self.max_entries = max_entries
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(translations)")]
+            if columns and 'backend' not in columns:
+                # 旧版缓存没有区分推理后端，直接丢弃重建
+                conn.execute("DROP TABLE translations")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    model TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, backend, domain, source_hash)
+                );
+                CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used);
+            """)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(text: str) -> Tuple[str, str]:
+        source = _normalize_source(text)
+        return source, hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, domain: Optional[str], texts: List[str], backend: str = "torch") -> Dict[int, str]:
+        """返回 {texts 中的下标: 译文}，只包含命中的条目"""
+        if not texts:
+            return {}
+        keys = [self._key(t) for t in texts]
+        found: Dict[str, Tuple[str, str]] = {}
+        with self._lock:
+            conn = self._connect()
+            hashes = list({h for _, h in keys})
+            # 分批查询，避免超过 SQLite 的参数数量上限
+            for start in range(0, len(hashes), self._query_chunk):
+                part = hashes[start:start + self._query_chunk]
+                rows = conn.execute(
+                    f"SELECT source_hash, source, target FROM translations "
+                    f"WHERE model = ? AND backend = ? AND domain = ? AND source_hash IN ({','.join('?' * len(part))})",
+                    [model_name, backend, domain or "", *part]
+                ).fetchall()
+                for source_hash, source, target in rows:
+                    found[source_hash] = (source, target)
+            result = {}
+            for i, (source, source_hash) in enumerate(keys):
+                hit = found.get(source_hash)
+                if hit is not None and hit[0] == source:
+                    result[i] = hit[1]
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE model = ? AND backend = ? AND domain = ? AND source_hash = ?",
+                    [(now, model_name, backend, domain or "", h) for h in found]
+                )
+                conn.commit()
+            self.hits += len(result)
+            self.misses += len(texts) - len(result)
+        return result
+
+    def put_many(self, model_name: str, domain: Optional[str], pairs: List[Tuple[str, str]], backend: str = "torch"):
+        """写入 (原文, 译文)，随后按 max_entries 淘汰最久未使用的条目"""
+        if not pairs:
+            return
+        now = time.time()
+        rows = []
+        for text, target in pairs:
+            source, source_hash = self._key(text)
+            if source:
+                rows.append((model_name, backend, domain or "", source_hash, source, target, now))
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations (model, backend, domain, source_hash, source, target, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if self.max_entries:
+                count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                if count > self.max_entries:
+                    # 多删 10%，避免每次写入都触发淘汰
+                    excess = count - self.max_entries + self.max_entries // 10
+                    conn.execute(
+                        "DELETE FROM translations WHERE rowid IN "
+                        "(SELECT rowid FROM translations ORDER BY last_used ASC, rowid ASC LIMIT ?)",
+                        (excess,)
+                    )
+            conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM translations")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+
+translation_cache = TranslationCache()
+
+
 class SRTTranslator:
     def __init__(
         self,
@@ -31,9 +542,12 @@ class SRTTranslator:
         device: Optional[str] = None,
         batch_size: int = 8,
         max_chars: int = 4000,
+        max_tokens: int = 400,
         translate_mode: str = "batch",
         domain: Optional[str] = None,
-        glossary: Optional[Dict[str, str]] = None
+        glossary: Optional[Dict[str, str]] = None,
+        cache: Optional[TranslationCache] = None,
+        backend: str = "torch"
     ):
         """
         初始化本地字幕翻译器
@@ -43,18 +557,30 @@ class SRTTranslator:
             device: 指定设备 (None自动检测)
             batch_size: 翻译批处理大小
             max_chars: 单条字幕最大字符数
+            max_tokens: 全文模式下每个分块的 token 上限（模型输入在 512 token 处截断）
+            cache: 翻译记忆缓存，None 表示不使用缓存
+            backend: 推理后端，torch / torch-int8 / onnx（后两者只在 CPU 上运行）
         """
         # delayed imports so the module can be loaded without heavy ML deps
         try:
             import torch
-            from transformers import MarianMTModel, MarianTokenizer
+            import transformers  # noqa: F401
         except Exception as e:
             raise RuntimeError("SRTTranslator requires torch and transformers to be installed") from e
 
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown translator backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        if backend in CPU_ONLY_BACKENDS:
+            if device and device != "cpu":
+                logging.warning(f"Backend {backend} runs on CPU only; ignoring device {device}")
+            device = "cpu"
+        self.backend = backend
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.batch_size = batch_size
         # max_chars used for chunking when doing full-text translation
         self.max_chars = max_chars
+        # token budget per chunk in full-text mode; several chunks are translated per generate call
+        self.max_tokens = max_tokens
         # translate_mode: 'batch' (per-subtitle batches) or 'full' (concatenate then split)
         self.translate_mode = translate_mode
         # domain hint to help preserve technical terminology
@@ -62,31 +588,205 @@ class SRTTranslator:
         # optional glossary to apply post-translation replacements {src: dst}
         self.glossary = glossary or {}
         
-        # 初始化模型
-        # imported inside __init__ so unit tests that only use merging don't need heavy packages
-        self.tokenizer = MarianTokenizer.from_pretrained(model_name)
-        self.model = MarianMTModel.from_pretrained(
-            model_name,
-            resume_download=True
-        ).to(self.device)
-        
-        logging.info(f"Initialized translator with {model_name} on {self.device}")
+        # 模型由进程内的 translator_registry 共享，只在第一次使用时加载
+        self.model_name = model_name
+        entry = translator_registry.get(model_name, self.device, backend)
+        self.tokenizer = entry.tokenizer
+        self.model = entry.model
+        # 所有使用同一模型的翻译器共用一个批处理器，跨文件合并推理批次
+        self._batcher = entry.batcher
+        self.cache = cache
+
+        logging.info(f"Initialized translator with {model_name} ({backend}) on {self.device}")
 
-    def translate_texts(self, texts: List[str]) -> List[str]:
-        """批量翻译文本列表"""
+    def translate_texts(self, texts: List[str], use_cache: bool = True) -> List[str]:
+        """批量翻译文本列表（与其他正在翻译的文件合并成更大的批次）；use_cache 为 False 时不查也不写翻译记忆"""
         if not texts:
             return []
-            
-        inputs = self.tokenizer(
-            texts,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=512
-        ).to(self.device)
-        
-        outputs = self.model.generate(**inputs)
-        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        cache = getattr(self, 'cache', None) if use_cache else None
+        if cache is None:
+            return self._batcher.translate(texts)
+
+        # 先查翻译记忆，只把未命中的行交给模型
+        backend = getattr(self, 'backend', 'torch')
+        cached = cache.get_many(self.model_name, self.domain, texts, backend=backend)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if missing:
+            outputs = self._batcher.translate([texts[i] for i in missing])
+            cache.put_many(self.model_name, self.domain, [(texts[i], out) for i, out in zip(missing, outputs)], backend=backend)
+            cached.update(zip(missing, outputs))
+        return [cached[i] for i in range(len(texts))]
+
+    def _chunk_budget(self) -> Tuple[Callable[[str], int], int]:
+        """
+        Return (measure, budget) used for chunking: token counts against max_tokens when a
+        tokenizer is available (the model truncates its input at 512 tokens), otherwise
+        char counts against max_chars.
+        """
+        tokenizer = getattr(self, 'tokenizer', None)
+        max_tokens = getattr(self, 'max_tokens', None)
+        if tokenizer is None or not max_tokens:
+            return len, self.max_chars
+
+        def measure(text: str) -> int:
+            return len(tokenizer(text, add_special_tokens=False)['input_ids'])
+
+        budget = max_tokens
+        if self.domain:
+            budget -= measure(f"[DOMAIN: {self.domain}]\n")
+        return measure, max(budget, 1)
+
+    def _build_chunks(self, subtitles: List[object]) -> List[List[Tuple[int, str]]]:
+        """
+        Concatenate subtitle contents with unique markers and group them into chunks
+        that fit the chunk budget. Each chunk is a list of (subtitle index, marked part).
+        """
+        measure, budget = self._chunk_budget()
+        chunks = []
+        current = []
+        current_len = 0
+        for idx, sub in enumerate(subtitles):
+            content = sub.content
+            part = f"|||SEG{idx}|||\n{content}\n"
+            if measure(part) > budget:
+                # split content into sentence-like pieces (handles Chinese/English punctuation and newlines)
+                pieces = [p.strip() for p in re.split(r'(?<=[。.!?\n])\s*', content) if p.strip()]
+                if not pieces:
+                    pieces = [content]
+                parts = [f"|||SEG{idx}_SUB{n}|||\n{piece}\n" for n, piece in enumerate(pieces)]
+            else:
+                parts = [part]
+            for p in parts:
+                size = measure(p)
+                if current and (current_len + size > budget):
+                    chunks.append(current)
+                    current = []
+                    current_len = 0
+                current.append((idx, p))
+                current_len += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _split_marked(text: str) -> Dict[int, Dict[int, str]]:
+        """Split translated text back by markers: idx -> {subidx: text} (0 for no-subparts)"""
+        # supports SEG{idx} and SEG{idx}_SUB{n}
+        pattern = re.compile(r"\|\|\|SEG(\d+)(?:_SUB(\d+))?\|\|\|\s*(.*?)\s*(?=(\|\|\|SEG\d+(?:_SUB\d+)?\|\||\Z))", re.S)
+        grouped: Dict[int, Dict[int, str]] = {}
+        for m in pattern.finditer(text):
+            idx = int(m.group(1))
+            sub = int(m.group(2)) if m.group(2) is not None else 0
+            grouped.setdefault(idx, {})[sub] = m.group(3).strip()
+        return grouped
+
+    def _chunk_key(self, chunk_text: str) -> str:
+        model_name = getattr(self, 'model_name', '')
+        return hashlib.sha1(f"{model_name}\n{chunk_text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _load_checkpoint(path: Optional[str]) -> Dict[str, str]:
+        """读取已完成的分块译文 {分块哈希: 译文}；最后一行可能因进程被杀而不完整，直接忽略"""
+        done: Dict[str, str] = {}
+        if not path or not os.path.exists(path):
+            return done
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    done[record['hash']] = record['output']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return done
+
+    def _translate_full_partial(
+        self,
+        subtitles: List[object],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        checkpoint_path: Optional[str] = None
+    ) -> Dict[int, str]:
+        """
+        Translate subtitles in full-text mode, several token-budgeted chunks per
+        translate_texts call.
+        Returns {subtitle index: translated text} for the segments whose markers survived
+        translation; missing indices are left for the batch fallback.
+
+        When checkpoint_path is given, every translated chunk is appended to it (JSON lines,
+        keyed by chunk hash) so that a rerun skips the chunks that were already done.
+        """
+        chunks = self._build_chunks(subtitles)
+        checkpoint = self._load_checkpoint(checkpoint_path)
+        if checkpoint:
+            logging.info(f"Resuming full-text translation from {checkpoint_path} ({len(checkpoint)} chunks done)")
+
+        translated: Dict[int, str] = {}
+        total = len(subtitles)
+        done = set()
+        texts = []
+        for ch in chunks:
+            chunk_text = "".join(p for _, p in ch)
+            if self.domain:
+                chunk_text = f"[DOMAIN: {self.domain}]\n" + chunk_text
+            texts.append(chunk_text)
+        outputs: List[Optional[str]] = [checkpoint.get(self._chunk_key(t)) for t in texts]
+
+        def collect(n: int):
+            # 只接受属于本分块的片段，标记被模型改坏的片段留给逐条翻译
+            grouped = self._split_marked(outputs[n] or "")
+            for idx in {i for i, _ in chunks[n]}:
+                parts = grouped.get(idx)
+                if parts:
+                    translated[idx] = '\n'.join(parts[k] for k in sorted(parts.keys()))
+            done.update(i for i, _ in chunks[n])
+
+        for n in range(len(chunks)):
+            if outputs[n] is not None:
+                collect(n)
+        if progress_callback and done:
+            progress_callback(min(len(done), total), total)
+
+        # 多个分块放进同一次 translate_texts，由模型的批处理器一起 generate；
+        # 每组完成后写入检查点，中断时最多损失一组
+        pending = [n for n in range(len(chunks)) if outputs[n] is None]
+        group_size = max(1, getattr(self, 'batch_size', 8))
+        writer = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+        try:
+            for start in range(0, len(pending), group_size):
+                group = pending[start:start + group_size]
+                try:
+                    # 分块文本带有分段标记，几乎不会重复出现，不写入翻译记忆
+                    results = self.translate_texts([texts[n] for n in group], use_cache=False)
+                except Exception as e:
+                    logging.warning(f"Full-text chunk translation failed: {e}")
+                    results = [None] * len(group)
+                for n, out in zip(group, results):
+                    outputs[n] = out
+                    if out is not None and writer:
+                        writer.write(json.dumps({"hash": self._chunk_key(texts[n]), "output": out}, ensure_ascii=False) + "\n")
+                    collect(n)
+                if writer:
+                    writer.flush()
+                if progress_callback:
+                    progress_callback(min(len(done), total), total)
+        finally:
+            if writer:
+                writer.close()
+        return translated
+
+    def _make_subtitle(self, original: object, text: str, apply_glossary: bool = False) -> object:
+        if apply_glossary:
+            for src, dst in getattr(self, 'glossary', {}).items():
+                text = text.replace(src, dst)
+        if isinstance(original, Cue):
+            return original.replace(content=text)
+        # 延迟导入 srt 以便模块可以被测试导入
+        import srt as _srt
+        return _srt.Subtitle(
+            index=original.index,
+            start=original.start,
+            end=original.end,
+            content=text
+        )
 
     def _translate_full(self, subtitles: List[object], progress_callback: Optional[Callable[[int, int], None]] = None) -> List[object] | None:
         """
@@ -94,96 +794,12 @@ class SRTTranslator:
         then split translated text back by markers to produce translated subtitles.
         Returns None on failure to indicate fallback should be used.
         """
-        import re
         try:
-            # build segments with markers
-            segments = []
-            for i, sub in enumerate(subtitles):
-                segments.append((i, sub.content))
-
-            # chunk segments so each chunk's char length <= max_chars
-            # If a single segment is larger than max_chars, split it into sentence-like subparts
-            chunks = []
-            current = []
-            current_len = 0
-            for idx, content in segments:
-                part = f"|||SEG{idx}|||\n{content}\n"
-                if len(part) > self.max_chars:
-                    # split content into sentence-like pieces (handles Chinese/English punctuation and newlines)
-                    pieces = [p.strip() for p in re.split(r'(?<=[。.!?\n])\s*', content) if p.strip()]
-                    if not pieces:
-                        pieces = [content]
-                    for n, piece in enumerate(pieces):
-                        subpart = f"|||SEG{idx}_SUB{n}|||\n{piece}\n"
-                        if current and (current_len + len(subpart) > self.max_chars):
-                            chunks.append(current)
-                            current = [subpart]
-                            current_len = len(subpart)
-                        else:
-                            current.append(subpart)
-                            current_len += len(subpart)
-                else:
-                    if current and (current_len + len(part) > self.max_chars):
-                        chunks.append(current)
-                        current = [part]
-                        current_len = len(part)
-                    else:
-                        current.append(part)
-                        current_len += len(part)
-            if current:
-                chunks.append(current)
-
-            translated_chunks = []
-            total = len(subtitles)
-            done = 0
-            for ch in chunks:
-                chunk_text = "".join(ch)
-                if self.domain:
-                    chunk_text = f"[DOMAIN: {self.domain}]\n" + chunk_text
-                # translate whole chunk as single item to preserve markers ordering
-                out = self.translate_texts([chunk_text])[0]
-                translated_chunks.append(out)
-                # update progress if provided
-                done += sum(1 for _ in ch)
-                if progress_callback:
-                    progress_callback(min(done, total), total)
-
-            combined = "".join(translated_chunks)
-            # regex to extract marker and following content until next marker or end
-            # supports SEG{idx} and SEG{idx}_SUB{n}
-            pattern = re.compile(r"\|\|\|SEG(\d+)(?:_SUB(\d+))?\|\|\|\s*(.*?)\s*(?=(\|\|\|SEG\d+(?:_SUB\d+)?\|\||\Z))", re.S)
-            found = list(pattern.finditer(combined))
-
-            # build mapping idx -> {subidx: text} or idx -> {0: text} for no-subparts
-            grouped: Dict[int, Dict[int, str]] = {}
-            for m in found:
-                idx = int(m.group(1))
-                sub = int(m.group(2)) if m.group(2) is not None else 0
-                txt = m.group(3).strip()
-                grouped.setdefault(idx, {})[sub] = txt
-
+            translated = self._translate_full_partial(subtitles, progress_callback)
             # ensure every subtitle index has at least something
-            if any(i not in grouped for i in range(len(subtitles))):
+            if any(i not in translated for i in range(len(subtitles))):
                 return None
-
-            # construct translated subtitle objects by joining subparts in order
-            import srt as _srt
-            translated_subs = []
-            for i, orig in enumerate(subtitles):
-                parts = grouped.get(i, {0: orig.content})
-                joined = '\n'.join(parts[k] for k in sorted(parts.keys()))
-                text = joined
-                # apply glossary replacements
-                for src, dst in self.glossary.items():
-                    text = text.replace(src, dst)
-
-                translated_subs.append(_srt.Subtitle(
-                    index=orig.index,
-                    start=orig.start,
-                    end=orig.end,
-                    content=text
-                ))
-            return translated_subs
+            return [self._make_subtitle(orig, translated[i], apply_glossary=True) for i, orig in enumerate(subtitles)]
         except Exception:
             return None
 
@@ -196,64 +812,110 @@ class SRTTranslator:
     ) -> None:
         """
         翻译整个SRT文件
-        
+
         参数:
             input_path: 输入文件路径
             output_path: 输出文件路径
             encoding: 文件编码
             progress_callback: 进度回调函数 (current, total)
+
+        字幕按 stream_window 条一组流式读取、翻译并写出，内存占用与文件大小无关；
+        输出先写到 output_path + '.part'，完成后再替换。
+        全文模式下已完成的分块写入 output_path + '.chunks.jsonl'，中断后重新执行会从中恢复，
+        输出文件写完后删除该文件。
         """
         try:
-            import srt
-            with open(input_path, 'r', encoding=encoding) as f:
-                subtitles = list(srt.parse(f.read()))
-            
-            total_subs = len(subtitles)
-            translated_subs = []
-
-            # If configured, try full-text mode first
-            if self.translate_mode == 'full':
-                full_result = self._translate_full(subtitles, progress_callback)
-                if full_result is not None:
-                    translated_subs = full_result
-                else:
-                    # fallback to batch processing
-                    logging.info('Full-text translation failed or incomplete; falling back to batch mode')
+            total_subs = count_cues(input_path, encoding)
+            checkpoint_path = f"{output_path}.chunks.jsonl"
+            part_path = f"{output_path}.part"
+            window_size = getattr(self, 'stream_window', 1000)
+            done = 0
 
-            if not translated_subs:
-                current_batch = []
-                batch_indices = []
+            def window_progress(current: int, total: int):
+                if progress_callback:
+                    progress_callback(min(done + current, total_subs), total_subs)
+
+            with SrtWriter(part_path, encoding=encoding, reindex=True) as writer:
+                window: List[Cue] = []
+                for cue in iter_cues(input_path, encoding):
+                    window.append(cue)
+                    if len(window) >= window_size:
+                        for translated in self._translate_window(window, checkpoint_path, window_progress):
+                            writer.write(translated)
+                        done += len(window)
+                        window = []
+                if window:
+                    for translated in self._translate_window(window, checkpoint_path, window_progress):
+                        writer.write(translated)
+            os.replace(part_path, output_path)
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
 
-                for i, sub in enumerate(subtitles):
-                    if len(sub.content) > self.max_chars:
-                        logging.warning(f"Subtitle {i} exceeds {self.max_chars} characters")
-                        translated_subs.append(sub)
-                        continue
-                        
-                    current_batch.append(sub.content)
-                    batch_indices.append(i)
-                    
-                    if len(current_batch) >= self.batch_size:
-                        self._process_batch(current_batch, batch_indices, subtitles, translated_subs)
-                        if progress_callback:
-                            progress_callback(len(translated_subs), total_subs)
-                        current_batch = []
-                        batch_indices = []
-                
-                if current_batch:
-                    self._process_batch(current_batch, batch_indices, subtitles, translated_subs)
-                    if progress_callback:
-                        progress_callback(len(translated_subs), total_subs)
-            
-            # 写入输出文件
-            with open(output_path, 'w', encoding=encoding) as f:
-                f.write(srt.compose(translated_subs))
-            
             logging.info(f"Translation completed. Output saved to {output_path}")
+            cache = getattr(self, 'cache', None)
+            if cache is not None:
+                stats = cache.stats()
+                logging.info(
+                    f"Translation cache: {stats['hits']} hits, {stats['misses']} misses, "
+                    f"{stats['entries']} entries"
+                )
         except KeyboardInterrupt:
             logging.info("\n用户中断了字幕翻译")
             raise
 
+    def _translate_window(
+        self,
+        subtitles: List[Cue],
+        checkpoint_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Cue]:
+        """翻译一组字幕：全文模式优先，未能对齐的字幕再逐条批量翻译"""
+        total_subs = len(subtitles)
+        translated_subs: List[Optional[Cue]] = [None] * total_subs
+
+        # If configured, try full-text mode first
+        if self.translate_mode == 'full':
+            try:
+                partial = self._translate_full_partial(subtitles, progress_callback, checkpoint_path)
+            except Exception as e:
+                logging.warning(f"Full-text translation failed: {e}")
+                partial = {}
+            for i, text in partial.items():
+                translated_subs[i] = self._make_subtitle(subtitles[i], text, apply_glossary=True)
+            if len(partial) < total_subs:
+                # fallback to batch processing for the segments that did not survive
+                logging.info(
+                    f'Full-text translation incomplete ({len(partial)}/{total_subs}); '
+                    f'falling back to batch mode for the rest'
+                )
+
+        current_batch = []
+        batch_indices = []
+
+        for i, sub in enumerate(subtitles):
+            if translated_subs[i] is not None:
+                continue
+            if len(sub.content) > self.max_chars:
+                logging.warning(f"Subtitle {i} exceeds {self.max_chars} characters")
+                translated_subs[i] = sub
+                continue
+
+            current_batch.append(sub.content)
+            batch_indices.append(i)
+
+            if len(current_batch) >= self.batch_size:
+                self._process_batch(current_batch, batch_indices, subtitles, translated_subs)
+                if progress_callback:
+                    progress_callback(sum(1 for s in translated_subs if s is not None), total_subs)
+                current_batch = []
+                batch_indices = []
+
+        if current_batch:
+            self._process_batch(current_batch, batch_indices, subtitles, translated_subs)
+            if progress_callback:
+                progress_callback(sum(1 for s in translated_subs if s is not None), total_subs)
+        return translated_subs
+
     def _process_batch(
         self,
         batch: List[str],
@@ -261,27 +923,19 @@ class SRTTranslator:
         original_subs: List[object],
         output_subs: List[object]
     ) -> None:
-        """处理单个翻译批次（类内部方法）"""
+        """处理单个翻译批次（类内部方法），结果按下标写入 output_subs"""
         start_time = time.time()
         try:
             translated = self.translate_texts(batch)
             for idx, text in zip(indices, translated):
-                original = original_subs[idx]
-                # 延迟导入 srt 以便模块可以被测试导入
-                import srt as _srt
-                output_subs.append(_srt.Subtitle(
-                    index=original.index,
-                    start=original.start,
-                    end=original.end,
-                    content=text
-                ))
+                output_subs[idx] = self._make_subtitle(original_subs[idx], text)
             elapsed = time.time() - start_time
             logging.debug(f"Translated {len(batch)} lines in {elapsed:.2f}s")
         except Exception as e:
             logging.error(f"Translation failed: {str(e)}")
             # 失败时保留原文
             for idx in indices:
-                output_subs.append(original_subs[idx])
+                output_subs[idx] = original_subs[idx]
 
     def merge_srt_files(
         self,
@@ -303,103 +957,80 @@ def merge_srt_files(original_path: str, translated_path: str, output_path: str,
 
     每条字幕会把原文和译文放在同一个条目里，用换行分隔。对齐策略：按索引逐条合并；
     如果长度不一致，会把其中缺失的条目按原样追加。
+    按索引合并时两个文件都是流式读取、逐条写出；按时间合并时只有译文整体读入内存。
     """
     # Minimal SRT merge implementation that does not depend on the external `srt` package.
-    def _read_blocks(path: str):
-        text = open(path, 'r', encoding=encoding).read().strip()
-        if not text:
-            return []
+    if align_by not in ('index', 'time'):
+        raise ValueError(f"Unknown align_by: {align_by}")
 
-        # SRT blocks are usually separated by two newlines; handle CRLF and LF
-        blocks = [b.strip() for b in re.split(r"\r?\n\r?\n", text) if b.strip()]
-        parsed = []
-        for b in blocks:
-            lines = b.splitlines()
-            if len(lines) < 2:
-                continue
-            idx = lines[0].strip()
-            times = lines[1].strip()
-            content = "\n".join(l.rstrip() for l in lines[2:]).strip()
-            # try extract start/end times
-            start_s, end_s = None, None
-            try:
-                start_str, end_str = times.split('-->')
-                start_s = _parse_time(start_str.strip())
-                end_s = _parse_time(end_str.strip())
-            except Exception:
-                start_s = None
-                end_s = None
-            parsed.append({'index': idx, 'time': times, 'content': content, 'start': start_s, 'end': end_s})
-        return parsed
-
-    originals = _read_blocks(original_path)
-    translated = _read_blocks(translated_path)
-
-    merged_blocks = []
-    if align_by == 'index':
-        max_len = max(len(originals), len(translated))
-        for i in range(max_len):
-            orig = originals[i] if i < len(originals) else None
-            trans = translated[i] if i < len(translated) else None
-
-            if orig and trans:
-                content = f"{orig['content']}\n{trans['content']}"
-                times = orig['time']
-                idx = orig['index']
-            elif orig:
-                content = orig['content']
-                times = orig['time']
-                idx = orig['index']
-            else:
-                content = trans['content']
-                times = trans['time']
-                idx = trans['index']
+    with SrtWriter(output_path, encoding=encoding) as writer:
+        if align_by == 'index':
+            for orig, trans in zip_longest(iter_cues(original_path, encoding), iter_cues(translated_path, encoding)):
+                if orig and trans:
+                    writer.write(orig.replace(content=f"{orig.content}\n{trans.content}"))
+                else:
+                    writer.write(orig or trans)
+            return
 
-            merged_blocks.append({'index': idx, 'time': times, 'content': content})
-    elif align_by == 'time':
         # Match by timestamp overlap: for each original, find the translated block with max overlap
-        used_t = set()
-
-        def overlap(a_start, a_end, b_start, b_end):
-            if a_start is None or a_end is None or b_start is None or b_end is None:
-                return 0.0
-            return max(0.0, min(a_end, b_end) - max(a_start, b_start))
-
-        for orig in originals:
-            best_idx = None
-            best_overlap = 0.0
-            for j, tr in enumerate(translated):
-                if j in used_t:
-                    continue
-                ov = overlap(orig.get('start'), orig.get('end'), tr.get('start'), tr.get('end'))
-                if ov > best_overlap:
-                    best_overlap = ov
-                    best_idx = j
-
-            if best_idx is not None and best_overlap > 0:
-                tr = translated[best_idx]
-                used_t.add(best_idx)
-                content = f"{orig['content']}\n{tr['content']}"
+        translated = list(iter_cues(translated_path, encoding))
+        index = _OverlapIndex(translated)
+        for orig in iter_cues(original_path, encoding):
+            best_idx = index.take_best(orig.start_ms, orig.end_ms)
+            if best_idx is not None:
+                writer.write(orig.replace(content=f"{orig.content}\n{translated[best_idx].content}"))
             else:
-                content = orig['content']
-
-            merged_blocks.append({'index': orig['index'], 'time': orig['time'], 'content': content})
+                writer.write(orig)
 
         # Add leftover translated blocks that did not match
         for j, tr in enumerate(translated):
-            if j in used_t:
-                continue
-            merged_blocks.append({'index': tr['index'], 'time': tr['time'], 'content': tr['content']})
-    else:
-        raise ValueError(f"Unknown align_by: {align_by}")
+            if j not in index.used:
+                writer.write(tr)
 
-    with open(output_path, 'w', encoding=encoding) as f:
-        for block in merged_blocks:
-            f.write(f"{block['index']}\n")
-            f.write(f"{block['time']}\n")
-            f.write(f"{block['content']}\n\n")
 
-    
+class _OverlapIndex:
+    """
+    按开始时间排序的译文区间索引，用于按时间对齐。
+
+    查询 [start, end) 时二分找到最后一个开始时间早于 end 的译文，再向前扫描，
+    直到前缀最大结束时间 <= start（更早的译文都不可能重叠）。字幕基本按时间排列时
+    每次只扫描与之重叠的几条，整体 O((n + m) log m)，输入乱序也能得到正确结果。
+    选择规则与逐条比较相同：未使用的译文中重叠最长者胜出，并列时取文件中靠前的。
+    """
+
+    def __init__(self, cues: List[Cue]):
+        timed = sorted(
+            (cue.start_ms, cue.end_ms, j) for j, cue in enumerate(cues)
+            if cue.start_ms is not None and cue.end_ms is not None
+        )
+        self.starts = [start for start, _, _ in timed]
+        self.entries = timed
+        self.max_end = []
+        running = None
+        for _, end, _ in timed:
+            running = end if running is None else max(running, end)
+            self.max_end.append(running)
+        self.used = set()
+
+    def take_best(self, start: Optional[int], end: Optional[int]) -> Optional[int]:
+        if start is None or end is None:
+            return None
+        best_idx = None
+        best_overlap = 0
+        k = bisect_left(self.starts, end) - 1
+        while k >= 0 and self.max_end[k] > start:
+            tr_start, tr_end, j = self.entries[k]
+            k -= 1
+            if j in self.used:
+                continue
+            ov = min(end, tr_end) - max(start, tr_start)
+            if ov > best_overlap or (ov == best_overlap and best_idx is not None and j < best_idx):
+                best_overlap = ov
+                best_idx = j
+        if best_idx is not None and best_overlap > 0:
+            self.used.add(best_idx)
+            return best_idx
+        return None
 
 
 def main():
@@ -421,6 +1052,8 @@ def main():
     parser.add_argument('--batch_size', type=int, default=8, help='Batch size for translation')
     parser.add_argument('--model', type=str, default="Helsinki-NLP/opus-mt-en-zh", help='Model name')
     parser.add_argument('--log', type=str, default="INFO", help='Logging level')
+    parser.add_argument('--backend', choices=BACKENDS, default='torch', help='Inference backend')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the translation memory cache')
     args = parser.parse_args()
 
     logging.basicConfig(level=args.log.upper())
@@ -439,7 +1072,9 @@ def main():
     try:
         translator = SRTTranslator(
             model_name=args.model,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            cache=None if args.no_cache else translation_cache,
+            backend=args.backend
         )
     except RuntimeError as e:
         print(f"Translator cannot initialize: {e}")
@@ -0,0 +1,119 @@
+"""
+上传前检查：用 ffprobe 缓存的元数据判断视频能否直接上传。
+
+- 编码为 H.264/HEVC + AAC/MP3、mp4 容器且 moov 在 mdat 之前：直接上传
+- 编码可用但 moov 在文件末尾或不是 mp4 容器：-c copy -movflags +faststart 重新封装
+- 编码不被支持：按 encode 配置重新编码
+处理结果原地替换原文件，判断结果由调用方记录。
+"""
+import os
+import struct
+import time
+from typing import Callable, Dict, Optional
+from .constants import JobStage, UploadReadiness
+from .encode import encode_args, encode_resolution, resolve_encode_profile
+from .ffmpeg_runner import run_ffmpeg
+from .job_queue import job_queue
+from .probe import first_stream, probe
+
+UPLOAD_VIDEO_CODECS = ('h264', 'hevc')
+UPLOAD_AUDIO_CODECS = ('aac', 'mp3')
+
+
+def moov_before_mdat(path: str) -> Optional[bool]:
+    """按顶层 box 顺序判断 moov 是否在 mdat 之前；不是 mp4 结构时返回 None"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            size, box_type = struct.unpack('>I4s', header)
+            header_size = 8
+            if size == 1:
+                largesize = f.read(8)
+                if len(largesize) < 8:
+                    return None
+                size = struct.unpack('>Q', largesize)[0]
+                header_size = 16
+            if box_type == b'moov':
+                return True
+            if box_type == b'mdat':
+                return False
+            if size == 0:
+                # 最后一个 box 一直延续到文件末尾
+                return None
+            if size < header_size:
+                return None
+            f.seek(size - header_size, os.SEEK_CUR)
+
+
+def check_upload_ready(path: str) -> Dict[str, str]:
+    """返回 {'action': UploadReadiness 的值, 'reason': 说明}"""
+    info = probe(path)
+    video = first_stream(info, 'video')
+    audio = first_stream(info, 'audio')
+    if video is None:
+        raise RuntimeError(f"没有视频流: {path}")
+
+    unsupported = []
+    if video.get('codec_name') not in UPLOAD_VIDEO_CODECS:
+        unsupported.append(f"video={video.get('codec_name')}")
+    if audio is not None and audio.get('codec_name') not in UPLOAD_AUDIO_CODECS:
+        unsupported.append(f"audio={audio.get('codec_name')}")
+    if unsupported:
+        return {'action': UploadReadiness.TRANSCODE.value, 'reason': '不支持的编码 ' + ', '.join(unsupported)}
+
+    if 'mp4' not in info.get('format', {}).get('format_name', '').split(','):
+        return {'action': UploadReadiness.FASTSTART.value, 'reason': '容器不是 mp4'}
+    if not moov_before_mdat(path):
+        return {'action': UploadReadiness.FASTSTART.value, 'reason': 'moov 不在文件开头'}
+    return {'action': UploadReadiness.READY.value, 'reason': '可以直接上传'}
+
+
+def _remux_args(input_path: str, output_path: str):
+    return ['-y', '-i', input_path, '-map', '0', '-c', 'copy', '-movflags', '+faststart', '-f', 'mp4', output_path]
+
+
+def _transcode_args(input_path: str, output_path: str, resolution: Optional[str]):
+    profile = resolve_encode_profile(encode_resolution(input_path, resolution))
+    audio = first_stream(probe(input_path), 'audio')
+    if audio is not None and audio.get('codec_name') not in UPLOAD_AUDIO_CODECS:
+        profile['audio_codec'] = 'aac'
+    return [
+        '-y', '-i', input_path,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        *encode_args(dict(profile, faststart=True)),
+        '-f', 'mp4',
+        output_path
+    ]
+
+
+def make_upload_ready(
+    path: str,
+    resolution: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, str], None]] = None
+) -> Dict:
+    """
+    检查并在需要时处理视频，返回 {'action', 'reason', 'seconds'}。
+    处理后的文件原地替换 path，路径不变。
+    """
+    started = time.time()
+    decision = check_upload_ready(path)
+    action = decision['action']
+    if action != UploadReadiness.READY.value:
+        temp_output = path + '.ready.tmp'
+        if action == UploadReadiness.FASTSTART.value:
+            args, message = _remux_args(path, temp_output), '正在重新封装...'
+        else:
+            args, message = _transcode_args(path, temp_output, resolution), '正在转码...'
+        print(f"上传前处理 {path}: {action}（{decision['reason']}）")
+        duration = probe(path).get('format', {}).get('duration')
+        try:
+            with job_queue.stage(JobStage.PREPARE_UPLOAD):
+                run_ffmpeg(args, progress_callback, float(duration) if duration else None, message=message)
+            os.replace(temp_output, path)
+        finally:
+            if os.path.exists(temp_output):
+                os.remove(temp_output)
+    decision['seconds'] = round(time.time() - started, 3)
+    return decision
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Callable, Optional
+from .settings import load_settings
+
+
+class UploadScheduler:
+    """
+    控制投稿频率，避免短时间内大量投稿触发B站验证码。
+
+    - 令牌桶：每小时补充 submissions_per_hour 个名额，最多攒 burst 个
+    - 遇到验证码或 403（report_throttled）后暂停 backoff_seconds 秒，连续出现时加倍；
+      投稿成功（report_success）后暂停时长减半，直到恢复正常
+    - reserve() 不阻塞，只返回还需等待的秒数；流水线据此把任务推迟，而不是标记为失败
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.clock: Callable[[], float] = time.monotonic
+        self._mutex = threading.Lock()
+        self.configure()
+
+    def configure(self, settings: Optional[dict] = None):
+        settings = settings or load_settings('upload')
+        with self._mutex:
+            self.rate_per_hour = max(0.01, float(settings.get('submissions_per_hour') or 6))
+            self.burst = max(1, int(settings.get('burst') or 1))
+            self.base_backoff = float(settings.get('backoff_seconds') or 600)
+            self.max_backoff = max(self.base_backoff, float(settings.get('max_backoff_seconds') or self.base_backoff))
+            self.tokens = float(self.burst)
+            self.updated = self.clock()
+            self.backoff = 0.0
+            self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_per_hour / 3600)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """有名额时占用一个并返回 0，否则返回需要等待的秒数"""
+        with self._mutex:
+            now = self.clock()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) * 3600 / self.rate_per_hour
+
+    def report_throttled(self) -> float:
+        """投稿遇到验证码/403，返回暂停的秒数"""
+        with self._mutex:
+            now = self.clock()
+            self._refill(now)
+            self.backoff = min(self.max_backoff, self.backoff * 2 if self.backoff else self.base_backoff)
+            self.blocked_until = now + self.backoff
+            self.tokens = 0.0
+            return self.backoff
+
+    def report_success(self):
+        with self._mutex:
+            self.backoff = self.backoff / 2 if self.backoff / 2 >= self.base_backoff else 0.0
+
+    def status(self) -> dict:
+        with self._mutex:
+            now = self.clock()
+            self._refill(now)
+            return {
+                'tokens': round(self.tokens, 2),
+                'backoff': self.backoff,
+                'blocked_seconds': max(0.0, self.blocked_until - now),
+            }
+
+
+upload_scheduler = UploadScheduler()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+对比按时间对齐合并字幕的耗时：原来的逐条比较（O(n·m)）与 merge_srt_files 的区间索引实现。
+
+用法：
+  python tests/run_merge_benchmark.py [--cues 10000]
+
+生成两份时间轴略有错开的合成字幕（模拟自动字幕与翻译字幕），分别用两种方式合并并检查结果一致。
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if repo_root not in sys.path:
+    sys.path.insert(0, repo_root)
+
+from src.utils.srt_stream import Cue, SrtWriter, iter_cues
+from src.utils.translate_srt import merge_srt_files
+
+
+def write_synthetic(path, n, prefix, rng, jitter_ms):
+    start = 0
+    with SrtWriter(path) as writer:
+        for i in range(n):
+            duration = rng.randint(800, 4000)
+            offset = rng.randint(-jitter_ms, jitter_ms)
+            writer.write(Cue.from_times(i + 1, max(0, start + offset), max(1, start + offset + duration), f"{prefix} {i}"))
+            start += duration + rng.randint(0, 300)
+
+
+def brute_force_merge(original_path, translated_path, output_path):
+    """合并前的实现：每条原文与所有未使用的译文比较"""
+    originals = list(iter_cues(original_path))
+    translated = list(iter_cues(translated_path))
+    used_t = set()
+    with SrtWriter(output_path) as writer:
+        for orig in originals:
+            best_idx, best_overlap = None, 0
+            for j, tr in enumerate(translated):
+                if j in used_t:
+                    continue
+                ov = max(0, min(orig.end_ms, tr.end_ms) - max(orig.start_ms, tr.start_ms))
+                if ov > best_overlap:
+                    best_overlap, best_idx = ov, j
+            if best_idx is not None:
+                used_t.add(best_idx)
+                writer.write(orig.replace(content=f"{orig.content}\n{translated[best_idx].content}"))
+            else:
+                writer.write(orig)
+        for j, tr in enumerate(translated):
+            if j not in used_t:
+                writer.write(tr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark time-based SRT alignment')
+    parser.add_argument('--cues', type=int, default=10000, help='Number of cues per synthetic file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        original = os.path.join(tmp, 'synthetic.en.srt')
+        translated = os.path.join(tmp, 'synthetic.cn.srt')
+        write_synthetic(original, args.cues, 'en', rng, 0)
+        write_synthetic(translated, args.cues, 'cn', rng, 400)
+
+        results = {}
+        for name, merge in (
+            ('nested loop', brute_force_merge),
+            ('interval index', lambda o, t, out: merge_srt_files(o, t, out, align_by='time')),
+        ):
+            out = os.path.join(tmp, f"{name.replace(' ', '_')}.srt")
+            start = time.time()
+            merge(original, translated, out)
+            results[name] = (time.time() - start, out)
+            print(f"{name:<16}{results[name][0]:>10.3f}s")
+
+        with open(results['nested loop'][1], encoding='utf-8') as a, open(results['interval index'][1], encoding='utf-8') as b:
+            same = a.read() == b.read()
+        speedup = results['nested loop'][0] / max(results['interval index'][0], 1e-9)
+        print(f"{args.cues} cues: {speedup:.1f}x faster, output identical: {same}")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
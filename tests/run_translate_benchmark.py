@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+对比各推理后端翻译样例字幕的速度（行/秒）与峰值内存（RSS）。
+
+用法：
+  python tests/run_translate_benchmark.py [sample.srt] [--backends torch,torch-int8,onnx] [--lines 200]
+
+每个后端在独立的子进程中运行，峰值 RSS 互不影响；缺少依赖的后端会被标记为 skipped。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if repo_root not in sys.path:
+    sys.path.insert(0, repo_root)
+
+
+def find_sample():
+    static_dir = os.path.join(repo_root, 'static')
+    for root, _, files in os.walk(static_dir):
+        for fn in sorted(files):
+            if fn.lower().endswith('.en.srt'):
+                return os.path.join(root, fn)
+    return None
+
+
+def peak_rss_mb():
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def run_one(backend, sample, lines, model):
+    import srt
+    from src.utils.translate_srt import SRTTranslator
+
+    with open(sample, 'r', encoding='utf-8') as f:
+        texts = [s.content for s in srt.parse(f.read())][:lines]
+
+    start = time.time()
+    translator = SRTTranslator(model_name=model, device='cpu', backend=backend)
+    load_seconds = time.time() - start
+
+    # 预热一次，避免把首次推理的初始化开销算进吞吐
+    translator.translate_texts(texts[:4])
+    start = time.time()
+    translator.translate_texts(texts)
+    elapsed = time.time() - start
+    return {
+        'backend': backend,
+        'lines': len(texts),
+        'load_seconds': round(load_seconds, 2),
+        'lines_per_sec': round(len(texts) / elapsed, 2) if elapsed else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SRTTranslator inference backends')
+    parser.add_argument('sample', nargs='?', help='SRT file to translate (default: first static/*.en.srt)')
+    parser.add_argument('--backends', default='torch,torch-int8,onnx', help='Comma separated backends')
+    parser.add_argument('--lines', type=int, default=200, help='Number of subtitle lines to translate')
+    parser.add_argument('--model', default='Helsinki-NLP/opus-mt-en-zh', help='Model name')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sample = args.sample or find_sample()
+    if not sample:
+        print(f"ERROR: no .en.srt files found under {os.path.join(repo_root, 'static')}")
+        sys.exit(2)
+
+    if args.child:
+        try:
+            result = run_one(args.child, sample, args.lines, args.model)
+        except RuntimeError as e:
+            result = {'backend': args.child, 'skipped': str(e)}
+        print(json.dumps(result))
+        return
+
+    print('Using sample SRT:', sample)
+    print(f"{'backend':<12}{'lines':>8}{'load(s)':>10}{'lines/s':>10}{'peak RSS(MB)':>14}")
+    for backend in args.backends.split(','):
+        proc = subprocess.run(
+            [sys.executable, __file__, sample, '--child', backend, '--lines', str(args.lines), '--model', args.model],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<12} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if 'skipped' in result:
+            print(f"{backend:<12} skipped: {result['skipped']}")
+            continue
+        print(f"{backend:<12}{result['lines']:>8}{result['load_seconds']:>10}{result['lines_per_sec']:>10}{result['peak_rss_mb']:>14}")
+
+
+if __name__ == '__main__':
+    main()
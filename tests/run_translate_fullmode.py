@@ -80,7 +80,7 @@ tr.domain = 'programming'
 tr.glossary = {}
 
 # identity translator
-def fake_translate_texts(texts):
+def fake_translate_texts(texts, use_cache=True):
     return texts
 
 tr.translate_texts = fake_translate_texts
@@ -17,7 +17,7 @@ def test_add_subtitle_prefix_bilingual(tmp_path, monkeypatch):
     }
 
     # Stub out external ffmpeg call so we don't execute it during unit tests
-    monkeypatch.setattr('src.utils.subtitle.run_cli_command', lambda *a, **kw: None)
+    monkeypatch.setattr('src.utils.subtitle.run_ffmpeg', lambda *a, **kw: None)
 
     res = add_subtitle(record, orig_id='amyKC9lJe3Q', title='Linus Torvalds', video_path=str(video_file), origin_video_path=str(origin_video_file))
 
@@ -25,3 +25,31 @@ def test_add_subtitle_prefix_bilingual(tmp_path, monkeypatch):
     assert res['title'].startswith('[双字]')
     # subtitles_path should return the SRT path we provided
     assert 'subtitles_path' in res and res['subtitles_path'] == str(srt_file)
+
+
+def test_add_subtitle_soft_mode_muxes_without_reencoding(tmp_path, monkeypatch):
+    video_file = tmp_path / 'video.mp4'
+    srt_file = tmp_path / 'video.en.srt'
+    video_file.write_text('video', encoding='utf-8')
+    srt_file.write_text('1\n00:00:00,000 --> 00:00:01,000\nHello\n', encoding='utf-8')
+
+    calls = []
+
+    def fake_run(args, *rest, **kw):
+        calls.append(args)
+        # 模拟 ffmpeg 写出临时文件
+        with open(args[-1], 'w') as f:
+            f.write('muxed')
+
+    monkeypatch.setattr('src.utils.subtitle.run_ffmpeg', fake_run)
+
+    record = {'subtitle_lang': 'en', 'save_srt': str(srt_file)}
+    res = add_subtitle(record, orig_id='x', title='Talk', video_path=str(video_file),
+                       origin_video_path=str(video_file), subtitle_mode='soft')
+
+    assert res['title'].startswith('[英字]')
+    assert res['video_path'].endswith('video.with_sub.mp4') and os.path.exists(res['video_path'])
+    args = calls[0]
+    assert args[args.index('-c') + 1] == 'copy'
+    assert args[args.index('-c:s') + 1] == 'mov_text'
+    assert '-vf' not in args
@@ -0,0 +1,24 @@
+import asyncio
+import os
+import sys
+
+# 控制器以 src 为根目录导入 utils.*
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import utils.db as db
+from utils.constants import VideoStatus
+from controllers.upload import upload_videos_batch
+
+
+def test_batch_with_unknown_or_unready_video_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    videos = db.VideoDB()
+    ids = [videos.create_video('u', f'o{n}', f't{n}', f'/v{n}.mp4', '', f'https://y/{n}') for n in range(2)]
+    videos.update_status(ids[0], status=VideoStatus.DOWNLOADED)
+
+    assert asyncio.run(upload_videos_batch({}, [ids[0], 999])) == (False, "视频 999 不存在")
+    is_succ, msg = asyncio.run(upload_videos_batch({}, ids))
+    assert not is_succ and str(ids[1]) in msg
+    # 检查没通过时不改动任何视频
+    assert videos.read_video(ids[0])['status'] == VideoStatus.DOWNLOADED
+    assert videos.read_video(ids[1])['status'] == VideoStatus.PENDING
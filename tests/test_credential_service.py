@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+from src.utils import account
+from src.utils._exception import CookieException, ExceptionEnum
+
+
+class FakeAccountUtil:
+    created = 0
+    verified = 0
+    valid = True
+
+    def __init__(self, config_path):
+        FakeAccountUtil.created += 1
+
+    def verify_cookie(self):
+        FakeAccountUtil.verified += 1
+        if not FakeAccountUtil.valid:
+            raise CookieException(ExceptionEnum.INVALID_COOKIE_ERR, 'Invalid Cookie.')
+        return {'SESSDATA': 's', 'bili_jct': 'j', 'buvid3': 'b', 'user_name': 'u', 'other': 'x'}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    FakeAccountUtil.created = FakeAccountUtil.verified = 0
+    FakeAccountUtil.valid = True
+    monkeypatch.setattr(account, 'AccountUtil', FakeAccountUtil)
+    monkeypatch.setattr(account, 'load_settings',
+                        lambda section: {'ttl_seconds': 100, 'refresh_before_seconds': 20})
+    config = tmp_path / 'bili_cookie.json'
+    config.write_text('{}')
+    service = account.CredentialService(str(config))
+    now = [1000.0]
+    service.clock = lambda: now[0]
+    return service, now
+
+
+def test_verification_is_cached_until_ttl(service):
+    service, now = service
+    assert service.get_cookies() == {'SESSDATA': 's', 'bili_jct': 'j', 'buvid3': 'b', 'user_name': 'u'}
+    now[0] += 50
+    service.get_cookies()
+    assert FakeAccountUtil.verified == 1
+
+    now[0] += 60
+    service.get_cookies()
+    assert FakeAccountUtil.verified == 2
+    # 连接池（AccountUtil 的 requests.Session）只创建一次
+    assert FakeAccountUtil.created == 1
+
+
+def test_refreshes_in_background_before_expiry(service, monkeypatch):
+    service, now = service
+    service.get_cookies()
+    pending = []
+
+    class DeferredThread:
+        def __init__(self, target, name, daemon):
+            pending.append(target)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(account.threading, 'Thread', DeferredThread)
+    now[0] += 85
+    # 先返回缓存，后台再校验
+    assert service.get_cookies()['user_name'] == 'u'
+    assert FakeAccountUtil.verified == 1
+    pending[0]()
+    assert FakeAccountUtil.verified == 2
+    assert service.get_cookies()['user_name'] == 'u'
+    assert len(pending) == 1
+
+
+def test_invalidate_forces_reverification(service):
+    service, now = service
+    service.get_cookies()
+    service.invalidate()
+    FakeAccountUtil.valid = False
+    with pytest.raises(CookieException):
+        service.get_cookies()
+
+
+def test_config_change_triggers_reverification(service):
+    service, now = service
+    service.get_cookies()
+    config = service.config_path
+    mtime = os.path.getmtime(config) + 10
+    os.utime(config, (mtime, mtime))
+    service.get_cookies()
+    assert FakeAccountUtil.verified == 2
+    # 重新加载了配置文件
+    assert FakeAccountUtil.created == 2
+
+
+def test_concurrent_callers_share_one_verification(service, monkeypatch):
+    service, now = service
+    started = threading.Event()
+    release = threading.Event()
+    verify = FakeAccountUtil.verify_cookie
+
+    def slow_verify(self):
+        started.set()
+        assert release.wait(5)
+        return verify(self)
+
+    monkeypatch.setattr(FakeAccountUtil, 'verify_cookie', slow_verify)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_cookies())) for _ in range(4)]
+    threads[0].start()
+    assert started.wait(5)
+    # 校验期间不持有锁
+    service.invalidate()
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 4
+    assert FakeAccountUtil.verified == 1
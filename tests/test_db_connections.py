@@ -0,0 +1,57 @@
+import gc
+import threading
+
+import src.utils.db as db
+from src.utils.db import JobDB, connections
+
+
+def test_connection_is_reused_per_thread_in_wal_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    first, second = JobDB(), JobDB()
+    assert first.conn is second.conn
+    assert first.conn.execute('PRAGMA journal_mode;').fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(JobDB().conn))
+    thread.start()
+    thread.join()
+    assert other[0] is not first.conn
+
+
+def test_concurrent_writers_do_not_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    jobs = JobDB()
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(30):
+                job_id = jobs.create_job(f'u{n}', 'download', {'i': i})
+                jobs.update_job(job_id, status='done')
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_thread()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert jobs.count_jobs('done') == 240
+
+
+def test_connections_close_when_thread_exits(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    JobDB().count_jobs('done')
+    before = connections.open_count()
+
+    # 模拟 Flask 为每个请求启动的短命线程，没有调用 close_thread()
+    for _ in range(50):
+        thread = threading.Thread(target=lambda: JobDB().count_jobs('done'))
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert connections.open_count() == before
@@ -0,0 +1,45 @@
+from src.utils import encode
+from src.utils.subtitle import prepare_ffmpeg_args
+
+
+def test_srt_is_converted_to_ass_in_process(tmp_path):
+    srt_path = tmp_path / 'v.en_cn.srt'
+    srt_path.write_text(
+        '1\n00:00:01,000 --> 00:00:02,345\n<i>Hello</i> {world}\n你好\n\n'
+        '2\n01:00:00,000 --> 01:00:01,000\nBye\n',
+        encoding='utf-8'
+    )
+    ass_path = encode.srt_to_ass(str(srt_path), str(tmp_path / 'v.ass'), font_name='AR PL UKai CN')
+
+    text = open(ass_path, encoding='utf-8').read()
+    assert 'Style: Default,AR PL UKai CN,' in text
+    assert 'Dialogue: 0,0:00:01.00,0:00:02.34,Default,,0,0,0,,Hello \\{world\\}\\N你好' in text
+    assert 'Dialogue: 0,1:00:00.00,1:00:01.00,Default,,0,0,0,,Bye' in text
+
+
+def test_ffmpeg_args_use_resolution_profile(tmp_path, monkeypatch):
+    settings = {
+        'video_codec': 'libx264', 'preset': 'veryfast', 'crf': 23, 'tune': 'film',
+        'video_bitrate': None, 'threads': 4, 'audio_codec': 'copy', 'faststart': True,
+        'per_resolution': {'2160': {'crf': 26, 'preset': 'superfast'}},
+    }
+    monkeypatch.setattr(encode, 'load_settings', lambda section: dict(settings))
+    monkeypatch.setattr('src.utils.subtitle.sys.platform', 'linux')
+    srt_path = tmp_path / 'abc.en.srt'
+    srt_path.write_text('1\n00:00:01,000 --> 00:00:02,000\nHi\n', encoding='utf-8')
+    video = str(tmp_path / 'abc.2160.mp4')
+
+    args = prepare_ffmpeg_args(video, str(srt_path), 'out.mp4.tmp', 'en')
+
+    assert args[:4] == ['-y', '-i', video, '-vf']
+    # 只有一个 ass 滤镜，不再额外调用 ffmpeg 转换字幕
+    assert args[4] == 'ass=' + encode.escape_filter_path(str(tmp_path / 'abc.en.ass'))
+    assert args[5:] == [
+        '-c:v', 'libx264', '-preset', 'superfast', '-tune', 'film', '-crf', '26', '-threads', '4',
+        '-c:a', 'copy', '-movflags', '+faststart', '-f', 'mp4', 'out.mp4.tmp'
+    ]
+
+
+def test_bitrate_replaces_crf_for_hardware_encoders():
+    args = encode.encode_args({'video_codec': 'h264_videotoolbox', 'preset': 'fast', 'crf': 23, 'video_bitrate': '6M'})
+    assert args[:8] == ['-c:v', 'h264_videotoolbox', '-b:v', '6M', '-maxrate', '6M', '-bufsize', '6M']
@@ -0,0 +1,75 @@
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from src.utils.ffmpeg_runner import FFmpegError, STDERR_TAIL_LINES, run_ffmpeg
+
+FAKE_FFMPEG = '''#!{python}
+import sys
+import time
+assert sys.argv[1:5] == ['-hide_banner', '-nostats', '-progress', 'pipe:1']
+for n in range(200):
+    sys.stderr.write('chatter %d\\n' % n)
+for n, t in enumerate((2500000, 5000000, 10000000)):
+    print('frame=%d' % (n * 30))
+    print('fps=29.97')
+    print('bitrate=1234.5kbits/s')
+    print('out_time_us=%d' % t)
+    print('out_time_ms=%d' % t)
+    print('speed=2.5x')
+    print('progress=%s' % ('end' if n == 2 else 'continue'))
+    sys.stdout.flush()
+    if sys.argv[-1] == 'hang':
+        time.sleep(60)
+sys.exit(int(sys.argv[-1]))
+'''
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / 'ffmpeg'
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable), encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_progress_is_structured_and_throttled(fake_ffmpeg):
+    percents, metrics = [], []
+    last = run_ffmpeg(['0'], lambda p, m: percents.append(p), total_duration=10,
+                      metrics_callback=metrics.append, min_interval=60)
+
+    # 第一个进度块立即回调，之后在节流间隔内的只保留结束时的一次
+    assert percents == [25, 99]
+    assert len(metrics) == 2
+    assert last == {'frame': 60, 'fps': 29.97, 'speed': 2.5, 'bitrate': '1234.5kbits/s',
+                    'out_time_ms': 10000, 'progress': 'end'}
+
+
+def test_error_keeps_only_stderr_tail(fake_ffmpeg):
+    with pytest.raises(FFmpegError) as info:
+        run_ffmpeg(['1'])
+    lines = info.value.stderr.splitlines()
+    assert len(lines) == STDERR_TAIL_LINES
+    assert lines[-1] == 'chatter 199'
+    assert info.value.returncode == 1
+
+
+def test_failing_callback_kills_ffmpeg(fake_ffmpeg, monkeypatch):
+    processes = []
+
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            processes.append(self)
+
+    def fail(percent, message):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(subprocess, 'Popen', RecordingPopen)
+    with pytest.raises(KeyboardInterrupt):
+        run_ffmpeg(['hang'], fail, total_duration=10)
+    # 子进程已被结束并回收，不会继续编码
+    assert processes[0].returncode is not None
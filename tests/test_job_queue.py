@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+
+from src.utils import db as db_module
+from src.utils import job_queue as job_queue_module
+from src.utils.constants import JobStage, JobStatus
+from src.utils.db import JobDB
+
+
+def _fresh_queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(db_module, 'db_dir', str(tmp_path))
+    monkeypatch.setattr(job_queue_module.JobQueue, '_instance', None)
+    queue = job_queue_module.JobQueue()
+    queue.poll_interval = 0.05
+    return queue
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_jobs_are_processed_and_persisted(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    seen = []
+    queue.register(JobStage.FETCH_INFO, lambda job: seen.append(job['payload']['video_url']))
+    queue.start()
+    try:
+        ids = [queue.submit('u1', {'video_url': f'https://example.com/{n}'}) for n in range(5)]
+        assert _wait_for(lambda: JobDB().count_jobs(JobStatus.DONE.value) == 5)
+    finally:
+        queue.stop(timeout=1)
+
+    assert sorted(seen) == sorted(f'https://example.com/{n}' for n in range(5))
+    assert all(JobDB().read_job(i)['status'] == JobStatus.DONE.value for i in ids)
+
+
+def test_stage_limit_bounds_concurrency(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    queue._stage_limits[JobStage.DOWNLOAD.value] = threading.BoundedSemaphore(1)
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def handler(job):
+        with queue.stage(JobStage.DOWNLOAD):
+            with lock:
+                active.append(job['id'])
+                peak[0] = max(peak[0], len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(job['id'])
+
+    queue.register(JobStage.FETCH_INFO, handler)
+    queue.start()
+    try:
+        for n in range(4):
+            queue.submit('u1', {'n': n})
+        assert _wait_for(lambda: JobDB().count_jobs(JobStatus.DONE.value) == 4)
+    finally:
+        queue.stop(timeout=1)
+    assert peak[0] == 1
+
+
+def test_worker_survives_database_errors(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    queue.register(JobStage.FETCH_INFO, lambda job: None)
+    claim = JobDB.claim_next_job
+    failures = [3]
+
+    def flaky_claim(self, *args, **kwargs):
+        if failures[0]:
+            failures[0] -= 1
+            raise sqlite3.OperationalError('database is locked')
+        return claim(self, *args, **kwargs)
+
+    monkeypatch.setattr(JobDB, 'claim_next_job', flaky_claim)
+    queue.start()
+    try:
+        job_id = queue.submit('u1', {'n': 1})
+        assert _wait_for(lambda: JobDB().read_job(job_id)['status'] == JobStatus.DONE.value)
+    finally:
+        queue.stop(timeout=1)
+    assert failures[0] == 0
+
+
+def test_running_jobs_are_requeued_on_start(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    db = JobDB()
+    job_id = db.create_job('u1', JobStage.FETCH_INFO.value, {'n': 1})
+    assert db.claim_next_job()['id'] == job_id
+    # 模拟进程在任务执行中退出
+    assert db.claim_next_job() is None
+
+    done = []
+    queue.register(JobStage.FETCH_INFO, lambda job: done.append(job['id']))
+    queue.start()
+    try:
+        assert _wait_for(lambda: done == [job_id])
+    finally:
+        queue.stop(timeout=1)
+
+
+def test_stale_row_is_not_claimed_twice(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, 'db_dir', str(tmp_path))
+    db = JobDB()
+    job_id = db.create_job('u1', JobStage.FETCH_INFO.value, {'n': 1})
+    # 两个工作线程读到了同一行
+    stale = db.conn.execute("SELECT * FROM jobs WHERE id = ?;", (job_id,)).fetchone()
+    with db.transaction():
+        assert db._claim(stale)['id'] == job_id
+    # 第一个线程执行完，任务进入下一阶段重新排队
+    db.update_job(job_id, status=JobStatus.QUEUED.value, stage=JobStage.DOWNLOAD.value, attempts=0)
+
+    with db.transaction():
+        assert db._claim(stale) is None
+    job = db.claim_next_job()
+    assert (job['id'], job['stage']) == (job_id, JobStage.DOWNLOAD.value)
+    assert db.claim_next_job() is None
+
+
+def test_failed_job_is_retried_later(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    queue.max_attempts = 2
+
+    def handler(job):
+        raise RuntimeError('boom')
+
+    queue.register(JobStage.FETCH_INFO, handler)
+    job_id = queue.submit('u1', {'n': 1})
+    job = JobDB().claim_next_job()
+    queue._run_job(JobDB(), job)
+
+    retried = JobDB().read_job(job_id)
+    assert retried['status'] == JobStatus.QUEUED.value
+    assert retried['error'] == 'boom'
+    # run_after 在未来，暂时不会被再次领取
+    assert JobDB().claim_next_job() is None
+    # 阶段处理函数据此判断是否还会重试（还会重试时不把视频标记为出错）
+    assert queue.retry_delay(job) == 30
+    assert queue.retry_delay(dict(job, attempts=2)) is None
+
+
+def test_deferred_job_does_not_use_up_attempts(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    queue.max_attempts = 1
+    calls = []
+
+    def handler(job):
+        calls.append((job['attempts'], job['payload'].get('deferred', 0)))
+        if len(calls) < 3:
+            # 推迟时对 payload 的修改会保存下来
+            job['payload']['deferred'] = len(calls)
+            raise job_queue_module.RetryLater(0, 'wait for slot')
+
+    queue.register(JobStage.UPLOAD, handler)
+    job_id = queue.submit('u1', {'n': 1}, stage=JobStage.UPLOAD)
+    for _ in range(3):
+        queue._run_job(JobDB(), JobDB().claim_next_job())
+
+    assert calls == [(1, 0), (1, 1), (1, 2)]
+    assert JobDB().read_job(job_id)['status'] == JobStatus.DONE.value
+
+
+def test_stages_hand_over_payload_and_overlap(tmp_path, monkeypatch):
+    queue = _fresh_queue(monkeypatch, tmp_path)
+    burning = threading.Event()
+    overlapped = []
+
+    def download(job):
+        job['payload']['path'] = f"video-{job['payload']['n']}.mp4"
+        if job['payload']['n'] == 1:
+            # 第二个视频在第一个视频嵌入字幕时下载
+            overlapped.append(burning.wait(2))
+        return JobStage.BURN_IN
+
+    def burn_in(job):
+        if job['payload']['n'] == 0:
+            burning.set()
+            time.sleep(0.2)
+        job['payload']['burned'] = job['payload']['path']
+        return JobStage.UPLOAD
+
+    uploaded = []
+    queue.register(JobStage.DOWNLOAD, download)
+    queue.register(JobStage.BURN_IN, burn_in)
+    queue.register(JobStage.UPLOAD, lambda job: uploaded.append(job['payload']['burned']))
+    queue.start()
+    try:
+        ids = [queue.submit('u1', {'n': n}, stage=JobStage.DOWNLOAD) for n in range(2)]
+        assert _wait_for(lambda: JobDB().count_jobs(JobStatus.DONE.value) == 2)
+    finally:
+        queue.stop(timeout=1)
+
+    assert overlapped == [True]
+    assert sorted(uploaded) == ['video-0.mp4', 'video-1.mp4']
+    assert JobDB().read_job(ids[0])['stage'] == JobStage.UPLOAD.value
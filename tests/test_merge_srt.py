@@ -66,3 +66,50 @@ Second original
     merged = out.read_text(encoding="utf-8")
     assert "One two\n一二" in merged
     assert "Second original\n第二个" in merged
+
+
+def _brute_force_time_merge(originals, translated):
+    # 原来的 O(n·m) 实现，作为对照
+    used_t = set()
+    pairs = []
+    for o_start, o_end in originals:
+        best_idx, best_overlap = None, 0
+        for j, (t_start, t_end) in enumerate(translated):
+            if j in used_t:
+                continue
+            ov = max(0, min(o_end, t_end) - max(o_start, t_start))
+            if ov > best_overlap:
+                best_overlap, best_idx = ov, j
+        if best_idx is not None:
+            used_t.add(best_idx)
+        pairs.append(best_idx)
+    return pairs, [j for j in range(len(translated)) if j not in used_t]
+
+
+def test_time_alignment_matches_brute_force(tmp_path):
+    import random
+    from src.utils.srt_stream import Cue, SrtWriter, iter_cues
+
+    rng = random.Random(7)
+    for round_ in range(20):
+        def cues(n):
+            out = []
+            for _ in range(n):
+                start = rng.randrange(0, 20000, 250)
+                out.append((start, start + rng.randrange(250, 4000, 250)))
+            # 大部分轮次按时间排序，其余保持乱序
+            return sorted(out) if round_ % 3 else out
+
+        originals, translated = cues(rng.randrange(1, 40)), cues(rng.randrange(1, 40))
+        orig_path, trans_path, out_path = (str(tmp_path / f"{name}.srt") for name in ('o', 't', 'out'))
+        for path, spans, prefix in ((orig_path, originals, 'o'), (trans_path, translated, 't')):
+            with SrtWriter(path) as writer:
+                for n, (start, end) in enumerate(spans):
+                    writer.write(Cue.from_times(n + 1, start, end, f"{prefix}{n}"))
+
+        merge_srt_files(orig_path, trans_path, out_path, align_by='time')
+
+        pairs, leftovers = _brute_force_time_merge(originals, translated)
+        expected = [f"o{i}" + (f"\nt{j}" if j is not None else '') for i, j in enumerate(pairs)]
+        expected += [f"t{j}" for j in leftovers]
+        assert [c.content for c in iter_cues(out_path)] == expected
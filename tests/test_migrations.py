@@ -0,0 +1,72 @@
+import json
+import sqlite3
+
+import pytest
+
+from src.utils.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate
+
+
+def tables_and_indexes(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index');")}
+    finally:
+        conn.close()
+
+
+def test_new_database_is_created_at_latest_version(tmp_path):
+    path = str(tmp_path / 'database.db')
+    assert migrate(path) == [version for version, _, _ in MIGRATIONS]
+    assert {'videos', 'jobs', 'probe_cache', 'upload_sessions', 'upload_chunks', 'idx_jobs_status'} <= tables_and_indexes(path)
+    assert migrate(path) == []
+
+    conn = sqlite3.connect(path)
+    assert current_version(conn) == LATEST_VERSION
+    conn.close()
+
+
+def test_legacy_database_keeps_its_rows(tmp_path):
+    # 旧版 schema.sql 建出的数据库：只有 videos 表，没有版本号
+    path = str(tmp_path / 'database.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(MIGRATIONS[0][2])
+    conn.execute("INSERT INTO videos (user, title, save_path, origin_id, origin_url) VALUES ('u', 't', '/v.mp4', 'o', 'url');")
+    conn.commit()
+    conn.close()
+
+    migrate(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT title FROM videos;").fetchall() == [('t',)]
+    assert conn.execute("EXPLAIN QUERY PLAN SELECT * FROM videos WHERE status = 'error';").fetchall()[0][-1].find('idx_videos_status') >= 0
+    conn.close()
+
+
+def test_failed_migration_is_rolled_back(tmp_path):
+    path = str(tmp_path / 'database.db')
+    migrations = [
+        (1, 'a', "CREATE TABLE a (id INTEGER);"),
+        (2, 'b', "CREATE TABLE b (id INTEGER); ALTER TABLE missing ADD COLUMN x INTEGER;"),
+    ]
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(path, migrations)
+    assert 'a' in tables_and_indexes(path) and 'b' not in tables_and_indexes(path)
+
+    migrations[1] = (2, 'b', "CREATE TABLE b (id INTEGER); ALTER TABLE a ADD COLUMN x INTEGER;")
+    assert migrate(path, migrations) == [2]
+    conn = sqlite3.connect(path)
+    assert current_version(conn) == 2
+    assert [row[1] for row in conn.execute("PRAGMA table_info(a);")] == ['id', 'x']
+    conn.close()
+
+
+def test_cookies_are_removed_from_job_payloads(tmp_path):
+    path = str(tmp_path / 'database.db')
+    migrate(path, MIGRATIONS[:7])
+    conn = sqlite3.connect(path)
+    payload = {'video_url': 'u', 'SESSDATA': 's', 'bili_jct': 'j', 'buvid3': 'b'}
+    conn.execute("INSERT INTO jobs (user, stage, payload) VALUES ('u', 'upload', ?);", (json.dumps(payload),))
+    conn.commit()
+
+    migrate(path)
+    assert json.loads(conn.execute("SELECT payload FROM jobs;").fetchone()[0]) == {'video_url': 'u'}
+    conn.close()
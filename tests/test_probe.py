@@ -0,0 +1,82 @@
+import os
+import stat
+import sys
+
+import pytest
+
+import src.utils.db as db
+from src.utils import probe
+
+FAKE_FFPROBE = '''#!{python}
+import json
+import sys
+with open({log!r}, 'a') as f:
+    f.write(' '.join(sys.argv[1:]) + '\\n')
+if '-show_format' in sys.argv:
+    print(json.dumps({{
+        'format': {{'duration': '120.500000'}},
+        'streams': [
+            {{'codec_type': 'audio', 'codec_name': 'aac'}},
+            {{'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080}},
+        ],
+    }}))
+else:
+    print('0.000000,K__')
+    print('0.033000,___')
+    print('60.000000,K__')
+'''
+
+
+@pytest.fixture
+def fake_ffprobe(tmp_path, monkeypatch):
+    log = tmp_path / 'calls.log'
+    path = tmp_path / 'ffprobe'
+    path.write_text(FAKE_FFPROBE.format(python=sys.executable, log=str(log)), encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    probe.clear_memory()
+    yield lambda: log.read_text().splitlines() if log.exists() else []
+    probe.clear_memory()
+
+
+def test_one_ffprobe_run_serves_every_field(fake_ffprobe, tmp_path):
+    video = tmp_path / 'abc.mp4'
+    video.write_bytes(b'video')
+
+    assert probe.probe_duration(str(video)) == 120.5
+    assert probe.probe_resolution(str(video)) == '1080'
+    assert probe.first_stream(probe.probe(str(video)), 'audio')['codec_name'] == 'aac'
+    assert len(fake_ffprobe()) == 1
+
+
+def test_cache_survives_restart_and_invalidates_on_change(fake_ffprobe, tmp_path):
+    video = tmp_path / 'abc.mp4'
+    video.write_bytes(b'video')
+    probe.probe(str(video))
+
+    # 进程内缓存清空后从数据库读取
+    probe.clear_memory()
+    probe.probe(str(video))
+    assert len(fake_ffprobe()) == 1
+
+    # 文件大小变化后重新 probe
+    video.write_bytes(b'longer video')
+    probe.probe(str(video))
+    assert len(fake_ffprobe()) == 2
+
+
+def test_keyframes_are_cached_with_metadata(fake_ffprobe, tmp_path):
+    video = tmp_path / 'abc.mp4'
+    video.write_bytes(b'video')
+
+    assert probe.probe_keyframes(str(video)) == [0.0, 60.0]
+    probe.clear_memory()
+    assert probe.probe_keyframes(str(video)) == [0.0, 60.0]
+    assert probe.probe_duration(str(video)) == 120.5
+    assert len(fake_ffprobe()) == 2
+
+
+def test_missing_file_has_no_duration(fake_ffprobe, tmp_path):
+    assert probe.probe_duration(str(tmp_path / 'missing.mp4')) is None
+    assert fake_ffprobe() == []
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+
+import pytest
+
+import src.utils.db as db
+from src.utils import progress as progress_module
+from src.utils.constants import DownloadStage
+from src.utils.progress import MemoryProgressBackend, SQLiteProgressBackend
+
+SETTINGS = {'ttl_seconds': 3600, 'poll_interval': 0.05}
+
+
+def fresh_progress(monkeypatch, backend):
+    monkeypatch.setattr(progress_module.DownloadProgress, '_instance', None)
+    progress = progress_module.DownloadProgress()
+    progress.configure(SETTINGS, backend=backend)
+    return progress
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def progress(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    backend = MemoryProgressBackend() if request.param == 'memory' else SQLiteProgressBackend()
+    return fresh_progress(monkeypatch, backend)
+
+
+def test_changes_only_include_updated_entries(progress):
+    progress.start_progress('tmp1', 'a')
+    progress.start_progress('tmp2', 'b')
+    _, since = progress.changes(0)
+
+    progress.update_video_id('tmp1', '7')
+    progress.update_stage('7', DownloadStage.DOWNLOADING_VIDEO, 30, 'x')
+    entries, last = progress.changes(since, ['tmp1'])
+    # 按临时ID订阅也能收到切换为真实ID后的进度
+    assert [(e['video_id'], e['progress']) for e in entries] == [('7', 30)]
+    assert last > since
+    assert progress.get_progress('tmp1') is None
+    assert progress.changes(last) == ([], last)
+
+
+def test_restarted_entry_keeps_previous_id(progress):
+    progress.start_progress('tmp1', 'a')
+    progress.update_video_id('tmp1', '7')
+    _, since = progress.changes(0)
+
+    # 重试或验证码推迟后重新登记进度
+    progress.start_progress('7', 'a')
+    progress.update_stage('7', DownloadStage.PREPARING_UPLOAD, 39, 'retry')
+    entries, _ = progress.changes(since, ['tmp1'])
+    assert [(e['video_id'], e['message']) for e in entries] == [('7', 'retry')]
+
+
+def test_finished_entries_expire(progress):
+    progress.configure(dict(SETTINGS, ttl_seconds=0.01), backend=progress.backend)
+    progress.start_progress('1', 'done')
+    progress.complete_progress('1')
+    progress.start_progress('2', 'running')
+    time.sleep(0.05)
+    progress._next_eviction = 0
+    assert list(progress.get_all_progress()) == ['2']
+
+
+def test_sqlite_backend_is_shared_and_never_reuses_seq(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    writer, reader = SQLiteProgressBackend(), SQLiteProgressBackend()
+    writer.put('1', {'video_id': '1', 'completed': False, 'updated_at': 'now'})
+    seq = writer.put('2', {'video_id': '2', 'completed': False, 'updated_at': 'now'})
+    writer.delete('2')
+    assert [e['video_id'] for e in reader.changes_since(0)] == ['1']
+    assert writer.put('3', {'video_id': '3', 'completed': False, 'updated_at': 'now'}) > seq
+
+
+def test_sse_stream_pushes_updates(progress):
+    progress.start_progress('1', 'a')
+    stream = progress.sse_stream(0, ['1'], heartbeat=0.2)
+    assert next(stream).startswith('retry:')
+    first = next(stream)
+    assert json.loads(first.split('data: ', 1)[1])['stage'] == 'preparing'
+
+    threading.Timer(0.05, progress.update_stage, ('1', DownloadStage.UPLOADING, 50)).start()
+    event = next(stream)
+    assert event.startswith('id: ')
+    assert json.loads(event.split('data: ', 1)[1])['progress'] == 50
+    assert next(stream) == ': keepalive\n\n'
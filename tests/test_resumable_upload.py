@@ -0,0 +1,132 @@
+import asyncio
+import os
+
+import pytest
+from bilibili_api import Credential, video_uploader
+from bilibili_api.exceptions import ApiException
+from bilibili_api.utils.picture import Picture
+from bilibili_api.video_uploader import VideoUploaderPage
+
+import src.utils.db as db
+from src.utils.resumable_upload import ResumableVideoUploader, UPLOAD_PROGRESS_EVENT
+
+SETTINGS = {'chunk_size_mb': None, 'concurrency': 2, 'chunk_retries': 1, 'session_ttl_hours': 24}
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    path = tmp_path / 'v.mp4'
+    path.write_bytes(b'x' * 25)
+    return str(path)
+
+
+def make_uploader(video, calls, fail_chunks=()):
+    uploader = ResumableVideoUploader(
+        [VideoUploaderPage(path=video, title='t')], {}, Credential(), cover=Picture(),
+        video_id=1, settings=SETTINGS
+    )
+
+    async def preupload(page):
+        calls.append('preupload')
+        return {'chunk_size': 10, 'threads': 3, 'upload_id': 'u1'}
+
+    async def upload_chunk(page, offset, chunk_number, total, preupload):
+        calls.append(chunk_number)
+        return {'ok': chunk_number not in fail_chunks, 'chunk_number': chunk_number, 'offset': offset, 'page': page}
+
+    async def complete_page(page, chunks, preupload, upload_id):
+        calls.append(('complete', chunks, upload_id))
+        return {'filename': 'f', 'cid': 2}
+
+    uploader._preupload = preupload
+    uploader._upload_chunk = upload_chunk
+    uploader._complete_page = complete_page
+    return uploader
+
+
+def test_interrupted_upload_resumes_remaining_chunks(video):
+    calls = []
+    uploader = make_uploader(video, calls, fail_chunks={2})
+    with pytest.raises(ApiException):
+        asyncio.run(uploader._upload_page(uploader.pages[0]))
+    assert sorted(c for c in calls if isinstance(c, int)) == [0, 1, 2]
+
+    calls = []
+    progress = []
+    uploader = make_uploader(video, calls)
+    uploader.add_event_listener(UPLOAD_PROGRESS_EVENT, progress.append)
+    result = asyncio.run(uploader._upload_page(uploader.pages[0]))
+
+    # 没有重新 preupload，只上传了失败的分块
+    assert calls == [2, ('complete', 3, 'u1')]
+    assert result == {'filename': 'f', 'cid': 2}
+    assert progress[-1] == {'p': 100, 'sent': 25, 'total': 25}
+
+
+def test_submitted_page_is_reused_until_video_is_submitted(video):
+    calls = []
+    uploader = make_uploader(video, calls)
+    asyncio.run(uploader._upload_page(uploader.pages[0]))
+
+    calls = []
+    uploader = make_uploader(video, calls)
+    assert asyncio.run(uploader._upload_page(uploader.pages[0])) == {'filename': 'f', 'cid': 2}
+    assert calls == []
+
+
+def test_pages_upload_concurrently_and_submit_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    paths = []
+    for name in ('a.mp4', 'b.mp4'):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 30)
+        paths.append(str(path))
+    uploader = ResumableVideoUploader(
+        [VideoUploaderPage(path=p, title=os.path.basename(p)) for p in paths], {}, Credential(),
+        cover=Picture(), video_id=1, settings=SETTINGS
+    )
+    chunks, submitted = [], []
+
+    async def preupload(page):
+        chunks.append('preupload ' + page.title)
+        return {'chunk_size': 10, 'threads': 3, 'upload_id': page.title}
+
+    async def upload_chunk(page, offset, chunk_number, total, preupload):
+        await asyncio.sleep(0)
+        chunks.append(page.title)
+        return {'ok': True, 'chunk_number': chunk_number, 'offset': offset, 'page': page}
+
+    async def complete_page(page, chunks, preupload, upload_id):
+        return {'filename': upload_id, 'cid': 0}
+
+    async def upload_cover():
+        return 'cover-url'
+
+    async def submit(self, videos, cover_url=''):
+        submitted.append((videos, cover_url))
+        return {'bvid': 'BV1'}
+
+    uploader._preupload = preupload
+    uploader._upload_chunk = upload_chunk
+    uploader._complete_page = complete_page
+    uploader._upload_cover = upload_cover
+    monkeypatch.setattr(video_uploader.VideoUploader, '_submit', submit)
+
+    assert asyncio.run(uploader._main()) == {'bvid': 'BV1'}
+    # 第二个分 P 不必等第一个分 P 传完才开始
+    assert chunks.index('preupload b.mp4') < len(chunks) - 1 - chunks[::-1].index('a.mp4')
+    assert len(submitted) == 1
+    assert [v['filename'] for v in submitted[0][0]] == ['a.mp4', 'b.mp4']
+    # 投稿成功后不再保留上传会话
+    assert db.UploadSessionDB().find_session(os.path.abspath(paths[0]), 30, os.path.getmtime(paths[0]), 24) is None
+
+
+def test_configured_chunk_size_is_used_for_upload_id(video):
+    uploader = ResumableVideoUploader(
+        [VideoUploaderPage(path=video, title='t')], {}, Credential(), cover=Picture(),
+        video_id=1, settings=dict(SETTINGS, chunk_size_mb=1)
+    )
+    # _preupload 申请 upload_id 时用 preupload['chunk_size'] 作为 partsize
+    preupload = uploader._switch_upload_endpoint({'chunk_size': 10, 'endpoint': '//upos-sz-upcdnbda2.bilivideo.com'}, uploader.line)
+    assert preupload['chunk_size'] == 1024 * 1024
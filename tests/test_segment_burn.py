@@ -0,0 +1,60 @@
+import os
+
+from src.utils import segment_burn
+from src.utils.srt_stream import iter_cues
+
+
+def test_segments_are_cut_at_nearest_keyframes():
+    keyframes = [0.0, 9.0, 21.0, 29.0, 41.0, 52.0]
+    assert segment_burn.plan_segments(60, keyframes, 3) == [(0.0, 21.0), (21.0, 41.0), (41.0, 60)]
+    # 切点太近时合并为更少的段
+    assert segment_burn.plan_segments(60, [0.0, 59.0], 3, min_seconds=10) == [(0.0, 60)]
+
+
+def test_srt_slice_is_shifted_and_clipped(tmp_path):
+    srt_path = tmp_path / 'v.srt'
+    srt_path.write_text(
+        '1\n00:00:08,000 --> 00:00:12,000\nacross\n\n'
+        '2\n00:00:15,000 --> 00:00:16,000\ninside\n\n'
+        '3\n00:00:25,000 --> 00:00:26,000\nafter\n',
+        encoding='utf-8'
+    )
+    out = str(tmp_path / 'slice.srt')
+    assert segment_burn.slice_srt(str(srt_path), out, 10.0, 20.0) == 2
+
+    cues = list(iter_cues(out))
+    assert [(c.index, c.start_ms, c.end_ms, c.content) for c in cues] == [
+        ('1', 0, 2000, 'across'), ('2', 5000, 6000, 'inside')
+    ]
+
+
+def test_segments_burn_in_parallel_and_concat(tmp_path, monkeypatch):
+    srt_path = tmp_path / 'v.srt'
+    srt_path.write_text('1\n00:00:01,000 --> 00:00:02,000\nHi\n', encoding='utf-8')
+    monkeypatch.setattr(segment_burn, 'keyframe_times', lambda path: [0.0, 30.0, 60.0, 90.0])
+    calls = []
+
+    def fake_run(args, metrics_callback=None):
+        calls.append(args)
+        if metrics_callback:
+            metrics_callback({'out_time_ms': 15000})
+        with open(args[-1], 'w') as f:
+            f.write('x')
+
+    monkeypatch.setattr(segment_burn, 'run_ffmpeg', fake_run)
+    progress = []
+    out = str(tmp_path / 'out.mp4')
+    used = segment_burn.burn_in_segments(
+        'in.mp4', str(srt_path), out, {'video_codec': 'libx264', 'crf': 23, 'threads': 8},
+        duration=120, segments=4, min_segment_seconds=10,
+        progress_callback=lambda percent, message: progress.append(percent)
+    )
+
+    assert used == 4
+    segment_calls, concat = calls[:-1], calls[-1]
+    assert sorted(c[c.index('-ss') + 1] for c in segment_calls) == ['0.000', '30.000', '60.000', '90.000']
+    assert all('-an' in c and c[c.index('-threads') + 1] == '2' for c in segment_calls)
+    assert concat[concat.index('-f') + 1] == 'concat' and concat[concat.index('-c') + 1] == 'copy'
+    assert progress == sorted(progress) and progress[-1] == 99
+    # 临时目录已清理
+    assert sorted(os.listdir(tmp_path)) == ['out.mp4', 'v.srt']
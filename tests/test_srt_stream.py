@@ -0,0 +1,57 @@
+import io
+
+from src.utils.srt_stream import Cue, SrtWriter, iter_cues
+from src.utils.translate_srt import SRTTranslator
+
+
+def test_iter_cues_handles_bom_crlf_and_concatenated_files():
+    text = (
+        "\ufeff1\r\n00:00:01,000 --> 00:00:02,500\r\nHello\r\nworld  \r\n\r\n"
+        "2\r\n00:00:03,000 --> 00:00:04,000\r\nBye\r\n"
+        # 第二个文件直接拼接在后面，编号重新从 1 开始
+        "\r\n1\n00:01:00.5 --> bad\nAgain\n"
+    )
+    cues = list(iter_cues(io.StringIO(text)))
+
+    assert [(c.index, c.content) for c in cues] == [('1', 'Hello\nworld'), ('2', 'Bye'), ('1', 'Again')]
+    assert (cues[0].start_ms, cues[0].end_ms) == (1000, 2500)
+    assert (cues[2].start_ms, cues[2].end_ms) == (None, None)
+
+
+def test_writer_round_trip_and_reindex(tmp_path):
+    path = str(tmp_path / 'out.srt')
+    with SrtWriter(path, reindex=True) as writer:
+        writer.write(Cue.from_times(7, 1000, 2000, 'one'))
+        writer.write(Cue('9', '00:00:03,000 --> 00:00:04,000', 'two'))
+
+    assert open(path, encoding='utf-8').read() == (
+        "1\n00:00:01,000 --> 00:00:02,000\none\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\ntwo\n\n"
+    )
+    assert [c.content for c in iter_cues(path)] == ['one', 'two']
+
+
+def test_translate_srt_file_streams_in_windows(tmp_path):
+    src_path = tmp_path / 'a.en.srt'
+    with SrtWriter(str(src_path)) as writer:
+        for n in range(5):
+            writer.write(Cue.from_times(n + 1, n * 1000, n * 1000 + 500, f'line {n}'))
+    out_path = str(tmp_path / 'a.zh.srt')
+    calls = []
+
+    def translate(texts):
+        calls.append(list(texts))
+        return [t.upper() for t in texts]
+
+    tr = object.__new__(SRTTranslator)
+    tr.max_chars = 4000
+    tr.batch_size = 8
+    tr.translate_mode = 'batch'
+    tr.stream_window = 2
+    tr.translate_texts = translate
+    progress = []
+    tr.translate_srt_file(str(src_path), out_path, progress_callback=lambda cur, total: progress.append((cur, total)))
+
+    assert calls == [['line 0', 'line 1'], ['line 2', 'line 3'], ['line 4']]
+    assert [c.content for c in iter_cues(out_path)] == [f'LINE {n}' for n in range(5)]
+    assert progress == [(2, 5), (4, 5), (5, 5)]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+import src.utils.db as db
+from src.utils.constants import VideoStatus
+from src.utils.db import VideoDB
+
+
+@pytest.fixture
+def videos(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    # 后台线程不会在测试过程中自动落盘
+    writer = db.VideoStatusWriter(flush_interval=3600)
+    monkeypatch.setattr(db, 'status_writer', writer)
+    yield VideoDB()
+    writer.close()
+
+
+def stored(videos, id):
+    """绕过 status_writer，直接读数据库文件"""
+    conn = sqlite3.connect(videos.db_path)
+    try:
+        return conn.execute("SELECT title, status FROM videos WHERE id = ?", (id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def create(videos, n):
+    return videos.create_video('u', f'o{n}', f't{n}', f'/v{n}.mp4', '', f'https://y/{n}')
+
+
+def test_updates_are_coalesced_and_flushed_together(videos):
+    ids = [create(videos, n) for n in range(3)]
+    for id in ids:
+        videos.update_status(id, status=VideoStatus.DOWNLOADING)
+        videos.update_status(id, title='new', status=VideoStatus.UPLOADING)
+    assert stored(videos, ids[0]) == ('t0', 'pending')
+
+    assert db.status_writer.flush() == 3
+    assert [stored(videos, id) for id in ids] == [('new', 'uploading')] * 3
+    assert db.status_writer.flush() == 0
+
+
+def test_durable_status_is_written_before_returning(videos):
+    id = create(videos, 0)
+    videos.update_status(id, title='renamed')
+    videos.update_status(id, status=VideoStatus.UPLOADED)
+    assert stored(videos, id) == ('renamed', 'uploaded')
+    assert not db.status_writer.has_pending()
+
+
+def test_reads_and_direct_updates_keep_call_order(videos):
+    id = create(videos, 0)
+    videos.update_status(id, title='a', status=VideoStatus.UPLOADING)
+    assert videos.read_video(id)['title'] == 'a'
+
+    videos.update_status(id, title='b')
+    videos.update_video(id, title='c')
+    videos.update_status(id, status=VideoStatus.DOWNLOADING)
+    db.status_writer.flush()
+    assert stored(videos, id) == ('c', 'downloading')
+
+
+def test_failed_flush_keeps_updates(videos):
+    id = create(videos, 0)
+    videos.update_status(id, status=VideoStatus.UPLOADING, missing_column=1)
+    with pytest.raises(sqlite3.OperationalError):
+        db.status_writer.flush()
+    assert db.status_writer.has_pending(videos.db_path)
+    db.status_writer.discard(videos.db_path, id)
+
+
+def test_constraint_violation_is_dropped_not_requeued(videos):
+    ids = [create(videos, n) for n in range(2)]
+    videos.update_status(ids[0], status='bogus')
+    videos.update_status(ids[1], status=VideoStatus.UPLOADING)
+    assert db.status_writer.flush() == 1
+    assert not db.status_writer.has_pending()
+    # 其他视频的更新照常写入，之后的读取也不受影响
+    assert stored(videos, ids[1]) == ('t1', 'uploading')
+    assert videos.read_video(ids[0])['status'] == 'pending'
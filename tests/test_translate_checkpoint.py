@@ -0,0 +1,122 @@
+import os
+
+import pytest
+import srt
+
+from src.utils.translate_srt import SRTTranslator
+
+SOURCE = """1
+00:00:01,000 --> 00:00:02,000
+first line
+
+2
+00:00:03,000 --> 00:00:04,000
+second line
+
+3
+00:00:05,000 --> 00:00:06,000
+third line
+
+4
+00:00:07,000 --> 00:00:08,000
+fourth line
+"""
+
+
+def _translator(translate_fn):
+    tr = object.__new__(SRTTranslator)
+    tr.model_name = 'm1'
+    tr.max_chars = 50  # 每个分块只放两条字幕
+    tr.batch_size = 8
+    tr.translate_mode = 'full'
+    tr.domain = None
+    tr.glossary = {}
+    tr.translate_texts = translate_fn
+    return tr
+
+
+def _upper(texts, use_cache=True):
+    # 只转换字幕内容，保留 |||SEG0||| 标记
+    return ['\n'.join(l if l.startswith('|||') else l.upper() for l in t.split('\n')) for t in texts]
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return [s.content for s in srt.parse(f.read())]
+
+
+def test_rerun_resumes_from_completed_chunks(tmp_path):
+    src_path = tmp_path / 'a.en.srt'
+    src_path.write_text(SOURCE, encoding='utf-8')
+    out_path = str(tmp_path / 'a.zh.srt')
+    calls = []
+
+    def crash_on_second_chunk(texts, use_cache=True):
+        calls.append(texts[0])
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return _upper(texts)
+
+    tr = _translator(crash_on_second_chunk)
+    tr.batch_size = 1  # 每次只翻译一个分块
+    with pytest.raises(KeyboardInterrupt):
+        tr.translate_srt_file(str(src_path), out_path)
+    assert os.path.exists(out_path + '.chunks.jsonl')
+
+    resumed = []
+
+    def translate(texts, use_cache=True):
+        resumed.extend(texts)
+        return _upper(texts)
+
+    _translator(translate).translate_srt_file(str(src_path), out_path)
+
+    # 第一块来自检查点，只重新翻译了第二块
+    assert len(resumed) == 1 and 'third line' in resumed[0]
+    assert _read(out_path) == ['FIRST LINE', 'SECOND LINE', 'THIRD LINE', 'FOURTH LINE']
+    assert not os.path.exists(out_path + '.chunks.jsonl')
+
+
+def test_batch_fallback_only_translates_missing_segments(tmp_path):
+    src_path = tmp_path / 'b.en.srt'
+    src_path.write_text(SOURCE, encoding='utf-8')
+    out_path = str(tmp_path / 'b.zh.srt')
+    calls = []
+
+    def translate(texts, use_cache=True):
+        calls.append(list(texts))
+        # 模型把第二块的标记弄丢了
+        return ['THIRD LINE FOURTH LINE' if '|||SEG2|||' in t else out for t, out in zip(texts, _upper(texts))]
+
+    _translator(translate).translate_srt_file(str(src_path), out_path)
+
+    assert calls[-1] == ['third line', 'fourth line']
+    assert _read(out_path) == ['FIRST LINE', 'SECOND LINE', 'THIRD LINE', 'FOURTH LINE']
+
+
+class FakeTokenizer:
+    """每个空白分隔的词算一个 token"""
+
+    def __call__(self, text, add_special_tokens=True):
+        return {'input_ids': text.split()}
+
+
+def test_chunks_follow_token_budget_and_share_one_call(tmp_path):
+    src_path = tmp_path / 'c.en.srt'
+    src_path.write_text(SOURCE, encoding='utf-8')
+    out_path = str(tmp_path / 'c.zh.srt')
+    calls = []
+
+    def translate(texts, use_cache=True):
+        calls.append(list(texts))
+        return _upper(texts)
+
+    tr = _translator(translate)
+    tr.max_chars = 4000
+    tr.tokenizer = FakeTokenizer()
+    tr.max_tokens = 6  # 每条字幕 3 个 token（标记 + 两个词），每块两条
+    tr.translate_srt_file(str(src_path), out_path)
+
+    assert len(calls) == 1 and len(calls[0]) == 2
+    assert 'second line' in calls[0][0] and 'third line' in calls[0][1]
+    assert _read(out_path) == ['FIRST LINE', 'SECOND LINE', 'THIRD LINE', 'FOURTH LINE']
@@ -77,7 +77,7 @@ def test_translate_full_preserves_alignment(tmp_path):
     tr.glossary = {}
 
     # fake translate_texts that returns the input unchanged (identity)
-    def fake_translate_texts(texts):
+    def fake_translate_texts(texts, use_cache=True):
         return texts
 
     tr.translate_texts = fake_translate_texts
@@ -0,0 +1,80 @@
+import sqlite3
+
+from src.utils.translate_srt import SRTTranslator, TranslationCache
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, texts):
+        self.calls.append(list(texts))
+        return [f"zh:{t}" for t in texts]
+
+
+def _translator(cache, domain=None):
+    translator = object.__new__(SRTTranslator)
+    translator.model_name = 'm1'
+    translator.domain = domain
+    translator.cache = cache
+    translator._batcher = FakeBatcher()
+    return translator
+
+
+def test_cached_lines_skip_the_model(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'cache.db'))
+    translator = _translator(cache)
+
+    assert translator.translate_texts(['Hello', 'Thanks for watching']) == ['zh:Hello', 'zh:Thanks for watching']
+    # 空白不同的同一句命中缓存，只有新句子交给模型
+    assert translator.translate_texts(['Thanks  for watching ', 'Bye']) == ['zh:Thanks for watching', 'zh:Bye']
+    assert translator._batcher.calls == [['Hello', 'Thanks for watching'], ['Bye']]
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 3)
+
+
+def test_cache_is_keyed_by_model_backend_and_domain_and_persisted(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    TranslationCache(path).put_many('m1', None, [('Hello', 'A')])
+
+    cache = TranslationCache(path)
+    assert cache.get_many('m1', None, ['Hello', 'Other']) == {0: 'A'}
+    assert cache.get_many('m2', None, ['Hello']) == {}
+    assert cache.get_many('m1', 'programming', ['Hello']) == {}
+    assert cache.get_many('m1', None, ['Hello'], backend='onnx') == {}
+
+
+def test_cache_without_backend_column_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE translations (model TEXT NOT NULL, domain TEXT NOT NULL, source_hash TEXT NOT NULL, "
+        "source TEXT NOT NULL, target TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (model, domain, source_hash))"
+    )
+    conn.commit()
+    conn.close()
+
+    cache = TranslationCache(path)
+    cache.put_many('m1', None, [('Hello', 'A')], backend='torch-int8')
+    assert cache.get_many('m1', None, ['Hello'], backend='torch-int8') == {0: 'A'}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'cache.db'), max_entries=10)
+    cache.put_many('m1', None, [(f'line {n}', str(n)) for n in range(10)])
+    cache.get_many('m1', None, ['line 0'])
+    cache.put_many('m1', None, [('line 10', '10')])
+
+    # 超出上限后多淘汰 10%：最久未使用的 line 1、line 2 被删除
+    assert cache.stats()['entries'] == 9
+    assert sorted(cache.get_many('m1', None, ['line 0', 'line 1', 'line 2', 'line 10'])) == [0, 3]
+
+
+def test_use_cache_false_bypasses_the_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'cache.db'))
+    translator = _translator(cache)
+
+    # 全文模式的分块文本不查也不写翻译记忆
+    assert translator.translate_texts(['|||SEG0|||\nHello\n'], use_cache=False) == ['zh:|||SEG0|||\nHello\n']
+    assert cache.stats()['entries'] == 0
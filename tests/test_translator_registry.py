@@ -0,0 +1,169 @@
+import gc
+import threading
+import time
+import weakref
+
+from src.utils.translate_srt import TranslatorRegistry
+
+
+class FakeParam:
+    def __init__(self, n):
+        self.n = n
+
+    def numel(self):
+        return self.n
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, size_bytes):
+        self._params = [FakeParam(size_bytes)]
+
+    def parameters(self):
+        return self._params
+
+
+def _registry(sizes=None, **kwargs):
+    loads = []
+
+    def loader(model_name, device, backend):
+        loads.append(model_name)
+        size = (sizes or {}).get(model_name, 1024)
+        return f"tok-{model_name}", FakeModel(size)
+
+    return TranslatorRegistry(loader=loader, **kwargs), loads
+
+
+def test_model_is_loaded_once_and_shared():
+    registry, loads = _registry(max_models=2)
+    results = []
+
+    def worker():
+        results.append(registry.get('m1', 'cpu'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ['m1']
+    assert all(entry is results[0] for entry in results)
+    assert results[0].tokenizer == 'tok-m1'
+
+
+def test_least_recently_used_model_is_evicted():
+    registry, loads = _registry(max_models=2, memory_budget_mb=None)
+    registry.get('m1', 'cpu')
+    registry.get('m2', 'cpu')
+    registry.get('m1', 'cpu')  # m2 变为最久未使用
+    registry.get('m3', 'cpu')
+
+    assert registry.loaded_models() == [('m1', 'cpu', 'torch'), ('m3', 'cpu', 'torch')]
+    registry.get('m2', 'cpu')
+    assert loads == ['m1', 'm2', 'm3', 'm2']
+
+
+def test_memory_budget_evicts_until_under_budget():
+    mb = 1024 * 1024
+    registry, _ = _registry(sizes={'big': 300 * mb, 'small': 100 * mb, 'new': 200 * mb},
+                            max_models=None, memory_budget_mb=400)
+    registry.get('big', 'cpu')
+    registry.get('small', 'cpu')
+    registry.get('new', 'cpu')
+
+    assert registry.loaded_models() == [('small', 'cpu', 'torch'), ('new', 'cpu', 'torch')]
+
+
+def test_backends_are_cached_separately():
+    registry, loads = _registry(max_models=None, memory_budget_mb=None)
+    registry.get('m1', 'cpu')
+    registry.get('m1', 'cpu', 'torch-int8')
+    registry.get('m1', 'cpu', 'torch-int8')
+
+    assert loads == ['m1', 'm1']
+    assert registry.loaded_models() == [('m1', 'cpu', 'torch'), ('m1', 'cpu', 'torch-int8')]
+
+
+def test_idle_models_are_evicted():
+    registry, _ = _registry(max_models=None, memory_budget_mb=None, idle_seconds=60)
+    entry = registry.get('m1', 'cpu')
+    entry.last_used -= 120
+    registry.evict_idle()
+    assert registry.loaded_models() == []
+
+
+def test_idle_model_is_released_without_further_loads():
+    registry, _ = _registry(max_models=None, memory_budget_mb=None, idle_seconds=0.2)
+    registry.get('m1', 'cpu')
+    # 不再有 get() 调用，后台线程也会释放唯一的模型
+    deadline = time.time() + 5
+    while registry.loaded_models() and time.time() < deadline:
+        time.sleep(0.05)
+    assert registry.loaded_models() == []
+
+
+def test_evicted_model_stops_its_batcher_and_is_freed():
+    registry, _ = _registry(max_models=1, memory_budget_mb=None)
+    entry = registry.get('m1', 'cpu')
+    # 与 entry.generate 一样，推理函数引用着模型
+    entry.batcher.translate_fn = lambda texts, entry=entry: [t.upper() for t in texts]
+    entry.batcher.max_wait_ms = 0
+    assert entry.batcher.translate(['a']) == ['A']
+    thread = entry.batcher._thread
+    model = weakref.ref(entry.model)
+
+    del entry
+    registry.get('m2', 'cpu')
+    gc.collect()
+    assert not thread.is_alive()
+    assert model() is None
+
+
+def test_batcher_merges_callers_and_sorts_by_length():
+    from src.utils.translate_srt import TranslationBatcher
+
+    batches = []
+
+    def translate_fn(texts):
+        batches.append(list(texts))
+        return [t.upper() for t in texts]
+
+    batcher = TranslationBatcher(translate_fn, max_batch_size=4, max_batch_tokens=1000, max_wait_ms=100)
+    inputs = {
+        'a': ['ccc', 'a', 'eeeee'],
+        'b': ['bb', 'dddd', 'ffffff'],
+    }
+    results = {}
+    barrier = threading.Barrier(2)
+
+    def caller(name):
+        barrier.wait()
+        results[name] = batcher.translate(inputs[name])
+
+    threads = [threading.Thread(target=caller, args=(name,)) for name in inputs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert results == {name: [t.upper() for t in texts] for name, texts in inputs.items()}
+    # 两个调用方的 6 行按长度排序后合并为 4 + 2 两个批次
+    assert batches == [['a', 'bb', 'ccc', 'dddd'], ['eeeee', 'ffffff']]
+
+
+def test_batcher_reports_errors_to_callers():
+    from src.utils.translate_srt import TranslationBatcher
+
+    def translate_fn(texts):
+        raise ValueError('model failed')
+
+    batcher = TranslationBatcher(translate_fn, max_wait_ms=0)
+    try:
+        batcher.translate(['hello'])
+    except ValueError as e:
+        assert str(e) == 'model failed'
+    else:
+        raise AssertionError('expected ValueError')
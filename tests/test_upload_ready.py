@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+
+from src.utils import upload_ready
+from src.utils.constants import UploadReadiness
+
+
+def write_boxes(path, *types):
+    with open(path, 'wb') as f:
+        for box_type in types:
+            f.write(struct.pack('>I4s', 16, box_type) + b'\0' * 8)
+
+
+def fake_probe(video='h264', audio='aac', format_name='mov,mp4,m4a,3gp,3g2,mj2'):
+    streams = [{'codec_type': 'video', 'codec_name': video, 'height': 720}]
+    if audio:
+        streams.append({'codec_type': 'audio', 'codec_name': audio})
+    return lambda path: {'format': {'format_name': format_name, 'duration': '10.0'}, 'streams': streams}
+
+
+@pytest.fixture
+def ffmpeg_calls(monkeypatch):
+    calls = []
+
+    def fake_run(args, progress_callback=None, total_duration=None, message=''):
+        calls.append(args)
+        with open(args[-1], 'wb') as f:
+            f.write(b'processed')
+    monkeypatch.setattr(upload_ready, 'run_ffmpeg', fake_run)
+    return calls
+
+
+def test_moov_position(tmp_path):
+    path = str(tmp_path / 'v.mp4')
+    write_boxes(path, b'ftyp', b'moov', b'mdat')
+    assert upload_ready.moov_before_mdat(path) is True
+    write_boxes(path, b'ftyp', b'mdat', b'moov')
+    assert upload_ready.moov_before_mdat(path) is False
+    write_boxes(path, b'ftyp', b'free')
+    assert upload_ready.moov_before_mdat(path) is None
+
+
+def test_ready_file_is_left_alone(tmp_path, monkeypatch, ffmpeg_calls):
+    path = str(tmp_path / 'v.720.mp4')
+    write_boxes(path, b'ftyp', b'moov', b'mdat')
+    monkeypatch.setattr(upload_ready, 'probe', fake_probe())
+
+    decision = upload_ready.make_upload_ready(path)
+    assert decision['action'] == UploadReadiness.READY.value
+    assert ffmpeg_calls == []
+
+
+def test_moov_at_end_is_remuxed_in_place(tmp_path, monkeypatch, ffmpeg_calls):
+    path = str(tmp_path / 'v.720.mp4')
+    write_boxes(path, b'ftyp', b'mdat', b'moov')
+    monkeypatch.setattr(upload_ready, 'probe', fake_probe())
+
+    decision = upload_ready.make_upload_ready(path)
+    assert decision['action'] == UploadReadiness.FASTSTART.value
+    args = ffmpeg_calls[0]
+    assert args[args.index('-c') + 1] == 'copy' and '+faststart' in args
+    assert open(path, 'rb').read() == b'processed'
+    assert not (tmp_path / 'v.720.mp4.ready.tmp').exists()
+
+
+def test_unsupported_codec_is_transcoded(tmp_path, monkeypatch, ffmpeg_calls):
+    path = str(tmp_path / 'v.720.mp4')
+    write_boxes(path, b'ftyp', b'moov', b'mdat')
+    monkeypatch.setattr(upload_ready, 'probe', fake_probe(video='vp9', audio='opus'))
+
+    decision = upload_ready.make_upload_ready(path)
+    assert decision['action'] == UploadReadiness.TRANSCODE.value
+    assert 'vp9' in decision['reason'] and 'opus' in decision['reason']
+    args = ffmpeg_calls[0]
+    assert args[args.index('-c:v') + 1] == 'libx264'
+    assert args[args.index('-c:a') + 1] == 'aac'
@@ -0,0 +1,39 @@
+from src.utils.upload_scheduler import UploadScheduler
+
+SETTINGS = {'submissions_per_hour': 60, 'burst': 2, 'backoff_seconds': 100, 'max_backoff_seconds': 350}
+
+
+def make_scheduler(monkeypatch):
+    monkeypatch.setattr(UploadScheduler, '_instance', None)
+    scheduler = UploadScheduler()
+    now = [0.0]
+    scheduler.clock = lambda: now[0]
+    scheduler.configure(SETTINGS)
+    return scheduler, now
+
+
+def test_token_bucket_allows_burst_then_paces(monkeypatch):
+    scheduler, now = make_scheduler(monkeypatch)
+    assert scheduler.reserve() == 0
+    assert scheduler.reserve() == 0
+    # 每小时 60 个，即每分钟补充一个名额
+    assert scheduler.reserve() == 60
+    now[0] = 30
+    assert scheduler.reserve() == 30
+    now[0] = 60
+    assert scheduler.reserve() == 0
+
+
+def test_backoff_doubles_and_recovers(monkeypatch):
+    scheduler, now = make_scheduler(monkeypatch)
+    assert scheduler.report_throttled() == 100
+    assert scheduler.reserve() == 100
+    assert scheduler.report_throttled() == 200
+    assert scheduler.report_throttled() == 350
+
+    now[0] = 1000
+    assert scheduler.reserve() == 0
+    scheduler.report_success()
+    assert scheduler.status()['backoff'] == 175
+    scheduler.report_success()
+    assert scheduler.status()['backoff'] == 0
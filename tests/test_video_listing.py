@@ -0,0 +1,50 @@
+import src.utils.db as db
+from src.utils.db import VideoDB
+
+
+def make_videos(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'db_dir', str(tmp_path))
+    videos = VideoDB()
+    for n in range(45):
+        video_id = videos.create_video('u1', f'o{n}', f'title {n}' if n != 7 else '100%_done', f'/v/{n}.mp4', '', 'url')
+        status = 'uploaded' if n % 3 == 0 else 'downloaded'
+        videos.update_video(video_id, status=status, created=f'2024-01-{n // 2 + 1:02d} 10:00:{n % 2:02d}')
+    videos.create_video('u2', 'x', 'other user', '/v/x.mp4', '', 'url')
+    return videos
+
+
+def test_keyset_pages_cover_all_rows_in_order(tmp_path, monkeypatch):
+    videos = make_videos(tmp_path, monkeypatch)
+    seen, cursor = [], None
+    while True:
+        page, cursor = videos.list_videos_page('u1', limit=20, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 45
+    keys = [(str(v['created']), v['id']) for v in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert [v['id'] for v in seen] == [v['id'] for v in videos.list_videos('u1')]
+
+
+def test_filters(tmp_path, monkeypatch):
+    videos = make_videos(tmp_path, monkeypatch)
+    page, _ = videos.list_videos_page('u1', limit=100, status='uploaded')
+    assert len(page) == 15 and {v['status'] for v in page} == {'uploaded'}
+
+    page, _ = videos.list_videos_page('u1', limit=100, since='2024-01-02', until='2024-01-03')
+    assert sorted(v['origin_id'] for v in page) == ['o2', 'o3', 'o4', 'o5']
+
+    # % 和 _ 按字面匹配
+    page, _ = videos.list_videos_page('u1', limit=100, title='0%_')
+    assert [v['title'] for v in page] == ['100%_done']
+
+
+def test_listing_uses_index(tmp_path, monkeypatch):
+    videos = make_videos(tmp_path, monkeypatch)
+    plan = videos.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM videos WHERE user = ? ORDER BY created DESC, id DESC LIMIT 21;", ('u1',)
+    ).fetchall()
+    detail = ' '.join(row[3] for row in plan)
+    assert 'idx_videos_user_created' in detail
+    assert 'TEMP B-TREE' not in detail